@@ -0,0 +1,34 @@
+"""
+Stand-in of the decky module provided by Decky Loader, so that the backend can run outside of it.
+All directories are placed under $DECKY_BENCH_HOME, the plugin directory points to the repo's defaults.
+"""
+
+from pathlib import Path
+import logging, os
+
+_BENCH_HOME = Path(os.environ.get("DECKY_BENCH_HOME", "/tmp/sdh-gamesync-bench"))
+_REPO_DIR = Path(__file__).resolve().parent.parent
+
+HOME = str(_BENCH_HOME / "home")
+USER = "deck"
+DECKY_VERSION = "bench"
+DECKY_USER = USER
+DECKY_USER_HOME = HOME
+DECKY_HOME = str(_BENCH_HOME / "homebrew")
+DECKY_PLUGIN_SETTINGS_DIR = str(_BENCH_HOME / "settings")
+DECKY_PLUGIN_RUNTIME_DIR = str(_BENCH_HOME / "runtime")
+DECKY_PLUGIN_LOG_DIR = str(_BENCH_HOME / "logs")
+DECKY_PLUGIN_DIR = str(_REPO_DIR / "defaults")
+DECKY_PLUGIN_NAME = "Game Sync"
+DECKY_PLUGIN_VERSION = "bench"
+DECKY_PLUGIN_AUTHOR = "Renn"
+DECKY_PLUGIN_LOG = str(Path(DECKY_PLUGIN_LOG_DIR) / "plugin.log")
+
+for _dir in (HOME, DECKY_PLUGIN_SETTINGS_DIR, DECKY_PLUGIN_RUNTIME_DIR, DECKY_PLUGIN_LOG_DIR):
+    os.makedirs(_dir, exist_ok=True)
+
+logger = logging.getLogger(DECKY_PLUGIN_NAME)
+
+
+async def emit(event: str, *args) -> None:
+    pass
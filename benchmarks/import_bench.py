@@ -0,0 +1,137 @@
+"""
+Import-time benchmark of the backend, driven by "python -X importtime".
+
+Modules that Decky Loader has loaded already when it loads the plugin are imported first,
+so only the cost added by the plugin is measured. Fails when the median import time of main.py
+exceeds the budget, or when a module that should only be loaded on first use gets imported.
+
+Usage:
+python benchmarks/import_bench.py
+python benchmarks/import_bench.py --budget-ms 80 --repeat 20 --output imports.json
+"""
+
+from pathlib import Path
+from typing import Any
+import argparse, json, os, platform, re, statistics, subprocess, sys, tempfile
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+# loaded by Decky Loader itself before any plugin
+HOST_MODULES = ["asyncio", "json", "logging", "pathlib", "ssl", "typing"]
+# network, SSL and update machinery, only needed once a specific RPC runs,
+# databases and syscall wrappers, only needed once the plugin starts, and the bundled and chunked syncs
+LAZY_MODULES = [
+    "certifi", "urllib.request", "http.client", "zipfile",
+    "sqlite3", "ctypes", "tarfile", "chunk_store", "save_bundle",
+]
+DEFAULT_BUDGET_MS = 60.0
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Number of fresh interpreters to measure")
+    parser.add_argument(
+        "--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help=f"Max median import time of main.py, {DEFAULT_BUDGET_MS} by default"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to report")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def measure(env: dict[str, str]) -> list[tuple[str, int, int, int]]:
+    """
+    Imports main.py in a fresh interpreter.
+
+    Parameters:
+    env (dict[str, str]): Environment of the interpreter.
+
+    Returns:
+    list[tuple[str, int, int, int]]: Name, self time, cumulative time in microseconds and depth of
+                                     every module imported by main.py, main.py itself is the last one.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(HOST_MODULES)}; import main"],
+        cwd=REPO_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing main.py failed:\n{result.stderr}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not (match := IMPORTTIME_PATTERN.match(line)):
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        # importtime prints children before their parent, a new top level import starts after the previous one
+        if modules and modules[-1][3] == 0:
+            modules = []
+        modules.append((name, int(self_us), int(cumulative_us), depth))
+
+    if not modules or modules[-1][0] != "main":
+        raise RuntimeError("main.py not found in the importtime output")
+
+    return modules
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="sdh-gamesync-imports-") as bench_home:
+        env = dict(os.environ)
+        env["DECKY_BENCH_HOME"] = bench_home
+        env["PYTHONPATH"] = os.pathsep.join([str(BENCH_DIR), str(REPO_DIR / "py_modules"), str(REPO_DIR)])
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+        # the first run writes the bytecode caches
+        measure(env)
+        runs = [measure(env) for _ in range(max(1, args.repeat))]
+
+    totals = [modules[-1][2] / 1000 for modules in runs]
+    self_times: dict[str, list[float]] = dict()
+    for modules in runs:
+        for name, self_us, _, _ in modules:
+            self_times.setdefault(name, []).append(self_us / 1000)
+
+    median = statistics.median(totals)
+    lazy_loaded = sorted({name for modules in runs for name, *_ in modules if name in LAZY_MODULES})
+    results: dict[str, Any] = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "host_modules": HOST_MODULES,
+        "budget_ms": args.budget_ms,
+        "median_ms": round(median, 2),
+        "min_ms": round(min(totals), 2),
+        "max_ms": round(max(totals), 2),
+        "modules": len(runs[-1]),
+        "slowest": [
+            {"module": name, "self_ms": round(statistics.median(times), 2)}
+            for name, times in sorted(self_times.items(), key=lambda item: -statistics.median(item[1]))[: args.top]
+        ],
+        "lazy_loaded": lazy_loaded,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+    failed = False
+    if median > args.budget_ms:
+        print(f"Importing main.py took {median:.1f}ms, over the budget of {args.budget_ms}ms", file=sys.stderr)
+        failed = True
+    if lazy_loaded:
+        print(f"Modules that should be loaded on first use got imported: {lazy_loaded}", file=sys.stderr)
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Frame-time benchmark of background priority, i.e. how much a sync running next to a game makes it stutter.
+
+A game stand-in renders frames of fixed CPU work at 60 fps, sharing a CPU with a sync load: rclone copying
+a synthetic tree with checksums if --rclone is given, synthetic hashing and writing processes otherwise.
+Frame times are measured without load, with the load at normal priority, and with the load started the way
+the plugin starts background syncs. Results are written as JSON.
+
+Usage:
+python benchmarks/priority_bench.py
+python benchmarks/priority_bench.py --rclone /usr/bin/rclone --duration 20 --output priority.json
+"""
+
+from pathlib import Path
+from typing import Any
+import argparse, json, multiprocessing, os, platform, shutil, subprocess, sys, tempfile, time
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+FRAME_INTERVAL = 1 / 60
+SCENARIOS = ["idle", "normal", "background"]
+LOAD_SCRIPT = """
+import hashlib, os, sys
+data = os.urandom(4 * 1024 * 1024)
+with open(sys.argv[1], "wb") as f:
+    while True:
+        f.write(hashlib.sha256(data).digest() * 1024 + data)
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rclone", help="Path of the rclone binary, synthetic load is used if not given")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of each scenario")
+    parser.add_argument("--frame-work-ms", type=float, default=8, help="CPU time of a frame, 8 by default")
+    parser.add_argument("--workers", type=int, default=4, help="Number of synthetic load processes")
+    parser.add_argument("--nice", type=int, default=10, help="Nice increment of the background load")
+    parser.add_argument("--cpu", type=int, default=0, help="CPU the game and the load are pinned to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="Max ratio of the p99 frame time with background load to the idle one, 1.5 by default",
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def calibrate(work_ms: float) -> int:
+    """
+    Finds the number of loop iterations that take the CPU time of a frame.
+
+    Parameters:
+    work_ms (float): CPU time of a frame in milliseconds.
+
+    Returns:
+    int: Number of iterations.
+    """
+    iterations = 100000
+    started = time.process_time()
+    spin(iterations)
+    elapsed = time.process_time() - started
+    return max(1, int(iterations * work_ms / 1000 / max(elapsed, 1e-6)))
+
+
+def spin(iterations: int):
+    """
+    Burns CPU, the work of a frame.
+    """
+    x = 0
+    for i in range(iterations):
+        x += i * i
+
+
+def render(cpu: int, iterations: int, duration: float, results: Any):
+    """
+    Renders frames at 60 fps, runs in its own process.
+
+    Parameters:
+    cpu (int): CPU to pin to.
+    iterations (int): Loop iterations of a frame.
+    duration (float): Seconds to render.
+    results (Any): Queue to put the frame times in seconds to.
+    """
+    os.sched_setaffinity(0, {cpu})
+    frame_times = []
+    deadline = time.perf_counter()
+    ends = deadline + duration
+    while deadline < ends:
+        started = time.perf_counter()
+        spin(iterations)
+        frame_times.append(time.perf_counter() - started)
+        deadline += FRAME_INTERVAL
+        if (delay := deadline - time.perf_counter()) > 0:
+            time.sleep(delay)
+        else:
+            deadline = time.perf_counter()
+
+    results.put(frame_times)
+
+
+def start_load(args: argparse.Namespace, workdir: Path, prefix: list[str]) -> list[subprocess.Popen]:
+    """
+    Starts the sync load pinned to the CPU of the game.
+
+    Parameters:
+    args (argparse.Namespace): Arguments of the benchmark.
+    workdir (Path): Directory for the files of the load.
+    prefix (list[str]): Command prefix of the processes, to lower their priority.
+
+    Returns:
+    list[subprocess.Popen]: The load processes.
+    """
+    prefix = ["taskset", "-c", str(args.cpu), *prefix]
+
+    if args.rclone:
+        source = workdir / "source"
+        if not source.exists():
+            source.mkdir()
+            for i in range(64):
+                (source / f"file{i}").write_bytes(os.urandom(4 * 1024 * 1024))
+        # copy to a new folder each time, so there's always something to transfer
+        destination = workdir / f"destination{time.monotonic_ns()}"
+        command = [args.rclone, "copy", "--checksum", "--transfers", "8", "--checkers", "16", str(source), str(destination)]
+        return [subprocess.Popen(prefix + command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)]
+
+    return [
+        subprocess.Popen(prefix + [sys.executable, "-c", LOAD_SCRIPT, str(workdir / f"load{i}")])
+        for i in range(args.workers)
+    ]
+
+
+def summarize(frame_times: list[float]) -> dict[str, Any]:
+    """
+    Summarizes frame times.
+
+    Parameters:
+    frame_times (list[float]): Frame times in seconds.
+
+    Returns:
+    dict[str, Any]: Number of frames, p50, p99 and max frame time in milliseconds, and the ratio of missed frames.
+    """
+    frame_times = sorted(frame_times)
+    percentile = lambda p: frame_times[min(len(frame_times) - 1, int(len(frame_times) * p / 100))] * 1000
+
+    return {
+        "frames": len(frame_times),
+        "p50_ms": round(percentile(50), 2),
+        "p99_ms": round(percentile(99), 2),
+        "max_ms": round(frame_times[-1] * 1000, 2),
+        "missed": round(sum(t > FRAME_INTERVAL for t in frame_times) / len(frame_times), 4),
+    }
+
+
+def run_scenario(args: argparse.Namespace, workdir: Path, scenario: str, iterations: int) -> dict[str, Any]:
+    """
+    Renders frames next to the load of a scenario.
+    """
+    from sync_priority import get_lower_priority_command
+
+    load = []
+    if scenario != "idle":
+        load = start_load(args, workdir, get_lower_priority_command(args.nice) if scenario == "background" else [])
+    try:
+        results = multiprocessing.Queue()
+        game = multiprocessing.Process(target=render, args=(args.cpu, iterations, args.duration, results))
+        game.start()
+        frame_times = results.get()
+        game.join()
+    finally:
+        for process in load:
+            process.kill()
+            process.wait()
+
+    return summarize(frame_times)
+
+
+def main() -> int:
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="sdh-gamesync-priority-")).resolve()
+
+    # decky has to point to the work directory before any plugin module gets imported
+    os.environ["DECKY_BENCH_HOME"] = str(workdir / "decky")
+    sys.path[:0] = [str(BENCH_DIR), str(REPO_DIR / "py_modules"), str(REPO_DIR)]
+
+    try:
+        os.sched_setaffinity(0, {args.cpu})
+        iterations = calibrate(args.frame_work_ms)
+        os.sched_setaffinity(0, range(os.cpu_count() or 1))
+        results = {scenario: run_scenario(args, workdir, scenario, iterations) for scenario in SCENARIOS}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "load": "rclone" if args.rclone else f"{args.workers} synthetic workers",
+        "frame_work_ms": args.frame_work_ms,
+        "nice": args.nice,
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    ratio = results["background"]["p99_ms"] / max(results["idle"]["p99_ms"], 1e-6)
+    if ratio > args.threshold:
+        print(f"p99 frame time with background load is {ratio:.2f}x the idle one, over {args.threshold}x", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Stand-in of the settings module provided by Decky Loader.
+"""
+
+from typing import Any
+import json, os
+
+
+class SettingsManager:
+    def __init__(self, name: str, settings_directory: str):
+        self.path = os.path.join(settings_directory, f"{name}.json")
+        self.settings: dict[str, Any] = dict()
+        if os.path.exists(self.path):
+            self.read()
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.settings = json.load(f)
+
+    def commit(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.settings, f, indent=4, ensure_ascii=False)
+
+    def getSetting(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+    def setSetting(self, key: str, value: Any):
+        self.settings[key] = value
+        self.commit()
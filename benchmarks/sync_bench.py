@@ -0,0 +1,394 @@
+"""
+End-to-end sync benchmark of the backend, from Plugin.sync_local_first down to the rclone process.
+
+A local alias remote stands in for "cloud:", synthetic save trees are generated for each shape,
+and every shape is synced in COPY, SYNC and BISYNC mode. Results are written as JSON.
+
+Usage:
+python benchmarks/sync_bench.py --rclone /usr/bin/rclone --output bench.json
+python benchmarks/sync_bench.py --shape many=20000,512,3 --modes copy --baseline bench.json
+"""
+
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+import argparse, asyncio, json, os, platform, random, shutil, statistics, subprocess, sys, tempfile, time
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+# name: (number of files, bytes per file, directory depth)
+SHAPES = {
+    "tiny": (5000, 1024, 2),
+    "huge": (4, 64 * 1024 * 1024, 0),
+    "deep": (1000, 4096, 24),
+}
+MODES = ["copy", "sync", "bisync"]
+PHASES = ["initial", "unchanged", "modified"]
+GAME_APP_ID = 1
+GLOBAL_APP_ID = 0
+MODIFIED_RATIO = 0.01
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rclone", default=shutil.which("rclone"), help="Path of the rclone binary")
+    parser.add_argument(
+        "--shapes", default=",".join(SHAPES), help=f"Comma separated built-in shapes, from {list(SHAPES)}"
+    )
+    parser.add_argument(
+        "--shape",
+        action="append",
+        default=[],
+        metavar="NAME=FILES,SIZE,DEPTH",
+        help="Add a custom shape, can be repeated",
+    )
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma separated modes, from {MODES}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each phase")
+    parser.add_argument("--daemon", action="store_true", help="Run syncs through the rclone daemon")
+    parser.add_argument("--workdir", help="Directory for the trees and the remote, a temporary one by default")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory after the run")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help="Compare the median wall times against a previous JSON result")
+    parser.add_argument(
+        "--threshold", type=float, default=1.2, help="Max ratio to the baseline before failing, 1.2 by default"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Print the plugin logs")
+
+    args = parser.parse_args()
+    if not args.rclone:
+        parser.error("rclone not found, specify it with --rclone")
+
+    shapes = {}
+    for name in filter(None, args.shapes.split(",")):
+        if name not in SHAPES:
+            parser.error(f"Unknown shape {name}")
+        shapes[name] = SHAPES[name]
+    for shape in args.shape:
+        try:
+            name, spec = shape.split("=")
+            files, size, depth = (int(value) for value in spec.split(","))
+        except ValueError:
+            parser.error(f"Malformed shape {shape}")
+        shapes[name] = (files, size, depth)
+    args.shapes = shapes
+
+    args.modes = [mode for mode in args.modes.split(",") if mode]
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error(f"Unknown mode {mode}")
+
+    return args
+
+
+def generate_tree(root: Path, files: int, size: int, depth: int, seed: int = 0) -> list[Path]:
+    """
+    Generates a synthetic save tree, files are spread over a chain of nested directories.
+
+    Parameters:
+    root (Path): Root of the tree, it will be recreated.
+    files (int): Number of files.
+    size (int): Size of each file in bytes.
+    depth (int): Depth of the deepest directory.
+    seed (int): Seed of the file contents.
+
+    Returns:
+    list[Path]: Paths of the generated files.
+    """
+    shutil.rmtree(root, ignore_errors=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        directory = root.joinpath(*[f"d{level}" for level in range(i % (depth + 1))])
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"f{i}.sav"
+        with path.open("wb") as f:
+            remaining = size
+            while remaining > 0:
+                chunk = min(remaining, 1024 * 1024)
+                f.write(rng.randbytes(chunk))
+                remaining -= chunk
+        paths.append(path)
+
+    return paths
+
+
+def modify_tree(paths: list[Path], run: int) -> tuple[int, int]:
+    """
+    Rewrites a part of the files in a tree.
+
+    Parameters:
+    paths (list[Path]): Paths of the files in the tree.
+    run (int): Index of the run, a different set of files gets modified each run.
+
+    Returns:
+    tuple[int, int]: Number of files and bytes modified.
+    """
+    count = max(1, int(len(paths) * MODIFIED_RATIO))
+    rng = random.Random(run)
+    total_bytes = 0
+    for path in rng.sample(paths, count):
+        size = path.stat().st_size
+        with path.open("r+b") as f:
+            f.write(rng.randbytes(min(size, 4096)))
+        # make sure the change is visible even if mtime has a coarse resolution
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + run + 1))
+        total_bytes += size
+
+    return count, total_bytes
+
+
+def get_rclone_version(rclone: str) -> str:
+    """
+    Returns the first line of "rclone version".
+    """
+    output = subprocess.run([rclone, "version"], capture_output=True, text=True).stdout
+    return output.splitlines()[0] if output else "unknown"
+
+
+async def measure_spawn_overhead(rclone: str, samples: int = 10) -> dict[str, float]:
+    """
+    Measures the time for spawning rclone and waiting for it to exit, with a command doing no work.
+
+    Parameters:
+    rclone (str): Path of the rclone binary.
+    samples (int): Number of samples.
+
+    Returns:
+    dict[str, float]: Median and min seconds.
+    """
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            rclone, "version", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        await process.wait()
+        times.append(time.perf_counter() - start)
+
+    return {"median_s": statistics.median(times), "min_s": min(times)}
+
+
+async def measure_rc_overhead(samples: int = 10) -> dict[str, float]:
+    """
+    Measures the round trip time of a no-op call to the rclone daemon.
+    """
+    from rclone_manager import RcloneManager
+
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await RcloneManager.rc_call("rc/noop", {})
+        times.append(time.perf_counter() - start)
+
+    return {"median_s": statistics.median(times), "min_s": min(times)}
+
+
+async def time_runs(
+    runs: int, prepare: Callable[[int], tuple[int, int]], sync: Callable[[], Awaitable[int]]
+) -> dict[str, Any]:
+    """
+    Times a sync phase.
+
+    Parameters:
+    runs (int): Number of runs.
+    prepare (Callable[[int], tuple[int, int]]): Called before each run with the run index,
+                                                returns the number of files and bytes the run handles.
+    sync (Callable[[], Awaitable[int]]): The sync to be timed, returns the exit code.
+
+    Returns:
+    dict[str, Any]: Summary of the runs.
+    """
+    times = []
+    exit_codes = []
+    files = total_bytes = 0
+    for run in range(runs):
+        files, total_bytes = prepare(run)
+        start = time.perf_counter()
+        exit_codes.append(await sync())
+        times.append(time.perf_counter() - start)
+
+    median = statistics.median(times)
+    return {
+        "runs": runs,
+        "exit_codes": exit_codes,
+        "ok": all(code in (0, 6) for code in exit_codes),
+        "wall_time_s": {"median": median, "min": min(times), "max": max(times)},
+        "files": files,
+        "bytes": total_bytes,
+        "files_per_s": files / median if median else None,
+        "bytes_per_s": total_bytes / median if median else None,
+    }
+
+
+async def bench_mode(
+    plugin: Any, mode: str, shape: str, tree: Path, paths: list[Path], remote: Path, repeat: int
+) -> list[dict[str, Any]]:
+    """
+    Benchmarks all phases of a mode on a tree.
+    """
+    import decky
+    from common_defs import RCLONE_BISYNC_CACHE_DIR
+    from config import Config
+    from filter_store import FilterStore, get_filter_target
+
+    app_id = GLOBAL_APP_ID if mode == "bisync" else GAME_APP_ID
+    destination = f"bench/{shape}-{mode}"
+    manifest = Path(decky.DECKY_PLUGIN_SETTINGS_DIR) / f"{get_filter_target(app_id)}.manifest"
+
+    Config.set_config("sync_root", str(tree))
+    Config.set_config("sync_destination", destination)
+    Config.set_config("strict_game_sync", mode == "sync")
+    FilterStore.set_many({get_filter_target(app_id): ["+ **"], "shared": []})
+
+    tree_stat = (len(paths), sum(path.stat().st_size for path in paths))
+
+    def reset_remote(_: int) -> tuple[int, int]:
+        shutil.rmtree(remote / destination, ignore_errors=True)
+        shutil.rmtree(RCLONE_BISYNC_CACHE_DIR, ignore_errors=True)
+        manifest.unlink(missing_ok=True)
+        return tree_stat
+
+    def unchanged(_: int) -> tuple[int, int]:
+        # the manifest would skip the upload without running rclone
+        manifest.unlink(missing_ok=True)
+        return tree_stat
+
+    def modified(run: int) -> tuple[int, int]:
+        manifest.unlink(missing_ok=True)
+        return modify_tree(paths, run)
+
+    async def initial_sync() -> int:
+        if mode == "bisync":
+            return await plugin.resync_local_first()
+        return await plugin.sync_local_first(app_id)
+
+    results = []
+    for phase, prepare, sync in (
+        ("initial", reset_remote, initial_sync),
+        ("unchanged", unchanged, lambda: plugin.sync_local_first(app_id)),
+        ("modified", modified, lambda: plugin.sync_local_first(app_id)),
+    ):
+        result = await time_runs(repeat, prepare, sync)
+        results.append({"shape": shape, "mode": mode, "phase": phase, **result})
+        print(
+            f"{shape:>10} {mode:>7} {phase:>10}: {result['wall_time_s']['median']:.3f}s"
+            + ("" if result["ok"] else f" (exit codes {result['exit_codes']})"),
+            file=sys.stderr,
+        )
+
+    return results
+
+
+async def bench(args: argparse.Namespace, workdir: Path) -> dict[str, Any]:
+    """
+    Runs the benchmark.
+    """
+    import decky
+    from common_defs import RCLONE_BIN_PATH, RCLONE_CFG_PATH
+    from config import Config
+    from rclone_manager import RcloneManager
+    from main import Plugin
+
+    decky.logger.setLevel("DEBUG" if args.verbose else "WARNING")
+
+    remote = workdir / "remote"
+    remote.mkdir(parents=True, exist_ok=True)
+    RCLONE_CFG_PATH.write_text(f"[cloud]\ntype = alias\nremote = {remote}\n")
+    RCLONE_BIN_PATH.unlink(missing_ok=True)
+    RCLONE_BIN_PATH.symlink_to(Path(args.rclone).resolve())
+
+    Config.set_config("rclone_daemon", args.daemon)
+    report = {
+        "schema": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rclone": get_rclone_version(args.rclone),
+        "daemon": args.daemon,
+        "repeat": args.repeat,
+        "spawn_overhead": await measure_spawn_overhead(args.rclone),
+        "results": [],
+    }
+
+    plugin = Plugin()
+    if args.daemon:
+        if not await RcloneManager.start_daemon():
+            raise RuntimeError("Failed to start the rclone daemon")
+        report["rc_overhead"] = await measure_rc_overhead()
+
+    try:
+        for shape, (files, size, depth) in args.shapes.items():
+            tree = workdir / "trees" / shape
+            paths = generate_tree(tree, files, size, depth)
+            for mode in args.modes:
+                report["results"].extend(
+                    await bench_mode(plugin, mode, shape, tree, paths, remote, args.repeat)
+                )
+            shutil.rmtree(tree, ignore_errors=True)
+    finally:
+        if args.daemon:
+            await RcloneManager.stop_daemon()
+        Config.flush()
+
+    return report
+
+
+def compare(report: dict[str, Any], baseline_path: str, threshold: float) -> bool:
+    """
+    Compares the median wall times against a baseline.
+
+    Parameters:
+    report (dict[str, Any]): The current result.
+    baseline_path (str): Path of the baseline result.
+    threshold (float): Max ratio to the baseline.
+
+    Returns:
+    bool: False if any of the results is slower than the threshold allows.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = {
+            (result["shape"], result["mode"], result["phase"]): result["wall_time_s"]["median"]
+            for result in json.load(f)["results"]
+        }
+
+    passed = True
+    for result in report["results"]:
+        key = (result["shape"], result["mode"], result["phase"])
+        if not baseline.get(key):
+            continue
+        ratio = result["wall_time_s"]["median"] / baseline[key]
+        result["baseline_ratio"] = ratio
+        if ratio > threshold:
+            passed = False
+            print(f"Regression in {'/'.join(key)}: {ratio:.2f}x of the baseline", file=sys.stderr)
+
+    return passed
+
+
+def main() -> int:
+    args = parse_args()
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="sdh-gamesync-bench-")).resolve()
+
+    # decky has to point to the work directory before any plugin module gets imported
+    os.environ["DECKY_BENCH_HOME"] = str(workdir / "decky")
+    sys.path[:0] = [str(BENCH_DIR), str(REPO_DIR / "py_modules"), str(REPO_DIR)]
+
+    try:
+        report = asyncio.run(bench(args, workdir))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    passed = compare(report, args.baseline, args.threshold) if args.baseline else True
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,14 @@
-import signal
 from typing import Any
 
 from common_defs import *
 from config import Config
+from dirty_watcher import DirtyWatcher
+from filter_store import FilterStore, get_filter_app_id, get_filter_target
 import utils
 from rclone_manager import RcloneManager
+from rpc_dispatcher import RpcDispatcher
+from sync_priority import SyncPriority
+from sync_scheduler import SyncScheduler
 from sync_target import *
 
 
@@ -24,9 +28,13 @@ class Plugin:
         logger.debug("Executing get_cloud_type()")
         return RcloneManager.get_cloud_type()
 
+    async def get_remotes(self) -> dict[str, dict[str, Any]]:
+        logger.debug("Executing get_remotes()")
+        return RcloneManager.get_remotes()
+
     async def update_rclone(self):
         logger.debug("Executing update_rclone()")
-        return RcloneManager.update_rclone()
+        return await RpcDispatcher.run("update_rclone", RcloneManager.update_rclone, timeout=600)
 
     # Sync Paths
 
@@ -46,13 +54,36 @@ class Plugin:
         logger.debug("Executing set_shared_filters(path=%s)", paths)
         return GlobalSyncTarget.set_shared_filters(paths)
 
+    async def get_filters_batch(self, app_ids: list[int] | None = None) -> dict[str, list[str]]:
+        logger.debug("Executing get_filters_batch(app_ids=%s)", app_ids)
+        targets = None if app_ids is None else [get_filter_target(app_id) for app_id in app_ids]
+        return {
+            str(get_filter_app_id(target)): filters
+            for target, filters in FilterStore.get_many(targets).items()
+        }
+
+    async def set_filters_batch(self, filters: dict[str, list[str]]) -> None:
+        logger.debug("Executing set_filters_batch(filters=%s)", filters)
+        FilterStore.set_many(
+            {get_filter_target(int(app_id)): paths for app_id, paths in filters.items()}
+        )
+
     async def get_available_filters(self) -> list[int]:
         logger.debug("Executing get_available_filters()")
         return utils.get_available_filters()
 
     async def test_syncpath(self, path: str) -> int:
         logger.debug("Executing test_syncpath(%s)", path)
-        return utils.test_syncpath(path)
+        try:
+            return await RpcDispatcher.run("test_syncpath", utils.test_syncpath, path)
+        except TimeoutError:
+            return -1
+
+    async def preview_sync(self, app_id: int, max_files: int = 1000) -> dict[str, Any]:
+        logger.debug("Executing preview_sync(app_id=%d)", app_id)
+        return await RpcDispatcher.run(
+            "preview_sync", get_sync_target(app_id).preview, max_files, timeout=60
+        )
 
     # Syncing
 
@@ -66,34 +97,87 @@ class Plugin:
 
     async def resync_local_first(self) -> int:
         logger.debug("Executing resync_local_first()")
-        return await GlobalSyncTarget().resync(RcloneSyncWinner.LOCAL)
+        return await self._resync(RcloneSyncWinner.LOCAL)
 
     async def resync_cloud_first(self) -> int:
         logger.debug("Executing resync_cloud_first()")
-        return await GlobalSyncTarget().resync(RcloneSyncWinner.CLOUD)
+        return await self._resync(RcloneSyncWinner.CLOUD)
+
+    async def plan_sync(self, app_id: int, winner: str) -> dict[str, Any]:
+        logger.debug("Executing plan_sync(app_id=%d, winner=%s)", app_id, winner)
+        return await get_sync_target(app_id).plan(RcloneSyncWinner(winner))
+
+    async def execute_plan(self, app_id: int, plan_id: str) -> int:
+        logger.debug("Executing execute_plan(app_id=%d, plan_id=%s)", app_id, plan_id)
+        sync_target = get_sync_target(app_id)
+        return await SyncScheduler.submit(
+            sync_target.id, f"plan {plan_id}", lambda: sync_target.execute_plan(plan_id)
+        )
+
+    async def cancel_sync(self, app_id: int) -> bool:
+        logger.debug("Executing cancel_sync(app_id=%d)", app_id)
+        sync_target = get_sync_target(app_id)
+        dropped = SyncScheduler.cancel(sync_target.id, SYNC_CANCELLED)
+        return sync_target.cancel() or (dropped > 0)
 
     async def sync_screenshot(self, user_id: int, screenshot_url: str) -> int:
         logger.debug("Executing sync_screenshot()")
-        return await CaptureSyncTarget(
+        return await CaptureUploadBatcher.upload(
             utils.getLocalScreenshotPath(user_id, screenshot_url)
-        ).sync()
+        )
+
+    async def start_dirty_watch(self, app_id: int) -> bool:
+        logger.debug("Executing start_dirty_watch(app_id=%d)", app_id)
+        if app_id <= 0:
+            return False
+        return await get_sync_target(app_id).start_dirty_watch()
+
+    async def get_sync_progress(self, app_id: int) -> dict[str, Any]:
+        logger.debug("Executing get_sync_progress(app_id=%d)", app_id)
+        return get_sync_target(app_id).get_progress()
+
+    async def get_mirror_results(self, app_id: int) -> dict[str, int]:
+        logger.debug("Executing get_mirror_results(app_id=%d)", app_id)
+        target = get_sync_target(app_id)
+        return target.get_mirror_results() if isinstance(target, GameSyncTarget) else {}
+
+    async def get_sync_stats(self, app_id: int, limit: int = 50) -> dict[str, Any]:
+        logger.debug("Executing get_sync_stats(app_id=%d, limit=%d)", app_id, limit)
+        return SyncStats.get_summary(get_sync_target(app_id).id, limit)
+
+    async def get_sync_tuning(self, app_id: int) -> dict[str, Any]:
+        logger.debug("Executing get_sync_tuning(app_id=%d)", app_id)
+        return SyncTuner.get_tuning(get_sync_target(app_id).id, Config.get_config_item("sync_remote"))
+
+    async def set_game_running(self, app_id: int, running: bool) -> None:
+        logger.debug("Executing set_game_running(app_id=%d, running=%s)", app_id, running)
+        SyncPriority.set_game_running(app_id, running)
 
     async def delete_lock_files(self):
         logger.debug("Executing delete_lock_files()")
         return utils.delete_lock_files()
 
     async def _sync(self, winner: RcloneSyncWinner, app_id: int) -> int:
-        return await get_sync_target(app_id).sync(winner)
+        sync_target = get_sync_target(app_id)
+        return await SyncScheduler.submit(
+            sync_target.id, f"sync {winner.value}", lambda: sync_target.sync(winner)
+        )
+
+    async def _resync(self, winner: RcloneSyncWinner) -> int:
+        sync_target = GlobalSyncTarget()
+        return await SyncScheduler.submit(
+            sync_target.id, f"resync {winner.value}", lambda: sync_target.resync(winner)
+        )
 
     # Processes
 
     async def pause_process(self, pid: int) -> None:
         logger.debug("Executing pause_process(pid=%d)", pid)
-        utils.send_signal(pid, signal.SIGSTOP)
+        await RpcDispatcher.run("pause_process", utils.pause_process, pid, timeout=10)
 
     async def resume_process(self, pid: int) -> None:
         logger.debug("Executing resume_process(pid=%d)", pid)
-        utils.send_signal(pid, signal.SIGCONT)
+        await RpcDispatcher.run("resume_process", utils.resume_process, pid, timeout=10)
 
     # Configuration
 
@@ -104,6 +188,8 @@ class Plugin:
     async def set_config(self, key: str, value: Any):
         logger.debug("Executing set_config(key=%s, value=%s)", key, value)
         Config.set_config(key, value)
+        if key in ("rclone_daemon", "additional_sync_args"):
+            await RcloneManager.restart_daemon()
 
     # Logger
 
@@ -121,11 +207,36 @@ class Plugin:
 
     async def get_last_sync_log(self, app_id: int) -> str:
         logger.debug("Executing get_last_sync_log(app_id=%d)", app_id)
-        return get_sync_target(app_id).get_last_sync_log()
+        return await RpcDispatcher.run(
+            "get_last_sync_log", get_sync_target(app_id).get_last_sync_log
+        )
 
     async def get_plugin_log(self) -> str:
         logger.debug("Executing get_plugin_log()")
-        return utils.get_plugin_log()
+        return await RpcDispatcher.run("get_plugin_log", utils.get_plugin_log)
+
+    async def get_last_sync_log_page(
+        self, app_id: int, offset: int = -1, limit: int = 200, direction: str = "tail"
+    ) -> dict[str, Any]:
+        logger.debug(
+            "Executing get_last_sync_log_page(app_id=%d, offset=%d, limit=%d, direction=%s)",
+            app_id, offset, limit, direction,
+        )
+        return await RpcDispatcher.run(
+            "get_last_sync_log_page",
+            get_sync_target(app_id).get_last_sync_log_page, offset, limit, direction,
+        )
+
+    async def get_plugin_log_page(
+        self, offset: int = -1, limit: int = 200, direction: str = "tail"
+    ) -> dict[str, Any]:
+        logger.debug(
+            "Executing get_plugin_log_page(offset=%d, limit=%d, direction=%s)",
+            offset, limit, direction,
+        )
+        return await RpcDispatcher.run(
+            "get_plugin_log_page", utils.get_plugin_log_page, offset, limit, direction
+        )
 
     # Lifecycle
 
@@ -136,9 +247,16 @@ class Plugin:
         logger.debug("rclone bin path: %s", RCLONE_BIN_PATH)
         logger.debug("rclone cfg path: %s", RCLONE_CFG_PATH)
 
+        # Persist defaults of new config entries
+        Config.flush()
+        await RcloneManager.start_daemon()
+
     async def _unload(self):
-        RcloneManager.kill_current_spawn()
+        DirtyWatcher.stop_all()
+        RpcDispatcher.shutdown()
+        await RcloneManager.kill_current_spawn()
+        await RcloneManager.stop_daemon()
+        Config.flush()
 
     async def _migration(self):
-        # plugin_config.migrate()
-        pass
+        Config.migrate()
@@ -0,0 +1,349 @@
+from pathlib import Path
+from typing import Any
+import hashlib, json, mmap, os, random, zlib
+
+from common_defs import *
+from rclone_filter import RcloneFilter
+
+CHUNK_INDEX_NAME = "index.json"
+CHUNK_INDEX_VERSION = 1
+CHUNK_MIN_SIZE = 512 * 1024
+CHUNK_MAX_SIZE = 4 * 1024 * 1024
+# a boundary candidate is where the low CHUNK_MASK_BITS of the window hash are zero, 1 MiB apart on average
+CHUNK_MASK_BITS = 20
+# a power of 2, the low 16 bits of the window hash come from the last 16 bytes, the rest from the crc32 of the window
+CHUNK_WINDOW = 16
+# bytes per window hash, large enough to hold the sum of gear[byte] << age without carrying into the next one
+_SLOT_SIZE = 3
+_BLOCK_SIZE = 2 * 1024 * 1024
+_GEAR = random.Random(0x5D6).randbytes(256)
+
+
+def _find_candidates(data: bytes, start: int) -> list[int]:
+    """
+    Finds the positions where a chunk may end, i.e. where the hash of the CHUNK_WINDOW bytes before is zero in the
+    low CHUNK_MASK_BITS bits. The hash is the sum of gear[byte] << age over the window, extended by its crc32,
+    so that the content decides the boundaries and an insertion only moves the ones around it.
+
+    The window hashes of all positions are computed at once, with each byte spread into a slot of a big integer
+    and shifted additions summing the windows, as a per byte loop is way too slow in Python.
+
+    Parameters:
+    data (bytes): The data to search.
+    start (int): Offset of the data in the file.
+
+    Returns:
+    list[int]: Offsets in the file right after each candidate window, in ascending order.
+    """
+    size = len(data)
+    spread = bytearray(size * _SLOT_SIZE)
+    spread[::_SLOT_SIZE] = data.translate(_GEAR)
+    hashes = int.from_bytes(spread, "little")
+    del spread
+    # each step doubles the window, adding the sums of the previous window shifted by one slot per byte plus 1 bit per age
+    window = 1
+    while window < CHUNK_WINDOW:
+        hashes += hashes << ((8 * _SLOT_SIZE + 1) * window)
+        window *= 2
+    hashes = hashes.to_bytes((size + CHUNK_WINDOW + 1) * _SLOT_SIZE, "little")
+
+    # the low 16 bits are checked by searching for zero bytes, the remaining bits only for those candidates
+    low_bits = (
+        int.from_bytes(hashes[0 : size * _SLOT_SIZE : _SLOT_SIZE], "little")
+        | int.from_bytes(hashes[1 : size * _SLOT_SIZE : _SLOT_SIZE], "little")
+    ).to_bytes(size, "little")
+    high_mask = (1 << (CHUNK_MASK_BITS - 16)) - 1
+
+    candidates = []
+    i = low_bits.find(0, CHUNK_WINDOW - 1)
+    while i != -1:
+        if not zlib.crc32(data[i + 1 - CHUNK_WINDOW : i + 1]) & high_mask:
+            candidates.append(start + i + 1)
+        i = low_bits.find(0, i + 1)
+
+    return candidates
+
+
+def find_boundaries(data: bytes) -> list[int]:
+    """
+    Splits data into chunks of CHUNK_MIN_SIZE to CHUNK_MAX_SIZE bytes at content-defined boundaries.
+
+    Parameters:
+    data (bytes): The data, e.g. a mmap of a file.
+
+    Returns:
+    list[int]: End offset of each chunk, the last one is the size of the data.
+    """
+    size = len(data)
+    candidates = []
+    for start in range(0, size, _BLOCK_SIZE):
+        # overlap with the previous block so that windows across blocks are covered
+        offset = max(0, start - CHUNK_WINDOW + 1)
+        candidates.extend(
+            i for i in _find_candidates(data[offset : start + _BLOCK_SIZE], offset) if i > start
+        )
+
+    boundaries = []
+    chunk_start = 0
+    candidates.reverse()
+    while chunk_start < size:
+        while candidates and candidates[-1] < chunk_start + CHUNK_MIN_SIZE:
+            candidates.pop()
+        if candidates and candidates[-1] <= chunk_start + CHUNK_MAX_SIZE:
+            chunk_start = candidates.pop()
+        else:
+            chunk_start = min(chunk_start + CHUNK_MAX_SIZE, size)
+        boundaries.append(chunk_start)
+
+    return boundaries
+
+
+def chunk_file(path: str) -> list[list]:
+    """
+    Splits a file into chunks.
+
+    Parameters:
+    path (str): Path of the file.
+
+    Returns:
+    list[list]: [sha256, size] of each chunk.
+
+    Raises:
+    OSError: If the file cannot be read.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunks = []
+            chunk_start = 0
+            for chunk_end in find_boundaries(data):
+                chunks.append([hashlib.sha256(data[chunk_start:chunk_end]).hexdigest(), chunk_end - chunk_start])
+                chunk_start = chunk_end
+
+    return chunks
+
+
+def get_chunk_path(chunk_hash: str) -> str:
+    """
+    Returns the path of a chunk relative to the chunk folder.
+
+    Parameters:
+    chunk_hash (str): sha256 of the chunk.
+
+    Returns:
+    str: The relative path, e.g. "ab/abcdef...".
+    """
+    return f"{chunk_hash[:2]}/{chunk_hash}"
+
+
+def get_chunk_hashes(entries: dict[str, list]) -> set[str]:
+    """
+    Collects the hashes of the chunks of all files.
+
+    Parameters:
+    entries (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each file.
+
+    Returns:
+    set[str]: The chunk hashes.
+    """
+    return {chunk_hash for entry in entries.values() for chunk_hash, _ in entry[2]}
+
+
+def _check_path(path: str):
+    """
+    Rejects paths that would get written out of the sync root.
+
+    Raises:
+    ValueError: If the path is absolute or contains "..".
+    """
+    if os.path.isabs(path) or ".." in Path(path).parts:
+        raise ValueError(f"Invalid path in chunk index: {path}")
+
+
+def scan(root: str, sync_filter: RcloneFilter, min_size: int, cache: dict[str, list]) -> dict[str, list]:
+    """
+    Chunks the local files matching the filter that are larger than min_size,
+    chunks of files unchanged since they were cached are reused.
+
+    Parameters:
+    root (str): The sync root.
+    sync_filter (RcloneFilter): Filter of the sync target.
+    min_size (int): Files of this size or smaller are skipped.
+    cache (dict[str, list]): Entries from the last sync.
+
+    Returns:
+    dict[str, list]: Relative path to [size, mtime_ns, chunks] of each file, see chunk_file for chunks.
+    """
+    entries = dict()
+    for path, stat in sync_filter.walk(root):
+        if stat.st_size <= min_size:
+            continue
+        if (entry := cache.get(path)) and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            entries[path] = entry
+            continue
+        try:
+            entries[path] = [stat.st_size, stat.st_mtime_ns, chunk_file(os.path.join(root, path))]
+        except OSError as e:
+            logger.warning(f"Failed to chunk {path}: {e}")
+
+    return entries
+
+
+def merge_index(root: str, local: dict[str, list], remote: dict[str, list]) -> dict[str, list]:
+    """
+    Builds the index of an upload that keeps the files only on the cloud, like the rclone copy does.
+    Files that exist locally but are not chunked anymore, e.g. shrunk to "chunk_file_size" or smaller,
+    are dropped, as the rclone copy uploads them and a download must not rebuild their old version.
+
+    Parameters:
+    root (str): The sync root.
+    local (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each local chunked file.
+    remote (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each file in the index on the cloud.
+
+    Returns:
+    dict[str, list]: The local files and the files of the cloud index missing locally.
+    """
+    index = {path: entry for path, entry in remote.items() if not os.path.lexists(os.path.join(root, path))}
+    index.update(local)
+    return index
+
+
+def stage_chunks(root: str, entries: dict[str, list], chunk_hashes: set[str], chunk_dir: Path) -> list[str]:
+    """
+    Copies chunks out of the local files into the chunk folder, to be uploaded.
+
+    Parameters:
+    root (str): The sync root.
+    entries (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each file.
+    chunk_hashes (set[str]): Hashes of the chunks to copy.
+    chunk_dir (Path): The chunk folder.
+
+    Returns:
+    list[str]: Paths of the copied chunks relative to the chunk folder.
+
+    Raises:
+    OSError: If a file cannot be read.
+    ValueError: If a file changed since it was chunked.
+    """
+    staged = dict()
+    for path, entry in entries.items():
+        with open(os.path.join(root, path), "rb") as f:
+            for chunk_hash, chunk_size in entry[2]:
+                if (chunk_hash not in chunk_hashes) or (chunk_hash in staged):
+                    f.seek(chunk_size, os.SEEK_CUR)
+                    continue
+                data = f.read(chunk_size)
+                if hashlib.sha256(data).hexdigest() != chunk_hash:
+                    raise ValueError(f"{path} changed while being synced")
+
+                chunk_path = chunk_dir / get_chunk_path(chunk_hash)
+                chunk_path.parent.mkdir(parents=True, exist_ok=True)
+                chunk_path.write_bytes(data)
+                staged[chunk_hash] = get_chunk_path(chunk_hash)
+
+    return list(staged.values())
+
+
+def assemble(root: str, entries: dict[str, list], local: dict[str, list], chunk_dir: Path):
+    """
+    Rebuilds files from chunks, taken from the chunk folder or the local files that contain them.
+    All files are written to temporary files first, and only moved into place once all of them are complete.
+
+    Parameters:
+    root (str): The sync root.
+    entries (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each file to rebuild.
+    local (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each local file.
+    chunk_dir (Path): The chunk folder with the chunks not in any local file.
+
+    Raises:
+    OSError: If a file cannot be read or written.
+    ValueError: If a path is unsafe, or a chunk is missing or doesn't match its hash.
+    """
+    sources = dict()
+    for path, entry in local.items():
+        offset = 0
+        for chunk_hash, chunk_size in entry[2]:
+            sources.setdefault(chunk_hash, (path, offset))
+            offset += chunk_size
+
+    tmp_paths = dict()
+    try:
+        for path, entry in entries.items():
+            _check_path(path)
+            target = os.path.join(root, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_paths[path] = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_paths[path], "wb") as dst:
+                for chunk_hash, chunk_size in entry[2]:
+                    dst.write(_read_chunk(root, chunk_dir, sources, chunk_hash, chunk_size))
+
+        for path, tmp_path in list(tmp_paths.items()):
+            mtime_ns = entries[path][1]
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+            os.replace(tmp_path, os.path.join(root, path))
+            del tmp_paths[path]
+    finally:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def _read_chunk(
+    root: str, chunk_dir: Path, sources: dict[str, tuple[str, int]], chunk_hash: str, chunk_size: int
+) -> bytes:
+    """
+    Reads a chunk from the local file containing it, or the chunk folder otherwise.
+
+    Raises:
+    OSError: If the chunk cannot be read.
+    ValueError: If the chunk doesn't match its hash.
+    """
+    if source := sources.get(chunk_hash):
+        with open(os.path.join(root, source[0]), "rb") as f:
+            f.seek(source[1])
+            data = f.read(chunk_size)
+        if hashlib.sha256(data).hexdigest() == chunk_hash:
+            return data
+
+    try:
+        data = (chunk_dir / get_chunk_path(chunk_hash)).read_bytes()
+    except FileNotFoundError:
+        raise ValueError(f"Chunk {chunk_hash} is missing")
+    if hashlib.sha256(data).hexdigest() != chunk_hash:
+        raise ValueError(f"Chunk {chunk_hash} doesn't match its hash")
+
+    return data
+
+
+def read_index(path: Path) -> dict[str, list] | None:
+    """
+    Reads the entries of a chunk index.
+
+    Parameters:
+    path (Path): Path of the index.
+
+    Returns:
+    dict[str, list] | None: Relative path to [size, mtime_ns, chunks] of each file, None if it doesn't exist or cannot be read.
+    """
+    try:
+        with path.open("r") as f:
+            index: dict[str, Any] = json.load(f)
+        if index.get("version") != CHUNK_INDEX_VERSION:
+            logger.warning(f"Unsupported chunk index version: {index.get('version')}")
+            return None
+        return index["files"]
+    except Exception:
+        return None
+
+
+def write_index(path: Path, entries: dict[str, list]):
+    """
+    Writes the entries of chunked files to an index.
+
+    Parameters:
+    path (Path): Path of the index.
+    entries (dict[str, list]): Relative path to [size, mtime_ns, chunks] of each file.
+    """
+    with path.open("w") as f:
+        json.dump({"version": CHUNK_INDEX_VERSION, "files": entries}, f)
@@ -2,7 +2,7 @@ import decky
 
 from pathlib import Path
 from enum import Enum
-import ssl, certifi
+from functools import cache
 
 RCLONE_PORT = 53682
 
@@ -12,6 +12,13 @@ PLUGIN_CONFIG_DIR = Path(decky.DECKY_PLUGIN_SETTINGS_DIR)
 RCLONE_BIN_PATH = Path(decky.DECKY_PLUGIN_RUNTIME_DIR) / "rclone"
 RCLONE_CFG_PATH = PLUGIN_CONFIG_DIR / "rclone.conf"
 RCLONE_BISYNC_CACHE_DIR = Path(decky.HOME) / ".cache/rclone/bisync"
+RCLONE_RC_SOCKET_PATH = Path(decky.DECKY_PLUGIN_RUNTIME_DIR) / "rclone-rcd.sock"
+RCLONE_RCD_LOG_PATH = Path(decky.DECKY_PLUGIN_LOG_DIR) / "rclone-rcd.log"
+RCLONE_OUTPUT_LINE_LIMIT = 1024 * 1024
+
+# exit codes of syncs stopped by the plugin, -1 is a sync that cannot run and rclone's own are >= 0
+SYNC_TIMED_OUT = -2
+SYNC_CANCELLED = -3
 
 GLOBAL_SYNC_ID = "global"
 SHARED_FILTER_NAME = "shared"
@@ -22,7 +29,19 @@ SYNC_FILTER_TYPE_DICT = {
 }
 
 logger = decky.logger
-ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+
+@cache
+def get_ssl_context() -> "ssl.SSLContext":
+    """
+    Creates the SSL context for downloads on first use, loading ssl and the certifi bundle takes a while.
+
+    Returns:
+    ssl.SSLContext: The SSL context, trusting the certifi CA bundle.
+    """
+    import ssl, certifi
+
+    return ssl.create_default_context(cafile=certifi.where())
 
 
 class RcloneSyncMode(Enum):
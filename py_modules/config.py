@@ -1,20 +1,88 @@
 import decky
 
+from asyncio import TimerHandle
 from typing import Any
-import json
+import asyncio, json, os
 
 from settings import SettingsManager
 from common_defs import *
 
+CONFIG_FLUSH_DELAY = 1.0
+# version of the stored configuration, see Config.migrate
+CONFIG_VERSION = 1
+# default of additional_sync_args up to config version 1, these flags are now picked per backend and target
+LEGACY_SYNC_ARGS = [["--ignore-checksum"], ["--transfers", "8"], ["--checkers", "16"]]
+
+
+def remove_legacy_sync_args(args: list[str]) -> list[str]:
+    """
+    Removes the flags of the old default of additional_sync_args, if all of them are present.
+
+    Parameters:
+    args (list[str]): The stored additional sync args.
+
+    Returns:
+    list[str]: The args without the old defaults, unchanged if any of them got changed or removed by the user.
+    """
+    removed = set()
+    for flag in LEGACY_SYNC_ARGS:
+        start = next((i for i in range(len(args)) if args[i:i + len(flag)] == flag), None)
+        if start is None:
+            return list(args)
+        removed.update(range(start, start + len(flag)))
+
+    return [arg for i, arg in enumerate(args) if i not in removed]
+
 
 class Config():
-    _config = SettingsManager("config", decky.DECKY_PLUGIN_SETTINGS_DIR)
-    _default_config = dict()
-    try:
-        with PLUGIN_DEFAULT_CONFIG_PATH.open('r') as f:
-            _default_config.update(json.load(f))
-    except Exception as e:
-        logger.error("Failed to load default config: %s", e)
+    _config: SettingsManager | None = None
+    _default_config: dict[str, Any] = dict()
+    _settings: dict[str, Any] | None = None
+    _dirty = False
+    _flush_handle: TimerHandle | None = None
+
+    @classmethod
+    def _load(cls) -> dict[str, Any]:
+        """
+        Loads the plugin configuration on first use instead of on import, so that importing the backend stays cheap.
+        Defaults are resolved once, reads are served from memory and writes are flushed in batches.
+
+        Returns:
+        dict[str, Any]: The plugin configuration merged over the default config.
+        """
+        if cls._settings is None:
+            cls._config = SettingsManager("config", decky.DECKY_PLUGIN_SETTINGS_DIR)
+            try:
+                with PLUGIN_DEFAULT_CONFIG_PATH.open('r') as f:
+                    cls._default_config.update(json.load(f))
+            except Exception as e:
+                logger.error("Failed to load default config: %s", e)
+
+            cls._settings = {**cls._default_config, **cls._config.settings}
+            cls._dirty = cls._settings != cls._config.settings
+
+        return cls._settings
+
+    @classmethod
+    def migrate(cls):
+        """
+        Upgrades a configuration stored by an older version of the plugin, each step runs once.
+        """
+        cls._load()
+        version = cls._config.settings.get("config_version", 0)
+        if version >= CONFIG_VERSION:
+            return
+
+        if version < 1:
+            args = cls._settings.get("additional_sync_args", [])
+            migrated = remove_legacy_sync_args(args)
+            if migrated != args:
+                logger.info("Removing old default flags from additional_sync_args: %s -> %s", args, migrated)
+                cls._settings["additional_sync_args"] = migrated
+
+        cls._settings["config_version"] = CONFIG_VERSION
+        cls._dirty = True
+        cls.flush()
 
     @classmethod
     def get_config(cls) -> dict[str, Any]:
@@ -24,11 +92,7 @@ class Config():
         Returns:
         dict[str, Any]: The plugin configuration.
         """
-        if not cls._config.settings:
-            cls._config.settings = cls._default_config
-            cls._config.commit()
-
-        return cls._config.settings
+        return dict(cls._load())
 
     @classmethod
     def get_config_item(cls, key: str) -> Any:
@@ -40,15 +104,9 @@ class Config():
 
         Returns:
         Any: The value of the configuration item.
-             If the config doesn't exist, the default value will be returned.
-             If the entry doesn't exist in the default config, the value from the default config fallback will be returned.
+             If the config doesn't exist, the value from the default config will be returned.
         """
-        value = cls.get_config().get(key)
-        if not value:
-            value = cls._default_config.get(key)
-            cls.set_config(key, value)
-
-        return value
+        return cls._load().get(key)
 
     @classmethod
     def get_config_items(cls, *keys: str)-> tuple[Any, ...]:
@@ -66,10 +124,68 @@ class Config():
     @classmethod
     def set_config(cls, key: str, value: Any):
         """
-        Sets a configuration key-value pair in the plugin configuration file.
+        Sets a configuration key-value pair in the plugin configuration,
+        the change is written to the configuration file after CONFIG_FLUSH_DELAY seconds without other changes.
 
         Parameters:
         key (str): The key to set.
         value (Any): The value to set for the key.
+
+        Raises:
+        TypeError: If the type of the value doesn't match the one in the default config.
+        """
+        cls._load()
+        default = cls._default_config.get(key)
+        if (default is not None) and not isinstance(value, type(default)):
+            if isinstance(default, float) and isinstance(value, int):
+                value = float(value)
+            else:
+                raise TypeError(
+                    f"Invalid type {type(value).__name__} for {key}, expected {type(default).__name__}"
+                )
+
+        if cls._settings.get(key) == value:
+            return
+
+        cls._settings[key] = value
+        cls._dirty = True
+        cls._schedule_flush()
+
+    @classmethod
+    def _schedule_flush(cls):
+        """
+        Schedules a flush of the configuration, or flushes it right away if there's no running event loop.
+        """
+        if cls._flush_handle:
+            cls._flush_handle.cancel()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            cls.flush()
+            return
+
+        cls._flush_handle = loop.call_later(CONFIG_FLUSH_DELAY, cls.flush)
+
+    @classmethod
+    def flush(cls):
+        """
+        Writes pending changes of the configuration to the configuration file atomically.
         """
-        cls._config.setSetting(key, value)
+        if cls._flush_handle:
+            cls._flush_handle.cancel()
+            cls._flush_handle = None
+        if not cls._dirty:
+            return
+
+        tmp_path = f"{cls._config.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cls._settings, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, cls._config.path)
+        except Exception as e:
+            logger.error("Failed to write config: %s", e)
+            return
+
+        cls._config.settings = dict(cls._settings)
+        cls._dirty = False
@@ -0,0 +1,269 @@
+from typing import Callable
+import asyncio, errno, os, struct
+
+from common_defs import *
+from rclone_filter import RcloneFilter
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+DIRTY_WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+DIRTY_WATCH_MAX_DIRS = 4096
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _get_libc() -> "ctypes.CDLL":
+    """
+    Loads libc for the inotify functions, which are not exposed by the standard library.
+    """
+    import ctypes
+
+    global _libc
+    if not _libc:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+    return _libc
+
+
+class DirtyWatcher:
+    _watchers: dict[str, "DirtyWatcher"] = dict()
+
+    def __init__(self, target_id: str, root: str, sync_filter: RcloneFilter, track_removals: bool):
+        self._target_id = target_id
+        self._root = root
+        self._filter = sync_filter
+        self._track_removals = track_removals
+        self._fd = -1
+        self._watches: dict[int, str] = dict()
+        self._dirty: set[str] = set()
+        self._removed: set[str] = set()
+        self._invalid_reason: str | None = None
+
+    @classmethod
+    async def start(
+        cls,
+        target_id: str,
+        root: str,
+        sync_filter: RcloneFilter,
+        track_removals: bool,
+        baseline_check: Callable[[], bool],
+    ) -> bool:
+        """
+        Starts recording the files changed under the sync root, replacing the running watcher of the target.
+
+        Parameters:
+        target_id (str): ID of the sync target.
+        root (str): The sync root.
+        sync_filter (RcloneFilter): Filter of the target, only matching files are recorded.
+        track_removals (bool): If removing a matching file makes the recorded changes unusable, for syncs that delete.
+        baseline_check (Callable[[], bool]): Checks if the local files match the last successful sync,
+                                             called in a worker thread after the watches are added.
+
+        Returns:
+        bool: True if the watcher got started.
+        """
+        cls.discard(target_id)
+
+        watcher = cls(target_id, root, sync_filter, track_removals)
+        try:
+            await asyncio.to_thread(watcher._setup, baseline_check)
+        except OSError as e:
+            logger.warning(f'Failed to watch "{target_id}": {e}')
+            watcher._close()
+            return False
+
+        asyncio.get_running_loop().add_reader(watcher._fd, watcher._read_events)
+        cls._watchers[target_id] = watcher
+        logger.info(f'Watching {len(watcher._watches)} directories of "{target_id}"')
+        return True
+
+    @classmethod
+    def pop(cls, target_id: str) -> "DirtyWatcher | None":
+        """
+        Removes the watcher of a target from the running ones, it should be stopped afterwards.
+
+        Parameters:
+        target_id (str): ID of the sync target.
+
+        Returns:
+        DirtyWatcher | None: The watcher, None if the target is not being watched.
+        """
+        return cls._watchers.pop(target_id, None)
+
+    @classmethod
+    def discard(cls, target_id: str):
+        """
+        Stops the watcher of a target if there's one.
+
+        Parameters:
+        target_id (str): ID of the sync target.
+        """
+        if watcher := cls.pop(target_id):
+            watcher.stop()
+
+    @classmethod
+    def stop_all(cls):
+        """
+        Stops all the watchers.
+        """
+        for target_id in list(cls._watchers):
+            cls.discard(target_id)
+
+    def stop(self) -> tuple[set[str], set[str]] | None:
+        """
+        Stops watching and returns the changes recorded.
+
+        Returns:
+        tuple[set[str], set[str]] | None: Relative paths of the files modified or created, and the ones removed.
+                                          None if the changes are incomplete and a full sync is required.
+        """
+        if self._fd >= 0:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._read_events()
+            self._close()
+
+        if self._invalid_reason:
+            logger.info(f'Changes of "{self._target_id}" are incomplete: {self._invalid_reason}')
+            return None
+
+        return self._dirty, self._removed
+
+    def _close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _invalidate(self, reason: str):
+        if not self._invalid_reason:
+            self._invalid_reason = reason
+
+    def _setup(self, baseline_check: Callable[[], bool]):
+        """
+        Creates the inotify instance and watches the directories that may contain matching files.
+
+        Parameters:
+        baseline_check (Callable[[], bool]): Checks if the local files match the last successful sync.
+
+        Raises:
+        OSError: If inotify is not available.
+        """
+        import ctypes
+
+        self._fd = _get_libc().inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self._watch_tree("")
+        if not baseline_check():
+            self._invalidate("local files changed since the last sync")
+
+    def _watch_tree(self, rel_dir: str) -> bool:
+        """
+        Watches a directory and its subdirectories that may contain matching files.
+
+        Parameters:
+        rel_dir (str): Relative path of the directory, "" for the sync root, otherwise with a trailing "/".
+
+        Returns:
+        bool: True if all the directories are watched.
+        """
+        import ctypes
+
+        for sub_dir in self._filter.walk_directories(self._root, rel_dir):
+            if len(self._watches) >= DIRTY_WATCH_MAX_DIRS:
+                self._invalidate(f"more than {DIRTY_WATCH_MAX_DIRS} directories to watch")
+                return False
+
+            path = os.path.join(self._root, sub_dir)
+            wd = _get_libc().inotify_add_watch(self._fd, os.fsencode(path), DIRTY_WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                self._invalidate(f"failed to watch {path}: {os.strerror(err)}")
+                return False
+            self._watches[wd] = sub_dir
+
+        return True
+
+    def _read_events(self):
+        """
+        Reads the pending inotify events and records the changes.
+        """
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    self._invalidate(f"failed to read events: {e}")
+                return
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self._handle_event(wd, mask, name)
+
+    def _handle_event(self, wd: int, mask: int, name: str):
+        """
+        Records the change of an inotify event.
+
+        Parameters:
+        wd (int): The watch descriptor.
+        mask (int): The event mask.
+        name (str): Name of the entry inside the watched directory, empty for events of the directory itself.
+        """
+        if mask & IN_Q_OVERFLOW:
+            self._invalidate("event queue overflowed")
+            return
+        if (rel_dir := self._watches.get(wd)) is None:
+            return
+        if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+            del self._watches[wd]
+            if not rel_dir:
+                self._invalidate("sync root removed")
+            return
+
+        rel_path = rel_dir + name
+        if mask & IN_ISDIR:
+            if not self._filter.include_directory(rel_path + "/"):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                # files may have been created before the directory got watched
+                if self._watch_tree(rel_path + "/"):
+                    for path, _ in self._filter.walk(self._root, rel_path + "/"):
+                        self._mark_dirty(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM) and self._track_removals:
+                self._invalidate(f"directory {rel_path} removed")
+        elif self._filter.include_file(rel_path):
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                if self._track_removals:
+                    self._invalidate(f"file {rel_path} removed")
+                self._dirty.discard(rel_path)
+                self._removed.add(rel_path)
+            else:
+                self._mark_dirty(rel_path)
+
+    def _mark_dirty(self, rel_path: str):
+        self._dirty.add(rel_path)
+        self._removed.discard(rel_path)
@@ -0,0 +1,246 @@
+import decky
+
+from pathlib import Path
+import hashlib, os, threading
+
+from common_defs import *
+
+FILTER_STORE_PATH = PLUGIN_CONFIG_DIR / "filters.db"
+FILTER_RENDER_DIR = Path(decky.DECKY_PLUGIN_RUNTIME_DIR) / "filters"
+
+
+def get_filter_target(app_id: int) -> str:
+    """
+    Returns the filter target ID of an app ID.
+
+    Parameters:
+    app_id (int): The app ID, 0 for global sync and -1 for the shared filter.
+
+    Returns:
+    str: The filter target ID, e.g. "123", "global" or "shared".
+    """
+    for target, target_app_id in SYNC_FILTER_TYPE_DICT.items():
+        if app_id == target_app_id:
+            return target
+    if app_id <= 0:
+        raise ValueError(f"Invalid app_id {app_id}")
+
+    return str(app_id)
+
+
+def get_filter_app_id(target: str) -> int | None:
+    """
+    Returns the app ID of a filter target ID.
+
+    Parameters:
+    target (str): The filter target ID, e.g. "123", "global" or "shared".
+
+    Returns:
+    int | None: The app ID, None if the target ID is invalid.
+    """
+    if target in SYNC_FILTER_TYPE_DICT:
+        return SYNC_FILTER_TYPE_DICT[target]
+    elif target.isdigit():
+        return int(target)
+
+    return None
+
+
+class FilterStore:
+    _connection: "sqlite3.Connection | None" = None
+    # the connection is shared by the event loop and the RPC worker threads, its users take turns
+    _lock = threading.RLock()
+
+    @classmethod
+    def _get_connection(cls) -> "sqlite3.Connection":
+        """
+        Opens the filter database, filter files of older versions are imported on the first open.
+        Callers hold _lock while they use the connection.
+
+        Returns:
+        sqlite3.Connection: The connection to the filter database.
+        """
+        if not cls._connection:
+            import sqlite3
+
+            connection = sqlite3.connect(
+                str(FILTER_STORE_PATH), check_same_thread=False, isolation_level=None
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS filters ("
+                "target TEXT PRIMARY KEY, rules TEXT NOT NULL, hash TEXT NOT NULL)"
+            )
+            cls._connection = connection
+            cls._import_filter_files()
+
+        return cls._connection
+
+    @classmethod
+    def _import_filter_files(cls):
+        """
+        Imports <target>.filter files in the settings folder into the database,
+        imported files are renamed to <target>.filter.migrated.
+        """
+        filters = dict()
+        for filter_file in PLUGIN_CONFIG_DIR.glob("*.filter"):
+            if get_filter_app_id(filter_file.stem) is None:
+                continue
+            with filter_file.open("r") as f:
+                filters[filter_file.stem] = f.read().splitlines()
+
+        if filters:
+            logger.info("Importing filter files: %s", list(filters))
+            cls.set_many(filters)
+            for target in filters:
+                (PLUGIN_CONFIG_DIR / f"{target}.filter").rename(
+                    PLUGIN_CONFIG_DIR / f"{target}.filter.migrated"
+                )
+
+    @classmethod
+    def get(cls, target: str) -> list[str]:
+        """
+        Retrieves the filter rules of a target.
+
+        Parameters:
+        target (str): The filter target ID.
+
+        Returns:
+        list[str]: The filter rules, empty if the target has no filter.
+        """
+        return cls.get_many([target]).get(target, [])
+
+    @classmethod
+    def get_many(cls, targets: list[str] | None = None) -> dict[str, list[str]]:
+        """
+        Retrieves the filter rules of multiple targets in one query.
+
+        Parameters:
+        targets (list[str] | None): The filter target IDs, None for all targets.
+
+        Returns:
+        dict[str, list[str]]: Target ID to its filter rules, targets without a filter are omitted.
+        """
+        if targets == []:
+            return dict()
+        with cls._lock:
+            if targets is None:
+                rows = cls._get_connection().execute("SELECT target, rules FROM filters").fetchall()
+            else:
+                rows = cls._get_connection().execute(
+                    f"SELECT target, rules FROM filters WHERE target IN ({','.join('?' * len(targets))})",
+                    targets,
+                ).fetchall()
+
+        return {target: rules.splitlines() for target, rules in rows}
+
+    @classmethod
+    def set(cls, target: str, rules: list[str]):
+        """
+        Updates the filter rules of a target.
+
+        Parameters:
+        target (str): The filter target ID.
+        rules (list[str]): The filter rules, elements inside should not contain '\\n'.
+                           The filter will be removed if there's no rule.
+        """
+        cls.set_many({target: rules})
+
+    @classmethod
+    def set_many(cls, filters: dict[str, list[str]]):
+        """
+        Updates the filter rules of multiple targets in one transaction.
+
+        Parameters:
+        filters (dict[str, list[str]]): Target ID to its filter rules, elements inside should not contain '\\n'.
+                                        Filters with no rule will be removed.
+        """
+        with cls._lock:
+            connection = cls._get_connection()
+            with connection:
+                connection.execute("BEGIN")
+                for target, rules in filters.items():
+                    content = "\n".join(stripped for rule in rules if (stripped := rule.strip()))
+                    if content:
+                        connection.execute(
+                            "INSERT OR REPLACE INTO filters (target, rules, hash) VALUES (?, ?, ?)",
+                            (target, content, hashlib.sha256(content.encode()).hexdigest()),
+                        )
+                    else:
+                        connection.execute("DELETE FROM filters WHERE target = ?", (target,))
+
+    @classmethod
+    def get_targets(cls) -> list[str]:
+        """
+        Retrieves the IDs of all targets that have a filter.
+
+        Returns:
+        list[str]: The filter target IDs.
+        """
+        with cls._lock:
+            return [row[0] for row in cls._get_connection().execute("SELECT target FROM filters")]
+
+    @classmethod
+    def has(cls, target: str) -> bool:
+        """
+        Checks if a target has a filter.
+
+        Parameters:
+        target (str): The filter target ID.
+
+        Returns:
+        bool: True if the target has a filter.
+        """
+        with cls._lock:
+            return bool(
+                cls._get_connection()
+                .execute("SELECT 1 FROM filters WHERE target = ?", (target,))
+                .fetchone()
+            )
+
+    @classmethod
+    def render(cls, target: str) -> Path:
+        """
+        Renders the filter of a target to a file for rclone's --filter-from.
+        Files are named by the target and the hash of their content, so they are only written once,
+        and the files of older rules of the target are removed when its rules change.
+
+        Parameters:
+        target (str): The filter target ID.
+
+        Returns:
+        Path: Path of the rendered filter file, it will be empty if the target has no filter.
+        """
+        with cls._lock:
+            row = (
+                cls._get_connection()
+                .execute("SELECT rules, hash FROM filters WHERE target = ?", (target,))
+                .fetchone()
+            )
+        rules, content_hash = row or ("", hashlib.sha256(b"").hexdigest())
+
+        filter_file = FILTER_RENDER_DIR / f"{target}.{content_hash}.filter"
+        if not filter_file.exists():
+            FILTER_RENDER_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = filter_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(rules)
+            os.replace(tmp_file, filter_file)
+            cls._remove_stale_renders(target, filter_file)
+
+        return filter_file
+
+    @classmethod
+    def _remove_stale_renders(cls, target: str, current: Path):
+        """
+        Removes the rendered files of older rules of a target,
+        along with files of older versions that were named by the hash of their content only.
+
+        Parameters:
+        target (str): The filter target ID.
+        current (Path): The rendered file of the current rules of the target, which is kept.
+        """
+        for filter_file in FILTER_RENDER_DIR.glob("*.filter"):
+            name = filter_file.name.removesuffix(".filter")
+            if filter_file == current:
+                continue
+            if (name.partition(".")[0] == target) or (("." not in name) and (len(name) == 64)):
+                filter_file.unlink(missing_ok=True)
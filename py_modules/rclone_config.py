@@ -0,0 +1,159 @@
+from typing import Any
+import configparser
+
+from common_defs import *
+
+# backend type: (hash types, precision of modification times in seconds or None if unsupported, server-side copy)
+RCLONE_BACKEND_FEATURES: dict[str, tuple[list[str], float | None, bool]] = {
+    "local": (["md5", "sha1", "sha256", "quickxor", "dropbox"], 1e-9, True),
+    "drive": (["md5", "sha1", "sha256"], 1e-3, True),
+    "onedrive": (["quickxor"], 1.0, True),
+    "dropbox": (["dropbox"], 1.0, True),
+    "s3": (["md5"], 1e-9, True),
+    "b2": (["sha1"], 1e-3, True),
+    "box": (["sha1"], 1.0, True),
+    "pcloud": (["md5", "sha1"], 1.0, True),
+    "jottacloud": (["md5"], 1.0, True),
+    "yandex": (["md5"], 1e-9, True),
+    "hidrive": (["sha1"], 1.0, True),
+    "sftp": (["md5", "sha1"], 1.0, False),
+    "mega": ([], None, True),
+}
+
+
+class RcloneConfig:
+    _remotes: dict[str, dict[str, str]] = dict()
+    _mtime: float | None = None
+
+    @classmethod
+    def _load(cls) -> dict[str, dict[str, str]]:
+        """
+        Parses rclone.conf, the parsed remotes are reused until the file gets modified.
+
+        Returns:
+        dict[str, dict[str, str]]: Remote name to its options, empty if rclone.conf doesn't exist or cannot be parsed.
+        """
+        try:
+            mtime = RCLONE_CFG_PATH.stat().st_mtime
+        except OSError:
+            cls._remotes, cls._mtime = dict(), None
+            return cls._remotes
+
+        if mtime != cls._mtime:
+            parser = configparser.ConfigParser(interpolation=None, strict=False)
+            try:
+                parser.read(RCLONE_CFG_PATH, encoding="utf-8")
+                cls._remotes = {name: dict(parser[name]) for name in parser.sections()}
+            except configparser.Error as e:
+                logger.error(f"Failed to parse {RCLONE_CFG_PATH}: {e}")
+                cls._remotes = dict()
+            cls._mtime = mtime
+
+        return cls._remotes
+
+    @classmethod
+    def get_remotes(cls) -> dict[str, dict[str, Any]]:
+        """
+        Retrieves all remotes in rclone.conf with their capabilities, credentials are not included.
+
+        Returns:
+        dict[str, dict[str, Any]]: Remote name to its capabilities, see get_capabilities.
+        """
+        return {name: cls.get_capabilities(name) for name in cls._load()}
+
+    @classmethod
+    def get_remote_type(cls, name: str) -> str:
+        """
+        Retrieves the backend type of a remote.
+
+        Parameters:
+        name (str): Name of the remote.
+
+        Returns:
+        str: The backend type, e.g. "onedrive", empty string if the remote doesn't exist.
+        """
+        return cls._load().get(name, {}).get("type", "")
+
+    @classmethod
+    def get_capabilities(cls, name: str) -> dict[str, Any]:
+        """
+        Retrieves the capabilities of a remote, alias and crypt remotes are resolved to the remote they wrap.
+
+        Parameters:
+        name (str): Name of the remote.
+
+        Returns:
+        dict[str, Any]: Backend type ("type"), supported hash types ("hashes"),
+                        precision of modification times in seconds, None if unsupported ("mod_time_precision"),
+                        whether server-side copy is supported ("server_side_copy"),
+                        and whether the backend is known at all ("known"), the others are only guesses if not.
+        """
+        remote_type = cls.get_remote_type(name)
+        backend = cls._resolve_backend(name)
+        known = backend in RCLONE_BACKEND_FEATURES
+        hashes, precision, server_side_copy = RCLONE_BACKEND_FEATURES.get(backend, ([], 1.0, False))
+        if remote_type == "crypt":
+            # hashes of encrypted files can't be compared with the local ones
+            hashes = []
+
+        return {
+            "type": remote_type,
+            "hashes": hashes,
+            "mod_time_precision": precision,
+            "server_side_copy": server_side_copy,
+            "known": known,
+        }
+
+    @classmethod
+    def _resolve_backend(cls, name: str) -> str:
+        """
+        Finds the backend type that stores the files of a remote, following alias and crypt remotes.
+
+        Parameters:
+        name (str): Name of the remote.
+
+        Returns:
+        str: The backend type, empty string if it cannot be resolved.
+        """
+        remotes = cls._load()
+        seen = set()
+        while (name in remotes) and (name not in seen):
+            seen.add(name)
+            options = remotes[name]
+            if options.get("type") not in ("alias", "crypt"):
+                return options.get("type", "")
+
+            wrapped = options.get("remote", "")
+            # a path without a remote name is a local path, a drive letter or a single letter remote is ambiguous
+            if ":" not in wrapped:
+                return "local"
+            name = wrapped.split(":", 1)[0]
+
+        return ""
+
+    @classmethod
+    def get_sync_options(cls, name: str) -> dict[str, bool]:
+        """
+        Chooses the rclone options that compare and verify files in the best way the backend of a remote supports.
+        Files are compared by hash or size if modification times are not supported,
+        and transfers are verified by hash if the backend has any, as rclone computes the local hash while uploading.
+
+        Parameters:
+        name (str): Name of the remote.
+
+        Returns:
+        dict[str, bool]: rclone option to its value, in the format of the "_config" parameter of rc calls.
+                         Empty if the backend is unknown.
+        """
+        capabilities = cls.get_capabilities(name)
+        if not capabilities["known"]:
+            return dict()
+
+        options = {"IgnoreChecksum": not capabilities["hashes"]}
+        if capabilities["mod_time_precision"] is None:
+            if capabilities["hashes"]:
+                options["CheckSum"] = True
+            else:
+                options["SizeOnly"] = True
+
+        return options
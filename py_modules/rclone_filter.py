@@ -0,0 +1,331 @@
+from pathlib import Path
+from typing import Any, Iterator
+import os, re, time
+
+from common_defs import *
+from utils import get_filters
+
+DIR_CACHE_MAX_ENTRIES = 20000
+# Listings of directories modified within this time are not cached,
+# as another change in the same mtime tick would not be noticed
+DIR_CACHE_MIN_AGE_NS = 2 * 1000 * 1000 * 1000
+
+_dir_cache: dict[str, tuple[int, list[tuple[str, bool]]]] = dict()
+
+
+def _list_dir(path: str, mtime_ns: int) -> list[tuple[str, bool]]:
+    """
+    Lists a directory, the listing is cached until the mtime of the directory changes.
+
+    Parameters:
+    path (str): Path of the directory.
+    mtime_ns (int): Current mtime of the directory.
+
+    Returns:
+    list[tuple[str, bool]]: Names of the entries and whether they are directories (following symlinks).
+    """
+    if (cached := _dir_cache.get(path)) and cached[0] == mtime_ns:
+        return cached[1]
+
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                entries.append((entry.name, entry.is_dir()))
+            except OSError:
+                entries.append((entry.name, False))
+
+    if time.time_ns() - mtime_ns > DIR_CACHE_MIN_AGE_NS:
+        if len(_dir_cache) >= DIR_CACHE_MAX_ENTRIES:
+            _dir_cache.clear()
+        _dir_cache[path] = (mtime_ns, entries)
+
+    return entries
+
+
+def glob_to_regex(glob: str) -> re.Pattern:
+    """
+    Converts an rclone filter glob to a regular expression, following rclone's rules.
+
+    Parameters:
+    glob (str): The glob, e.g. "/home/deck/*.sav".
+
+    Returns:
+    re.Pattern: The compiled regular expression matching paths relative to the sync root.
+
+    Raises:
+    ValueError: If the glob is malformed.
+    """
+    if glob.startswith("/"):
+        glob = glob[1:]
+        regex = "^"
+    else:
+        regex = "(^|/)"
+
+    stars = 0
+    in_braces = False
+    in_brackets = 0
+    escaped = False
+    for c in glob:
+        if escaped:
+            regex += re.escape(c)
+            escaped = False
+            continue
+        if c != "*" and stars:
+            if stars > 2:
+                raise ValueError(f"Too many stars in glob: {glob}")
+            regex += ".*" if stars == 2 else "[^/]*"
+            stars = 0
+        if in_brackets:
+            regex += c
+            if c == "[":
+                in_brackets += 1
+            elif c == "]":
+                in_brackets -= 1
+            continue
+
+        if c == "\\":
+            escaped = True
+        elif c == "*":
+            stars += 1
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            regex += c
+            in_brackets += 1
+        elif c == "]":
+            raise ValueError(f"Mismatched ']' in glob: {glob}")
+        elif c == "{":
+            if in_braces:
+                raise ValueError(f"Can't nest '{{' in glob: {glob}")
+            in_braces = True
+            regex += "("
+        elif c == "}":
+            if not in_braces:
+                raise ValueError(f"Mismatched '}}' in glob: {glob}")
+            in_braces = False
+            regex += ")"
+        elif c == "," and in_braces:
+            regex += "|"
+        else:
+            regex += re.escape(c)
+
+    if stars > 2:
+        raise ValueError(f"Too many stars in glob: {glob}")
+    elif stars:
+        regex += ".*" if stars == 2 else "[^/]*"
+    if in_brackets or in_braces:
+        raise ValueError(f"Mismatched '[' or '{{' in glob: {glob}")
+
+    return re.compile(regex + "$")
+
+
+def _glob_to_dir_globs(glob: str) -> list[str]:
+    """
+    Returns globs of the parent directories that need to be scanned for a file glob to match.
+
+    Parameters:
+    glob (str): The file glob, e.g. "/home/deck/*.sav".
+
+    Returns:
+    list[str]: The directory globs, e.g. ["/home/deck/", "/home/"].
+    """
+    dir_globs = []
+    while (i := glob.rfind("/")) > 0:
+        glob = glob[:i]
+        if "**" in glob:
+            return ["**"]
+        dir_globs.append(glob + "/")
+
+    return dir_globs
+
+
+class RcloneFilter:
+    def __init__(self, rules: list[str]):
+        self._file_rules: list[tuple[bool, re.Pattern]] = []
+        self._dir_rules: list[tuple[bool, re.Pattern]] = []
+        for rule in rules:
+            self._add_rule(rule)
+
+    @classmethod
+    def from_files(cls, *files: Path) -> "RcloneFilter":
+        """
+        Creates a filter from filter files, in the same order as rclone's --filter-from.
+
+        Parameters:
+        *files (Path): The filter files.
+
+        Returns:
+        RcloneFilter: The compiled filter.
+        """
+        return cls([rule for file in files for rule in get_filters(file)])
+
+    def _add_rule(self, rule: str):
+        """
+        Parses and compiles a line of rclone filter file.
+
+        Parameters:
+        rule (str): The rule, e.g. "+ /home/deck/**".
+
+        Raises:
+        ValueError: If the rule is malformed.
+        """
+        if (not rule) or rule[0] in "#;":
+            return
+        if rule == "!":
+            self._file_rules.clear()
+            self._dir_rules.clear()
+            return
+        if rule[:2] not in ("+ ", "- "):
+            raise ValueError(f"Malformed filter rule: {rule}")
+
+        include = rule[0] == "+"
+        glob = rule[2:]
+        is_dir_rule = glob.endswith("/")
+        is_file_rule = not is_dir_rule
+        if is_dir_rule and not include:
+            # excluding "dir/" equals to excluding "dir/**"
+            glob += "**"
+        if "**" in glob:
+            is_dir_rule = is_file_rule = True
+
+        if is_file_rule:
+            self._file_rules.append((include, glob_to_regex(glob)))
+            if include or glob == "*":
+                for dir_glob in _glob_to_dir_globs(glob):
+                    self._dir_rules.append((include, glob_to_regex(dir_glob)))
+        if is_dir_rule:
+            self._dir_rules.append((include, glob_to_regex(glob)))
+
+    @staticmethod
+    def _match(rules: list[tuple[bool, re.Pattern]], path: str) -> bool:
+        """
+        Returns the result of the first matching rule, paths matching no rule are included.
+        """
+        for include, regex in rules:
+            if regex.search(path):
+                return include
+
+        return True
+
+    def include_file(self, path: str) -> bool:
+        """
+        Checks if a file should be synced.
+
+        Parameters:
+        path (str): Path of the file relative to the sync root, e.g. "home/deck/a.sav".
+
+        Returns:
+        bool: True if the file is included.
+        """
+        return self._match(self._file_rules, path)
+
+    def include_directory(self, path: str) -> bool:
+        """
+        Checks if a directory should be scanned.
+
+        Parameters:
+        path (str): Path of the directory relative to the sync root with a trailing "/", e.g. "home/deck/".
+
+        Returns:
+        bool: True if the directory may contain included files.
+        """
+        return self._match(self._dir_rules, path)
+
+    def _scan(self, root: str, rel_dir: str = "") -> Iterator[tuple[str, str, list[tuple[str, bool]]]]:
+        """
+        Scans the directories under the sync root that may contain included files.
+        Symlinks are followed like rclone's --copy-links.
+
+        Parameters:
+        root (str): The sync root.
+        rel_dir (str): Relative path of the directory to start from, with a trailing "/". The sync root by default.
+
+        Returns:
+        Iterator[tuple[str, str, list[tuple[str, bool]]]]: Relative path ("" for the root, otherwise with a trailing "/"),
+                                                           full path and entries of each directory.
+        """
+        visited = set()
+        stack = [rel_dir]
+        while stack:
+            rel_dir = stack.pop()
+            dir_path = os.path.join(root, rel_dir)
+            try:
+                dir_stat = os.stat(dir_path)
+                if (dir_stat.st_dev, dir_stat.st_ino) in visited:
+                    continue
+                visited.add((dir_stat.st_dev, dir_stat.st_ino))
+                entries = _list_dir(dir_path, dir_stat.st_mtime_ns)
+            except OSError as e:
+                logger.debug("Failed to scan %s: %s", rel_dir, e)
+                continue
+
+            yield rel_dir, dir_path, entries
+            for name, is_dir in entries:
+                if is_dir and self.include_directory(rel_dir + name + "/"):
+                    stack.append(rel_dir + name + "/")
+
+    def walk(self, root: str, rel_dir: str = "") -> Iterator[tuple[str, os.stat_result]]:
+        """
+        Walks the sync root and yields the files matching the filter.
+        Symlinks are followed like rclone's --copy-links.
+
+        Parameters:
+        root (str): The sync root.
+        rel_dir (str): Relative path of the directory to walk, with a trailing "/". The sync root by default.
+
+        Returns:
+        Iterator[tuple[str, os.stat_result]]: Relative path and stat of each matched file.
+        """
+        for rel_dir, dir_path, entries in self._scan(root, rel_dir):
+            for name, is_dir in entries:
+                rel_path = rel_dir + name
+                if (not is_dir) and self.include_file(rel_path):
+                    try:
+                        file_stat = os.stat(os.path.join(dir_path, name))
+                    except OSError as e:
+                        logger.debug("Failed to stat %s: %s", rel_path, e)
+                        continue
+                    yield rel_path, file_stat
+
+    def walk_directories(self, root: str, rel_dir: str = "") -> Iterator[str]:
+        """
+        Walks the sync root and yields the directories that may contain files matching the filter.
+
+        Parameters:
+        root (str): The sync root.
+        rel_dir (str): Relative path of the directory to walk, with a trailing "/". The sync root by default.
+
+        Returns:
+        Iterator[str]: Relative path of each directory, "" for the root, otherwise with a trailing "/".
+        """
+        for sub_dir, _, _ in self._scan(root, rel_dir):
+            yield sub_dir
+
+    def preview(self, root: str, max_files: int = 1000) -> dict[str, Any]:
+        """
+        Summarizes the files matching the filter.
+
+        Parameters:
+        root (str): The sync root.
+        max_files (int): Max number of files to list, the count and size always cover all files.
+
+        Returns:
+        dict[str, Any]: Number of files ("count"), total bytes ("bytes"),
+                        matched files sorted by path as [path, size] ("files"), and whether the list got truncated ("truncated").
+        """
+        count = 0
+        total_bytes = 0
+        files = []
+        for path, file_stat in self.walk(root):
+            count += 1
+            total_bytes += file_stat.st_size
+            files.append((path, file_stat.st_size))
+
+        files.sort()
+        return {
+            "count": count,
+            "bytes": total_bytes,
+            "files": files[:max_files],
+            "truncated": count > max_files,
+        }
@@ -1,14 +1,20 @@
-from asyncio import create_subprocess_exec
-from asyncio.subprocess import Process, PIPE
-from time import sleep
-import re, urllib
+from asyncio import create_subprocess_exec, open_unix_connection
+from asyncio.subprocess import Process, PIPE, DEVNULL
+from threading import Event
+from typing import Any, Callable
+import asyncio, hashlib, json, logging, os, re
 
 from common_defs import *
+from rclone_config import RcloneConfig
 from utils import *
 
+RCLONE_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class RcloneManager:
     current_spawn: Process | None = None
+    current_daemon: Process | None = None
+    _daemon_config_mtime: float | None = None
 
     @classmethod
     async def spawn(cls, cloud_type: str) -> str:
@@ -23,7 +29,7 @@ class RcloneManager:
         """
         logger.info("Updating rclone.conf")
 
-        cls.kill_current_spawn()
+        await cls.kill_current_spawn()
         if is_port_in_use(RCLONE_PORT):
             raise Exception("RCLONE_PORT_IN_USE")
 
@@ -47,17 +53,15 @@ class RcloneManager:
         return url
 
     @classmethod
-    def kill_current_spawn(cls):
+    async def kill_current_spawn(cls):
         """
-        Kills the previous spawned process.
-
-        Parameters:
-        process (asyncio.subprocess.Process): The process to be killed.
+        Kills the previous spawned process and waits for it to exit.
         """
         if cls.current_spawn and cls.current_spawn.returncode is None:
             logger.warning("Killing previous Process")
             cls.current_spawn.kill()
-            sleep(0.1)  # Give time for OS to clear up the port
+            await cls.current_spawn.wait()
+            await asyncio.sleep(0.1)  # Give time for OS to clear up the port
             cls.current_spawn = None
 
     @classmethod
@@ -78,7 +82,7 @@ class RcloneManager:
                 return url_re_match.group(0)
 
         logger.warning("Failed to extract URL from rclone process")
-        cls.kill_current_spawn()
+        await cls.kill_current_spawn()
         return ""
 
     @classmethod
@@ -97,22 +101,451 @@ class RcloneManager:
     @classmethod
     def get_cloud_type(cls) -> str:
         """
-        Retrieves the current cloud type from the rclone configuration.
+        Retrieves the cloud type of the remote syncs go to from the rclone configuration.
 
         Returns:
         str: The current cloud type, empty string if it doesn't exist
         """
+        return RcloneConfig.get_remote_type(Config.get_config_item("sync_remote"))
+
+    @classmethod
+    def get_remotes(cls) -> dict[str, dict[str, Any]]:
+        """
+        Retrieves all remotes in the rclone configuration with their capabilities.
+
+        Returns:
+        dict[str, dict[str, Any]]: Remote name to its capabilities.
+        """
+        return RcloneConfig.get_remotes()
+
+    @classmethod
+    def daemon_running(cls) -> bool:
+        """
+        Checks if the rclone rc daemon is running.
+
+        Returns:
+        bool: True if the daemon is running.
+        """
+        return bool(cls.current_daemon) and (cls.current_daemon.returncode is None)
+
+    @classmethod
+    async def start_daemon(cls) -> bool:
+        """
+        Starts a long-lived rclone rc daemon if it is enabled in the configuration,
+        syncs will be sent to it as rc jobs instead of spawning new rclone processes.
+
+        Returns:
+        bool: True if the daemon is running.
+        """
+        if not Config.get_config_item("rclone_daemon"):
+            return False
+        if cls.daemon_running():
+            return True
+        if not RCLONE_BIN_PATH.exists():
+            logger.warning("Rclone binary does not exist, not starting daemon")
+            return False
+
+        RCLONE_RC_SOCKET_PATH.unlink(missing_ok=True)
+        arguments = [
+            "--config",
+            str(RCLONE_CFG_PATH),
+            "rcd",
+            "--rc-addr",
+            str(RCLONE_RC_SOCKET_PATH),
+            "--rc-no-auth",
+            "--log-file",
+            str(RCLONE_RCD_LOG_PATH),
+        ]
+        # Flags of the daemon apply to every job it runs
+        arguments.extend(Config.get_config_item("additional_sync_args"))
+        if logger.level <= logging.DEBUG:
+            arguments.append("-v")
+
+        logger.info("Starting rclone daemon")
+        cls._daemon_config_mtime = cls._get_config_mtime()
+        cls.current_daemon = await create_subprocess_exec(
+            str(RCLONE_BIN_PATH),
+            *arguments,
+            stdin=DEVNULL,
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if not cls.daemon_running():
+                break
+            try:
+                await cls.rc_call("rc/noop")
+                logger.info("Rclone daemon listening on %s", RCLONE_RC_SOCKET_PATH)
+                return True
+            except OSError:
+                continue
+
+        logger.error("Failed to start rclone daemon, see %s", RCLONE_RCD_LOG_PATH)
+        await cls.stop_daemon()
+        return False
+
+    @classmethod
+    async def stop_daemon(cls):
+        """
+        Stops the rclone rc daemon if it is running.
+        """
+        if cls.daemon_running():
+            logger.info("Stopping rclone daemon")
+            try:
+                await cls.rc_call("core/quit")
+                await asyncio.wait_for(cls.current_daemon.wait(), 5)
+            except Exception as e:
+                logger.warning("Failed to quit rclone daemon gracefully: %s", e)
+                cls.current_daemon.kill()
+                await cls.current_daemon.wait()
+
+        cls.current_daemon = None
+        RCLONE_RC_SOCKET_PATH.unlink(missing_ok=True)
+
+    @classmethod
+    async def restart_daemon(cls) -> bool:
+        """
+        Restarts the rclone rc daemon to pick up the latest configuration.
+
+        Returns:
+        bool: True if the daemon is running.
+        """
+        await cls.stop_daemon()
+        return await cls.start_daemon()
+
+    @classmethod
+    async def rc_call(
+        cls, command: str, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """
+        Sends a command to the rclone rc daemon over its unix socket.
+
+        Parameters:
+        command (str): The rc command, e.g. "sync/copy".
+        params (dict[str, Any]): Parameters of the command.
+
+        Returns:
+        dict[str, Any]: The decoded response.
+
+        Raises:
+        OSError: If the daemon cannot be reached.
+        Exception: If the daemon returns an error.
+        """
+        body = json.dumps(params or {}).encode()
+        reader, writer = await open_unix_connection(str(RCLONE_RC_SOCKET_PATH))
+        try:
+            writer.write(
+                (
+                    f"POST /{command} HTTP/1.0\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n"
+                ).encode()
+                + body
+            )
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+
+        head, _, payload = response.partition(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        result = json.loads(payload) if payload.strip() else {}
+        if status != 200:
+            raise Exception(f"rc {command} failed: {result.get('error', status)}")
+
+        return result
+
+    @classmethod
+    async def rc_job(
+        cls,
+        command: str,
+        params: dict[str, Any],
+        stats_callback: Callable[[dict[str, Any]], None] | None = None,
+        poll_interval: float = 0.5,
+    ) -> dict[str, Any]:
+        """
+        Runs an rc command as an async job on the daemon and waits for it to finish.
+
+        Parameters:
+        command (str): The rc command, e.g. "sync/copy".
+        params (dict[str, Any]): Parameters of the command.
+        stats_callback (Callable[[dict[str, Any]], None] | None): Called with the stats of the job on every poll.
+        poll_interval (float): Seconds between job status checks.
+
+        Returns:
+        dict[str, Any]: The final job status.
+        """
+        config_mtime = cls._get_config_mtime()
+        if config_mtime != cls._daemon_config_mtime:
+            # rclone.conf got changed, don't reuse remotes created from the old one
+            await cls.rc_call("fscache/clear")
+            cls._daemon_config_mtime = config_mtime
+
+        job_id = (await cls.rc_call(command, {**params, "_async": True}))["jobid"]
+        logger.debug("Started rc job %d: %s", job_id, command)
+        try:
+            while True:
+                await asyncio.sleep(poll_interval)
+                status = await cls.rc_call("job/status", {"jobid": job_id})
+                # stats are read after the status, so that the last ones are the final stats of the job
+                if stats_callback:
+                    stats_callback(await cls.rc_call("core/stats", {"group": f"job/{job_id}"}))
+                if status.get("finished"):
+                    return status
+        except asyncio.CancelledError:
+            logger.warning(f"Stopping rc job {job_id}")
+            try:
+                await cls.rc_call("job/stop", {"jobid": job_id})
+            except Exception as e:
+                logger.warning(f"Failed to stop rc job {job_id}: {e}")
+            raise
+
+    @classmethod
+    def _get_config_mtime(cls) -> float | None:
+        """
+        Returns the modification time of rclone.conf.
+
+        Returns:
+        float | None: The modification time, None if the file doesn't exist.
+        """
         try:
-            with RCLONE_CFG_PATH.open("r") as f:
-                l = f.readlines()
-                return l[1].strip().split(" ")[-1]
-        except:
-            return ""
+            return RCLONE_CFG_PATH.stat().st_mtime
+        except OSError:
+            return None
+
+    @classmethod
+    async def stat_object(cls, remote_path: str) -> dict[str, Any] | None:
+        """
+        Retrieves the metadata of an object on the remote with a single request.
+
+        Parameters:
+        remote_path (str): Path of the object, e.g. "cloud:sdh-game-sync/file".
+
+        Returns:
+        dict[str, Any] | None: The item as listed by "rclone lsjson", None if it doesn't exist or cannot be retrieved.
+        """
+        fs, path = remote_path.split(":", 1)
+        if cls.daemon_running():
+            try:
+                return (await cls.rc_call("operations/stat", {"fs": f"{fs}:", "remote": path})).get("item")
+            except Exception as e:
+                logger.warning(f"Failed to stat {remote_path}: {e}")
+                return None
+
+        process = await create_subprocess_exec(
+            str(RCLONE_BIN_PATH),
+            "--config",
+            str(RCLONE_CFG_PATH),
+            "lsjson",
+            "--stat",
+            remote_path,
+            stdout=PIPE,
+            stderr=DEVNULL,
+        )
+        stdout = await cls._wait(process)
+        if process.returncode != 0:
+            logger.debug(f"Failed to stat {remote_path}, exit code: {process.returncode}")
+            return None
+
+        return json.loads(stdout)
+
+    @classmethod
+    async def list_objects(cls, remote_path: str, filter_files: list[Path]) -> dict[str, list] | None:
+        """
+        Lists the files in a folder on the remote recursively, filtered like a sync.
+
+        Parameters:
+        remote_path (str): Path of the folder, e.g. "cloud:sdh-game-sync".
+        filter_files (list[Path]): Filter files, in the order they are passed to rclone.
+
+        Returns:
+        dict[str, list] | None: Relative path to [size, mtime] of each file, empty if the folder doesn't exist.
+                                None if the files cannot be listed.
+        """
+        if cls.daemon_running():
+            try:
+                items = (
+                    await cls.rc_call(
+                        "operations/list",
+                        {
+                            "fs": remote_path,
+                            "remote": "",
+                            "opt": {"recurse": True, "filesOnly": True, "noMimeType": True},
+                            "_filter": {"FilterFrom": [str(filter_file) for filter_file in filter_files]},
+                        },
+                    )
+                ).get("list", [])
+            except Exception as e:
+                if "directory not found" in str(e):
+                    return dict()
+                logger.warning(f"Failed to list {remote_path}: {e}")
+                return None
+        else:
+            arguments = ["--config", str(RCLONE_CFG_PATH), "lsjson", "-R", "--files-only", "--no-mimetype"]
+            for filter_file in filter_files:
+                arguments.extend(["--filter-from", str(filter_file)])
+            process = await create_subprocess_exec(
+                str(RCLONE_BIN_PATH), *arguments, remote_path, stdout=PIPE, stderr=DEVNULL
+            )
+            stdout = await cls._wait(process)
+            # exit code 3 is a missing folder
+            if process.returncode == 3:
+                return dict()
+            if process.returncode != 0:
+                logger.warning(f"Failed to list {remote_path}, exit code: {process.returncode}")
+                return None
+            items = json.loads(stdout)
+
+        return {item["Path"]: [item.get("Size", 0), parse_mod_time(item.get("ModTime"))] for item in items}
+
+    @classmethod
+    async def delete_objects(cls, remote_path: str, files_from: Path) -> bool:
+        """
+        Deletes files in a folder on the remote.
+
+        Parameters:
+        remote_path (str): Path of the folder, e.g. "cloud:sdh-game-sync".
+        files_from (Path): File listing the paths to delete relative to the folder, one per line.
+
+        Returns:
+        bool: True if the files got deleted.
+        """
+        if cls.daemon_running():
+            try:
+                await cls.rc_call("operations/delete", {"fs": remote_path, "_filter": {"FilesFrom": [str(files_from)]}})
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to delete files in {remote_path}: {e}")
+                return False
+
+        process = await create_subprocess_exec(
+            str(RCLONE_BIN_PATH),
+            "--config",
+            str(RCLONE_CFG_PATH),
+            "delete",
+            remote_path,
+            "--files-from",
+            str(files_from),
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+        await cls._wait(process)
+        if process.returncode != 0:
+            logger.warning(f"Failed to delete files in {remote_path}, exit code: {process.returncode}")
+            return False
+
+        return True
 
     @classmethod
-    def update_rclone(cls):
+    async def upload_object(cls, local_path: Path, remote_path: str) -> bool:
+        """
+        Uploads a single file to the remote.
+
+        Parameters:
+        local_path (Path): Path of the local file.
+        remote_path (str): Path of the object, e.g. "cloud:sdh-game-sync/file".
+
+        Returns:
+        bool: True if the file got uploaded.
+        """
+        fs, path = remote_path.split(":", 1)
+        return await cls._copy_object(str(local_path.parent), local_path.name, f"{fs}:", path)
+
+    @classmethod
+    async def download_object(cls, remote_path: str, local_path: Path) -> bool:
+        """
+        Downloads a single object from the remote.
+
+        Parameters:
+        remote_path (str): Path of the object, e.g. "cloud:sdh-game-sync/file".
+        local_path (Path): Path of the local file.
+
+        Returns:
+        bool: True if the object got downloaded, False if it doesn't exist or cannot be downloaded.
+        """
+        fs, path = remote_path.split(":", 1)
+        return await cls._copy_object(f"{fs}:", path, str(local_path.parent), local_path.name)
+
+    @classmethod
+    async def _copy_object(cls, src_fs: str, src_path: str, dst_fs: str, dst_path: str) -> bool:
+        """
+        Copies a single file between the remote and local.
+
+        Parameters:
+        src_fs (str): The source, e.g. "cloud:" or a local folder.
+        src_path (str): Path of the file relative to the source.
+        dst_fs (str): The destination, e.g. "cloud:" or a local folder.
+        dst_path (str): Path of the file relative to the destination.
+
+        Returns:
+        bool: True if the file got copied.
+        """
+        if cls.daemon_running():
+            try:
+                await cls.rc_call(
+                    "operations/copyfile",
+                    {
+                        "srcFs": src_fs,
+                        "srcRemote": src_path,
+                        "dstFs": dst_fs,
+                        "dstRemote": dst_path,
+                    },
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to copy {src_fs}{src_path}: {e}")
+                return False
+
+        process = await create_subprocess_exec(
+            str(RCLONE_BIN_PATH),
+            "--config",
+            str(RCLONE_CFG_PATH),
+            "copyto",
+            src_fs + src_path if src_fs.endswith(":") else os.path.join(src_fs, src_path),
+            dst_fs + dst_path if dst_fs.endswith(":") else os.path.join(dst_fs, dst_path),
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+        await cls._wait(process)
+        if process.returncode != 0:
+            logger.warning(f"Failed to copy {src_fs}{src_path}, exit code: {process.returncode}")
+            return False
+
+        return True
+
+    @staticmethod
+    async def _wait(process: Process) -> bytes | None:
+        """
+        Waits for a short-lived rclone process to exit, it gets killed if the wait is cancelled,
+        e.g. by the deadline of the sync it is a part of.
+
+        Parameters:
+        process (Process): The rclone process.
+
+        Returns:
+        bytes | None: stdout of the process, None if it isn't piped.
+        """
+        try:
+            stdout, _ = await process.communicate()
+        except asyncio.CancelledError:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            raise
+
+        return stdout
+
+    @classmethod
+    def update_rclone(cls, cancelled: Event | None = None):
         """
         Checks for updates to rclone and updates if necessary.
+
+        Parameters:
+        cancelled (Event | None): Stops the update before replacing rclone once it is set.
         """
         latest_version = cls._get_latest_rclone_version()
         logger.info("Latest version: %s", latest_version)
@@ -120,25 +553,45 @@ class RcloneManager:
         logger.info("Current version: %s", current_version)
 
         if (not latest_version) or (
-            current_version and (latest_version <= current_version)
+            current_version
+            and (cls._parse_version(latest_version) <= cls._parse_version(current_version))
         ):
             logger.debug("No update required")
             return "No update required"
 
+        if cancelled and cancelled.is_set():
+            logger.info("Update of rclone cancelled")
+            return "Update cancelled"
+
         logger.info("Updating rclone from %s to %s", current_version, latest_version)
-        cls._get_rclone()
+        cls._get_rclone(latest_version.split()[-1], cancelled)
+
+    @classmethod
+    def _parse_version(cls, version: str) -> tuple[int, ...]:
+        """
+        Parses a version of rclone for comparison.
+
+        Parameters:
+        version (str): The version, e.g. "rclone v1.68.2".
+
+        Returns:
+        tuple[int, ...]: The version numbers, e.g. (1, 68, 2).
+        """
+        return tuple(int(number) for number in re.findall(r"\d+", version.split()[-1]))
 
     @classmethod
     def _get_latest_rclone_version(cls) -> str | None:
         """
-        Retrieves the latest version of rclone from GitHub.
+        Retrieves the latest version of rclone from "rclone_download_url".
 
         Returns:
-        str: The latest version of rclone.
+        str: The latest version of rclone, e.g. "rclone v1.68.2".
         """
-        url = "https://downloads.rclone.org/version.txt"
+        import urllib.request
+
+        url = f"{Config.get_config_item('rclone_download_url').rstrip('/')}/version.txt"
         try:
-            with urllib.request.urlopen(url, context=ssl_context) as response:
+            with urllib.request.urlopen(url, context=get_ssl_context()) as response:
                 if response.status == 200:
                     return response.read().decode("utf-8").strip()
         except Exception as e:
@@ -174,33 +627,158 @@ class RcloneManager:
         return None
 
     @classmethod
-    def _get_rclone(cls) -> None:
-        """
-        Downloads the latest version of rclone and replaces the current version.
-        """
-        download_url = "https://downloads.rclone.org/rclone-current-linux-amd64.zip"
-        with urllib.request.urlopen(download_url, context=ssl_context) as response:
-            if response.status == 200:
-                import io, zipfile
-
-                zip_data = io.BytesIO(response.read())
-                with zipfile.ZipFile(zip_data) as zip_ref:
-                    for entry in zip_ref.namelist():
-                        if entry.endswith("/rclone"):
-                            with open(RCLONE_BIN_PATH, "wb") as f:
-                                f.write(zip_ref.read(entry))
-                            # Make the binary executable
-                            RCLONE_BIN_PATH.chmod(
-                                RCLONE_BIN_PATH.stat().st_mode | 0o111
-                            )
-                            logger.info("Rclone downloaded to %s", RCLONE_BIN_PATH)
-                            return
-                    logger.error(
-                        "Failed to extract the latest version of rclone, zip content: %s",
-                        zip_ref.namelist(),
-                    )
-            else:
+    def _get_rclone(cls, version: str, cancelled: Event | None = None) -> None:
+        """
+        Downloads a version of rclone and replaces the current version.
+        The archive is streamed to a file next to the binary, resuming a previous partial download,
+        and verified against the published SHA256SUMS before the binary gets extracted.
+        The binary is swapped in with a rename, so running rclone processes keep the old one.
+
+        Parameters:
+        version (str): The version to download, e.g. "v1.68.2".
+        cancelled (Event | None): Stops before replacing the current version once it is set.
+        """
+        base_url = f"{Config.get_config_item('rclone_download_url').rstrip('/')}/{version}"
+        zip_name = f"rclone-{version}-linux-amd64.zip"
+        zip_path = RCLONE_BIN_PATH.with_name(f"{zip_name}.part")
+        for stale_path in RCLONE_BIN_PATH.parent.glob("rclone-*.zip.part"):
+            if stale_path != zip_path:
+                stale_path.unlink(missing_ok=True)
+
+        try:
+            expected_hash = cls._get_published_hash(f"{base_url}/SHA256SUMS", zip_name)
+            if not expected_hash:
+                logger.error("No published hash of %s", zip_name)
+                return
+
+            if not cls._download(f"{base_url}/{zip_name}", zip_path, cancelled):
+                logger.info("Update of rclone cancelled")
+                return
+            if cls._hash_file(zip_path) != expected_hash:
+                logger.error("Hash of %s doesn't match SHA256SUMS", zip_name)
+                zip_path.unlink(missing_ok=True)
+                return
+
+            if cls._extract_rclone(zip_path, cancelled):
+                logger.info("Rclone %s downloaded to %s", version, RCLONE_BIN_PATH)
+                zip_path.unlink(missing_ok=True)
+        except Exception as e:
+            # the partial download is kept to be resumed next time
+            logger.error("Failed to download the latest version of rclone: %s", e)
+
+    @classmethod
+    def _get_published_hash(cls, url: str, file_name: str) -> str | None:
+        """
+        Retrieves the hash of a file from a SHA256SUMS file, the PGP signature around the hashes is ignored.
+
+        Parameters:
+        url (str): URL of the SHA256SUMS file.
+        file_name (str): Name of the file.
+
+        Returns:
+        str | None: The sha256 of the file, None if it is not listed.
+        """
+        import urllib.request
+
+        with urllib.request.urlopen(url, context=get_ssl_context()) as response:
+            for line in response.read().decode("utf-8").splitlines():
+                if (parts := line.split()) and (len(parts) == 2) and (parts[1].lstrip("*") == file_name):
+                    return parts[0].lower()
+
+        return None
+
+    @classmethod
+    def _download(cls, url: str, path: Path, cancelled: Event | None = None) -> bool:
+        """
+        Streams a file to disk in chunks of RCLONE_DOWNLOAD_CHUNK_SIZE,
+        continuing from the end of the file if the server supports ranges.
+
+        Parameters:
+        url (str): URL of the file.
+        path (Path): Path to download the file to.
+        cancelled (Event | None): Stops the download once it is set, the partial file is kept.
+
+        Returns:
+        bool: True if the download completed, False if it got cancelled.
+        """
+        import urllib.error, urllib.request
+
+        offset = path.stat().st_size if path.exists() else 0
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+
+        try:
+            response = urllib.request.urlopen(request, context=get_ssl_context())
+        except urllib.error.HTTPError as e:
+            if e.code != 416:
+                raise
+            # the partial file is already complete, otherwise the hash check catches it
+            return True
+
+        with response, path.open("ab" if response.status == 206 else "wb") as f:
+            if response.status == 206:
+                logger.info("Resuming download of %s from %d bytes", url, offset)
+            while chunk := response.read(RCLONE_DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                if cancelled and cancelled.is_set():
+                    return False
+
+        return True
+
+    @classmethod
+    def _hash_file(cls, path: Path) -> str:
+        """
+        Calculates the sha256 of a file without loading it into memory.
+
+        Parameters:
+        path (Path): Path of the file.
+
+        Returns:
+        str: The sha256 of the file.
+        """
+        file_hash = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(RCLONE_DOWNLOAD_CHUNK_SIZE):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+    @classmethod
+    def _extract_rclone(cls, zip_path: Path, cancelled: Event | None = None) -> bool:
+        """
+        Streams the rclone binary out of the archive and moves it over the current one.
+
+        Parameters:
+        zip_path (Path): Path of the archive.
+        cancelled (Event | None): Stops before replacing the current version once it is set.
+
+        Returns:
+        bool: True if the binary got replaced.
+        """
+        import zipfile
+
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            entry = next((name for name in zip_ref.namelist() if name.endswith("/rclone")), None)
+            if not entry:
                 logger.error(
-                    "Failed to download the latest version. HTTP status: %d",
-                    response.status,
+                    "Failed to extract the latest version of rclone, zip content: %s",
+                    zip_ref.namelist(),
                 )
+                return False
+
+            tmp_path = RCLONE_BIN_PATH.with_name(f"rclone.{os.getpid()}.tmp")
+            try:
+                with zip_ref.open(entry) as src, tmp_path.open("wb") as dst:
+                    while chunk := src.read(RCLONE_DOWNLOAD_CHUNK_SIZE):
+                        dst.write(chunk)
+                if cancelled and cancelled.is_set():
+                    logger.info("Update of rclone cancelled")
+                    return False
+                # Make the binary executable
+                tmp_path.chmod(0o755)
+                os.replace(tmp_path, RCLONE_BIN_PATH)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+        return True
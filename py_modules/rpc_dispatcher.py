@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import Any, Callable
+import asyncio, functools, inspect
+
+from config import *
+
+RPC_DEFAULT_TIMEOUT = 30
+
+
+class RpcDispatcher:
+    _executor: ThreadPoolExecutor | None = None
+    _cancel_events: set[Event] = set()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """
+        Creates the thread pool, with up to "rpc_workers" threads.
+
+        Returns:
+        ThreadPoolExecutor: The thread pool.
+        """
+        if not cls._executor:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=max(1, Config.get_config_item("rpc_workers")), thread_name_prefix="rpc"
+            )
+
+        return cls._executor
+
+    @classmethod
+    async def run(
+        cls,
+        name: str,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout: float | None = RPC_DEFAULT_TIMEOUT,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Runs a blocking function in the thread pool, so that it doesn't hold up other calls on the event loop.
+        Calls beyond the pool size wait for a free thread, the timeout covers the wait too.
+
+        A thread cannot be stopped from the outside, if the function accepts a "cancelled" keyword argument,
+        it gets an Event that is set once the call times out or gets cancelled, to be checked between its steps.
+        Otherwise it runs to the end in the background and the result is discarded.
+
+        Parameters:
+        name (str): Name of the call for the logs.
+        func (Callable[..., Any]): The blocking function.
+        *args (Any): Positional arguments of the function.
+        timeout (float | None): Max number of seconds to wait for the result, None to wait forever.
+        **kwargs (Any): Keyword arguments of the function.
+
+        Returns:
+        Any: The return value of the function.
+
+        Raises:
+        TimeoutError: If the call doesn't finish in time.
+        """
+        cancelled = Event()
+        if "cancelled" in inspect.signature(func).parameters:
+            kwargs["cancelled"] = cancelled
+
+        cls._cancel_events.add(cancelled)
+        try:
+            return await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(
+                    cls._get_executor(), functools.partial(func, *args, **kwargs)
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.error(f'"{name}" timed out after {timeout}s')
+            raise TimeoutError(f"{name} timed out after {timeout}s")
+        finally:
+            cancelled.set()
+            cls._cancel_events.discard(cancelled)
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Cancels the running calls and drops the queued ones, without waiting for the threads.
+        """
+        for cancelled in cls._cancel_events:
+            cancelled.set()
+        if cls._executor:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
@@ -0,0 +1,205 @@
+from pathlib import Path
+from typing import Any, BinaryIO
+import hashlib, json, os, tarfile
+
+from common_defs import *
+from rclone_filter import RcloneFilter
+
+BUNDLE_ARCHIVE_NAME = "bundle.tar.gz"
+BUNDLE_MANIFEST_NAME = "manifest.json"
+BUNDLE_VERSION = 1
+BUNDLE_COMPRESS_LEVEL = 6
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class _HashingReader:
+    """
+    File wrapper hashing the content while it gets read, so that files are only read once when packed.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self.hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self.hash.update(data)
+        return data
+
+
+def _hash_file(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def _is_cached(cache: dict[str, list], path: str, stat: os.stat_result) -> bool:
+    return (entry := cache.get(path)) is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]
+
+
+def _check_path(path: str):
+    """
+    Rejects paths that would get extracted out of the sync root.
+
+    Raises:
+    ValueError: If the path is absolute or contains "..".
+    """
+    if os.path.isabs(path) or ".." in Path(path).parts:
+        raise ValueError(f"Invalid path in bundle: {path}")
+
+
+def scan(root: str, sync_filter: RcloneFilter, cache: dict[str, list]) -> dict[str, list]:
+    """
+    Hashes the local files matching the filter, hashes of files unchanged since they were cached are reused.
+
+    Parameters:
+    root (str): The sync root.
+    sync_filter (RcloneFilter): Filter of the sync target.
+    cache (dict[str, list]): Entries from the last pack or unpack.
+
+    Returns:
+    dict[str, list]: Relative path to [size, mtime_ns, sha256] of each file.
+    """
+    entries = dict()
+    for path, stat in sync_filter.walk(root):
+        if _is_cached(cache, path, stat):
+            entries[path] = cache[path]
+        else:
+            try:
+                entries[path] = [stat.st_size, stat.st_mtime_ns, _hash_file(os.path.join(root, path))]
+            except OSError as e:
+                logger.warning(f"Failed to hash {path}: {e}")
+
+    return entries
+
+
+def pack(
+    root: str,
+    sync_filter: RcloneFilter,
+    bundle_dir: Path,
+    carried: dict[str, list] | None = None,
+    previous_archive: Path | None = None,
+) -> dict[str, list]:
+    """
+    Packs the files matching the filter into BUNDLE_ARCHIVE_NAME and writes BUNDLE_MANIFEST_NAME next to it.
+    Files of the previous bundle can be carried over, e.g. the ones only on the cloud when they are kept like
+    the rclone copy does.
+
+    Parameters:
+    root (str): The sync root.
+    sync_filter (RcloneFilter): Filter of the sync target.
+    bundle_dir (Path): Directory to write the bundle to.
+    carried (dict[str, list] | None): Entries of the previous bundle to carry over, unless the file got packed.
+    previous_archive (Path | None): Path of the previous archive, required if any file is carried over.
+
+    Returns:
+    dict[str, list]: Relative path to [size, mtime_ns, sha256] of each packed file.
+
+    Raises:
+    OSError: If a file cannot be read.
+    ValueError: If the previous bundle contains an unsafe path.
+    tarfile.TarError: If a file shrinks while being packed, or the previous archive cannot be read.
+    """
+    entries = dict()
+    with tarfile.open(
+        bundle_dir / BUNDLE_ARCHIVE_NAME, "w:gz", compresslevel=BUNDLE_COMPRESS_LEVEL
+    ) as archive:
+        for path, stat in sync_filter.walk(root):
+            info = tarfile.TarInfo(path)
+            info.size = stat.st_size
+            info.mtime = stat.st_mtime
+            info.mode = stat.st_mode & 0o777
+            with open(os.path.join(root, path), "rb") as f:
+                reader = _HashingReader(f)
+                archive.addfile(info, reader)
+            entries[path] = [stat.st_size, stat.st_mtime_ns, reader.hash.hexdigest()]
+
+        if carried:
+            with tarfile.open(previous_archive, "r:gz") as previous:
+                for info in previous:
+                    if (not info.isfile()) or (info.name not in carried) or (info.name in entries):
+                        continue
+                    _check_path(info.name)
+                    reader = _HashingReader(previous.extractfile(info))
+                    archive.addfile(info, reader)
+                    entries[info.name] = [info.size, carried[info.name][1], reader.hash.hexdigest()]
+
+    write_manifest(bundle_dir / BUNDLE_MANIFEST_NAME, entries)
+    return entries
+
+
+def unpack(root: str, archive_path: Path, entries: dict[str, list], paths: set[str]):
+    """
+    Extracts files from a bundle, each one is written to a temporary file first and then moved into place.
+
+    Parameters:
+    root (str): The sync root.
+    archive_path (Path): Path of the archive.
+    entries (dict[str, list]): Entries from the manifest of the bundle.
+    paths (set[str]): Relative paths of the files to extract.
+
+    Raises:
+    ValueError: If the bundle contains an unsafe path, or a file doesn't match the manifest.
+    OSError: If a file cannot be written.
+    """
+    with tarfile.open(archive_path, "r:gz") as archive:
+        for info in archive:
+            if (not info.isfile()) or (info.name not in paths):
+                continue
+            _check_path(info.name)
+
+            target = os.path.join(root, info.name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            try:
+                file_hash = hashlib.sha256()
+                with archive.extractfile(info) as src, open(tmp_path, "wb") as dst:
+                    while chunk := src.read(_HASH_CHUNK_SIZE):
+                        file_hash.update(chunk)
+                        dst.write(chunk)
+                # the archive and the manifest are uploaded separately and may not match
+                if file_hash.hexdigest() != entries[info.name][2]:
+                    raise ValueError(f"Hash of {info.name} doesn't match the manifest")
+                os.chmod(tmp_path, info.mode or 0o644)
+                mtime_ns = entries[info.name][1]
+                os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+                os.replace(tmp_path, target)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+
+def read_manifest(path: Path) -> dict[str, list] | None:
+    """
+    Reads the entries of a bundle manifest.
+
+    Parameters:
+    path (Path): Path of the manifest.
+
+    Returns:
+    dict[str, list] | None: Relative path to [size, mtime_ns, sha256] of each file, None if it doesn't exist or cannot be read.
+    """
+    try:
+        with path.open("r") as f:
+            manifest: dict[str, Any] = json.load(f)
+        if manifest.get("version") != BUNDLE_VERSION:
+            logger.warning(f"Unsupported bundle version: {manifest.get('version')}")
+            return None
+        return manifest["files"]
+    except Exception:
+        return None
+
+
+def write_manifest(path: Path, entries: dict[str, list]):
+    """
+    Writes the entries of a bundle to a manifest.
+
+    Parameters:
+    path (Path): Path of the manifest.
+    entries (dict[str, list]): Relative path to [size, mtime_ns, sha256] of each file.
+    """
+    with path.open("w") as f:
+        json.dump({"version": BUNDLE_VERSION, "files": entries}, f)
@@ -0,0 +1,124 @@
+from typing import Any
+import secrets, time
+
+from common_defs import *
+
+# seconds a plan can be executed after it got computed
+SYNC_PLAN_TTL = 600
+
+
+def diff_listings(
+    local: dict[str, list],
+    cloud: dict[str, list],
+    winner: RcloneSyncWinner,
+    sync_mode: RcloneSyncMode,
+    mod_time_precision: float | None,
+) -> dict[str, Any]:
+    """
+    Compares the listings of both sides the way rclone does, by size and modification time,
+    or by size only if the backend doesn't keep modification times.
+
+    Parameters:
+    local (dict[str, list]): Relative path to [size, mtime] of each local file.
+    cloud (dict[str, list]): Relative path to [size, mtime] of each file on the cloud.
+    winner (RcloneSyncWinner): The winner of the sync, its files overwrite the ones of the other side.
+    sync_mode (RcloneSyncMode): COPY and SYNC go from the winner to the other side, SYNC deleting the files
+                                missing on the winner. BISYNC is planned as a resync, copying in both directions.
+    mod_time_precision (float | None): Precision of modification times on the cloud in seconds, None if unsupported.
+
+    Returns:
+    dict[str, Any]: Relative paths sorted to upload ("upload"), download ("download"),
+                    delete locally ("delete_local") and delete on the cloud ("delete_cloud").
+    """
+    window = None if mod_time_precision is None else max(mod_time_precision, 1)
+
+    def same(a: list, b: list) -> bool:
+        return (a[0] == b[0]) and ((window is None) or (abs(a[1] - b[1]) <= window))
+
+    only_local = sorted(set(local) - set(cloud))
+    only_cloud = sorted(set(cloud) - set(local))
+    changed = sorted(path for path in set(local) & set(cloud) if not same(local[path], cloud[path]))
+
+    plan = {"upload": [], "download": [], "delete_local": [], "delete_cloud": []}
+    if sync_mode == RcloneSyncMode.BISYNC:
+        plan["upload"] = sorted(only_local + (changed if winner == RcloneSyncWinner.LOCAL else []))
+        plan["download"] = sorted(only_cloud + (changed if winner == RcloneSyncWinner.CLOUD else []))
+    elif winner == RcloneSyncWinner.LOCAL:
+        plan["upload"] = sorted(only_local + changed)
+        if sync_mode == RcloneSyncMode.SYNC:
+            plan["delete_cloud"] = only_cloud
+    else:
+        plan["download"] = sorted(only_cloud + changed)
+        if sync_mode == RcloneSyncMode.SYNC:
+            plan["delete_local"] = only_local
+
+    return plan
+
+
+def summarize_plan(plan: dict[str, Any], local: dict[str, list], cloud: dict[str, list]) -> dict[str, Any]:
+    """
+    Describes what a plan does to each side.
+
+    Parameters:
+    plan (dict[str, Any]): The plan, see diff_listings.
+    local (dict[str, list]): Relative path to [size, mtime] of each local file.
+    cloud (dict[str, list]): Relative path to [size, mtime] of each file on the cloud.
+
+    Returns:
+    dict[str, Any]: For "local" and "cloud", the files created as [path, size] ("new"),
+                    overwritten as [path, size, new size] ("changed") and deleted as [path, size] ("deleted"),
+                    and the bytes to transfer ("bytes").
+    """
+
+    def describe(files: list[str], source: dict[str, list], destination: dict[str, list], deleted: list[str]):
+        return {
+            "new": [[path, source[path][0]] for path in files if path not in destination],
+            "changed": [[path, destination[path][0], source[path][0]] for path in files if path in destination],
+            "deleted": [[path, destination[path][0]] for path in deleted],
+        }
+
+    return {
+        "local": describe(plan["download"], cloud, local, plan["delete_local"]),
+        "cloud": describe(plan["upload"], local, cloud, plan["delete_cloud"]),
+        "bytes": sum(local[path][0] for path in plan["upload"]) + sum(cloud[path][0] for path in plan["download"]),
+    }
+
+
+class SyncPlanStore:
+    _plans: dict[str, dict[str, Any]] = dict()
+
+    @classmethod
+    def add(cls, plan: dict[str, Any]) -> str:
+        """
+        Keeps a plan until it gets executed or expires after SYNC_PLAN_TTL seconds.
+
+        Parameters:
+        plan (dict[str, Any]): The plan.
+
+        Returns:
+        str: ID of the plan.
+        """
+        now = time.time()
+        for plan_id in [plan_id for plan_id, kept in cls._plans.items() if kept["expires"] < now]:
+            del cls._plans[plan_id]
+
+        plan_id = secrets.token_hex(8)
+        cls._plans[plan_id] = {**plan, "expires": now + SYNC_PLAN_TTL}
+        return plan_id
+
+    @classmethod
+    def pop(cls, plan_id: str) -> dict[str, Any] | None:
+        """
+        Takes a plan out for execution, a plan can only be executed once.
+
+        Parameters:
+        plan_id (str): ID of the plan.
+
+        Returns:
+        dict[str, Any] | None: The plan, None if it doesn't exist or has expired.
+        """
+        plan = cls._plans.pop(plan_id, None)
+        if (plan is None) or (plan["expires"] < time.time()):
+            return None
+
+        return plan
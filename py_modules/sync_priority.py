@@ -0,0 +1,197 @@
+from functools import cache
+from pathlib import Path
+import os, shutil, signal
+
+from config import *
+
+# ioprio_set(2) on x86_64, the architecture of the Steam Deck
+IOPRIO_SET_SYSCALL = 251
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_BE_NORMAL = 4
+
+_libc = None
+
+
+def _get_libc() -> "ctypes.CDLL":
+    """
+    Loads libc for the ioprio_set syscall, which is not exposed by the standard library.
+    """
+    import ctypes
+
+    global _libc
+    if not _libc:
+        _libc = ctypes.CDLL(None, use_errno=True)
+
+    return _libc
+
+
+def set_io_priority(tid: int, io_class: int, level: int = 0):
+    """
+    Sets the IO priority of a thread.
+
+    Parameters:
+    tid (int): ID of the thread, 0 for the calling one.
+    io_class (int): IOPRIO_CLASS_BE or IOPRIO_CLASS_IDLE.
+    level (int): Level within the class, 0 is the highest.
+
+    Raises:
+    OSError: If the priority cannot be set.
+    """
+    import ctypes
+
+    if _get_libc().syscall(IOPRIO_SET_SYSCALL, IOPRIO_WHO_PROCESS, tid, (io_class << IOPRIO_CLASS_SHIFT) | level) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+@cache
+def _which(command: str) -> str | None:
+    """
+    Finds a command in PATH, the result is cached as it doesn't change while the plugin runs.
+    """
+    return shutil.which(command)
+
+
+def get_lower_priority_command(nice: int) -> list[str]:
+    """
+    Returns the command prefix that runs a program with lower CPU and IO priority. The priority is set by
+    nice and ionice before they exec the program, so every thread of the program inherits it, without running
+    anything in the forked child like preexec_fn does, which may deadlock as the plugin runs threads.
+
+    Parameters:
+    nice (int): Increment of the nice value.
+
+    Returns:
+    list[str]: The prefix, e.g. ["/usr/bin/nice", "-n", "10", "/usr/bin/ionice", "-c", "3"].
+               Tools that are not installed are left out.
+    """
+    prefix = []
+    if nice_path := _which("nice"):
+        prefix.extend([nice_path, "-n", str(nice)])
+    if ionice_path := _which("ionice"):
+        prefix.extend([ionice_path, "-c", str(IOPRIO_CLASS_IDLE)])
+    if not prefix:
+        logger.warning("Neither nice nor ionice is installed, running without background priority")
+
+    return prefix
+
+
+class SyncPriority:
+    _running_games: set[str] = set()
+    # pid -> whether the process can be stopped and started again
+    _background_processes: dict[int, bool] = dict()
+    _restarts: set[int] = set()
+
+    @classmethod
+    def set_game_running(cls, app_id: int, running: bool):
+        """
+        Tracks the running games, background syncs get their priority raised once no game is running.
+
+        Parameters:
+        app_id (int): The app ID of the game.
+        running (bool): Whether the game started or stopped.
+        """
+        if running:
+            cls._running_games.add(str(app_id))
+        else:
+            cls._running_games.discard(str(app_id))
+            if not cls._running_games:
+                cls.raise_priority()
+
+    @classmethod
+    def is_background(cls, target: str) -> bool:
+        """
+        Checks if a sync should run in the background, i.e. a game is running and the sync is not the one of the game,
+        which the game waits for on start.
+
+        Parameters:
+        target (str): ID of the sync target.
+
+        Returns:
+        bool: True if the sync should run with background priority.
+        """
+        return (
+            Config.get_config_item("background_priority")
+            and bool(cls._running_games)
+            and (target not in cls._running_games)
+        )
+
+    @classmethod
+    def register(cls, pid: int, restartable: bool):
+        """
+        Tracks a process started with background priority, to raise it once no game is running.
+
+        Parameters:
+        pid (int): The process ID.
+        restartable (bool): Whether the process can be stopped and started again at normal priority,
+                            in case its nice value cannot be lowered.
+        """
+        cls._background_processes[pid] = restartable
+
+    @classmethod
+    def unregister(cls, pid: int) -> bool:
+        """
+        Stops tracking a process started with background priority.
+
+        Parameters:
+        pid (int): The process ID.
+
+        Returns:
+        bool: True if the process got stopped by raise_priority, to be started again at normal priority.
+        """
+        cls._background_processes.pop(pid, None)
+        if pid in cls._restarts:
+            cls._restarts.discard(pid)
+            return True
+
+        return False
+
+    @classmethod
+    def raise_priority(cls):
+        """
+        Restores the CPU and IO priority of the background processes and lifts their bandwidth limit.
+        Lowering the nice value requires CAP_SYS_NICE, which the plugin doesn't have unless it runs as root.
+        If it fails, a restartable process is stopped to be started again at normal priority,
+        others keep their nice value with the IO priority restored.
+        """
+        bwlimit = Config.get_config_item("background_bwlimit")
+        for pid, restartable in cls._background_processes.items():
+            logger.info(f"Raising priority of background process {pid}")
+            try:
+                tids = [int(task.name) for task in Path(f"/proc/{pid}/task").iterdir()]
+            except OSError:
+                continue
+
+            niced = False
+            for tid in tids:
+                try:
+                    set_io_priority(tid, IOPRIO_CLASS_BE, IOPRIO_BE_NORMAL)
+                except OSError as e:
+                    logger.warning(f"Failed to raise IO priority of thread {tid} of process {pid}: {e}")
+                try:
+                    os.setpriority(os.PRIO_PROCESS, tid, 0)
+                except OSError as e:
+                    if not niced:
+                        logger.info(f"Failed to lower the nice value of process {pid}: {e}")
+                    niced = True
+
+            if niced and restartable:
+                logger.info(f"Stopping background process {pid} to start it again at normal priority")
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    cls._restarts.add(pid)
+                    continue
+                except OSError as e:
+                    logger.warning(f"Failed to stop background process {pid}: {e}")
+
+            if bwlimit:
+                # rclone toggles its bandwidth limit on SIGUSR2
+                try:
+                    os.kill(pid, signal.SIGUSR2)
+                except OSError as e:
+                    logger.warning(f"Failed to lift the bandwidth limit of process {pid}: {e}")
+
+        cls._background_processes.clear()
@@ -0,0 +1,100 @@
+from asyncio import Condition, Future, Task
+from typing import Awaitable, Callable
+import asyncio
+
+from config import *
+
+
+class SyncScheduler:
+    _pending: dict[str, list[tuple[str, Future, Callable[[], Awaitable[int]]]]] = dict()
+    _runners: dict[str, Task] = dict()
+    _running = 0
+    _condition = Condition()
+
+    @classmethod
+    async def submit(
+        cls, target_id: str, operation: str, sync_task: Callable[[], Awaitable[int]]
+    ) -> int:
+        """
+        Schedules a sync task, tasks of the same target run one after another in order,
+        while tasks of different targets run in parallel, up to "sync_concurrency" at a time.
+        A task that duplicates one still waiting for the same target gets merged into it.
+
+        Parameters:
+        target_id (str): ID of the sync target.
+        operation (str): Name of the operation, tasks with the same name on the same target are duplicates.
+        sync_task (Callable[[], Awaitable[int]]): The sync task to be executed.
+
+        Returns:
+        int: Exit code of the sync task, shared by all the merged requests.
+        """
+        pending = cls._pending.setdefault(target_id, [])
+        for pending_operation, future, _ in pending:
+            if pending_operation == operation:
+                logger.info(f'Merging "{operation}" into the pending one of "{target_id}"')
+                return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        pending.append((operation, future, sync_task))
+        if target_id not in cls._runners:
+            cls._runners[target_id] = asyncio.create_task(cls._run_target(target_id))
+
+        return await asyncio.shield(future)
+
+    @classmethod
+    def cancel(cls, target_id: str, result: int) -> int:
+        """
+        Drops the tasks of a target still waiting to start.
+
+        Parameters:
+        target_id (str): ID of the sync target.
+        result (int): Exit code the requests of the dropped tasks get.
+
+        Returns:
+        int: Number of dropped tasks.
+        """
+        pending = cls._pending.get(target_id, [])
+        for operation, future, _ in pending:
+            logger.info(f'Dropping "{operation}" of "{target_id}"')
+            future.set_result(result)
+
+        dropped = len(pending)
+        pending.clear()
+        return dropped
+
+    @classmethod
+    async def _run_target(cls, target_id: str):
+        """
+        Runs the pending tasks of a target until there's none left.
+
+        Parameters:
+        target_id (str): ID of the sync target.
+        """
+        pending = cls._pending[target_id]
+        try:
+            while True:
+                async with cls._condition:
+                    await cls._condition.wait_for(
+                        lambda: not pending or cls._running < max(1, Config.get_config_item("sync_concurrency"))
+                    )
+                    # the tasks may have been dropped by cancel while waiting for the slot,
+                    # leave without awaiting anything else so a new submit can't find this runner exiting
+                    if not pending:
+                        break
+                    cls._running += 1
+
+                try:
+                    operation, future, sync_task = pending.pop(0)
+                    try:
+                        future.set_result(await sync_task())
+                    except Exception as e:
+                        logger.error(f'Error during "{operation}" of "{target_id}": {e}')
+                        future.set_exception(e)
+                finally:
+                    async with cls._condition:
+                        cls._running -= 1
+                        cls._condition.notify_all()
+        finally:
+            for _, future, _ in cls._pending.pop(target_id):
+                future.cancel()
+            del cls._runners[target_id]
@@ -0,0 +1,192 @@
+import decky
+
+from pathlib import Path
+from typing import Any
+import json, math, threading, time
+
+from common_defs import *
+
+SYNC_STATS_PATH = Path(decky.DECKY_PLUGIN_RUNTIME_DIR) / "sync_stats.db"
+SYNC_STATS_MAX_RECORDS = 200
+SYNC_STATS_FIELDS = [
+    "target",
+    "mode",
+    "winner",
+    "args",
+    "started",
+    "duration",
+    "bytes",
+    "files",
+    "checks",
+    "errors",
+    "retries",
+    "exit_code",
+]
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    """
+    Calculates the nearest-rank percentiles of the values.
+
+    Parameters:
+    values (list[float]): The values.
+
+    Returns:
+    dict[str, float]: p50, p90, p99 and max of the values, all 0 if there's no value.
+    """
+    values = sorted(values)
+    if not values:
+        return {"p50": 0, "p90": 0, "p99": 0, "max": 0}
+
+    percentiles = {f"p{p}": values[math.ceil(len(values) * p / 100) - 1] for p in (50, 90, 99)}
+    percentiles["max"] = values[-1]
+    return percentiles
+
+
+class SyncStats:
+    _connection: "sqlite3.Connection | None" = None
+    # the connection is shared by the event loop and the RPC worker threads, its users take turns
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_connection(cls) -> "sqlite3.Connection":
+        """
+        Opens the sync stats database, callers hold _lock while they use the connection.
+
+        Returns:
+        sqlite3.Connection: The connection to the sync stats database.
+        """
+        if not cls._connection:
+            import sqlite3
+
+            connection = sqlite3.connect(
+                str(SYNC_STATS_PATH), check_same_thread=False, isolation_level=None
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS syncs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT NOT NULL, mode TEXT NOT NULL, "
+                "winner TEXT NOT NULL, args TEXT NOT NULL, started REAL NOT NULL, duration REAL NOT NULL, "
+                "bytes INTEGER NOT NULL, files INTEGER NOT NULL, checks INTEGER NOT NULL, "
+                "errors INTEGER NOT NULL, retries INTEGER NOT NULL, exit_code INTEGER NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS syncs_target ON syncs (target, id)")
+            cls._connection = connection
+
+        return cls._connection
+
+    @classmethod
+    def record(
+        cls,
+        target: str,
+        mode: RcloneSyncMode,
+        winner: RcloneSyncWinner,
+        args: list[str],
+        started: float,
+        stats: dict[str, Any],
+        retries: int,
+        exit_code: int,
+    ):
+        """
+        Records a finished sync, only the latest SYNC_STATS_MAX_RECORDS syncs of each target are kept.
+
+        Parameters:
+        target (str): ID of the sync target.
+        mode (RcloneSyncMode): Mode of the sync.
+        winner (RcloneSyncWinner): Winner of the sync.
+        args (list[str]): Additional arguments the sync ran with.
+        started (float): Start time of the sync as a timestamp.
+        stats (dict[str, Any]): The final stats reported by rclone.
+        retries (int): Number of retries of the sync.
+        exit_code (int): Exit code of the sync.
+        """
+        import sqlite3
+
+        try:
+            with cls._lock:
+                connection = cls._get_connection()
+                with connection:
+                    connection.execute("BEGIN")
+                    connection.execute(
+                        f"INSERT INTO syncs ({', '.join(SYNC_STATS_FIELDS)}) "
+                        f"VALUES ({', '.join('?' * len(SYNC_STATS_FIELDS))})",
+                        (
+                            target,
+                            mode.value,
+                            winner.value,
+                            json.dumps(args),
+                            started,
+                            time.time() - started,
+                            stats.get("bytes", 0),
+                            stats.get("transfers", 0),
+                            stats.get("checks", 0),
+                            stats.get("errors", 0),
+                            retries,
+                            exit_code,
+                        ),
+                    )
+                    connection.execute(
+                        "DELETE FROM syncs WHERE target = ? AND id <= "
+                        "(SELECT id FROM syncs WHERE target = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (target, target, SYNC_STATS_MAX_RECORDS),
+                    )
+        except sqlite3.Error as e:
+            logger.error(f'Failed to record sync stats of "{target}": {e}')
+
+    @classmethod
+    def get_history(cls, target: str, limit: int = 50) -> list[dict[str, Any]]:
+        """
+        Retrieves the latest syncs of a target.
+
+        Parameters:
+        target (str): ID of the sync target.
+        limit (int): Max number of syncs to return.
+
+        Returns:
+        list[dict[str, Any]]: The syncs, newest first.
+        """
+        with cls._lock:
+            rows = cls._get_connection().execute(
+                f"SELECT {', '.join(SYNC_STATS_FIELDS)} FROM syncs WHERE target = ? ORDER BY id DESC LIMIT ?",
+                (target, limit),
+            ).fetchall()
+        history = [dict(zip(SYNC_STATS_FIELDS, row)) for row in rows]
+        for sync in history:
+            sync["args"] = json.loads(sync["args"])
+
+        return history
+
+    @classmethod
+    def get_summary(cls, target: str, limit: int = 50) -> dict[str, Any]:
+        """
+        Summarizes the latest syncs of a target.
+
+        Parameters:
+        target (str): ID of the sync target.
+        limit (int): Max number of syncs to summarize and return.
+
+        Returns:
+        dict[str, Any]: Number of syncs ("count") and failed ones ("failures"),
+                        percentiles of "duration", "bytes" and "files", and the syncs themselves ("history").
+        """
+        history = cls.get_history(target, limit)
+
+        return {
+            "target": target,
+            "count": len(history),
+            "failures": sum(sync["exit_code"] not in (0, 6) for sync in history),
+            "duration": _percentiles([sync["duration"] for sync in history]),
+            "bytes": _percentiles([sync["bytes"] for sync in history]),
+            "files": _percentiles([sync["files"] for sync in history]),
+            "history": history,
+        }
+
+    @classmethod
+    def get_targets(cls) -> list[str]:
+        """
+        Retrieves the IDs of all targets that have recorded syncs.
+
+        Returns:
+        list[str]: The sync target IDs.
+        """
+        with cls._lock:
+            return [row[0] for row in cls._get_connection().execute("SELECT DISTINCT target FROM syncs")]
@@ -2,51 +2,236 @@ import decky
 
 from datetime import datetime
 from pathlib import Path
-from asyncio.subprocess import create_subprocess_exec, PIPE
+from asyncio import Future, StreamReader, Task, TimerHandle
+from asyncio.subprocess import create_subprocess_exec, Process, PIPE
 from subprocess import list2cmdline
-from typing import Awaitable, Callable
-import logging
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from typing import Any, Awaitable, Callable, TextIO
+import asyncio, copy, hashlib, json, logging, os, re, socket, time
 
 from config import *
 from utils import *
+from dirty_watcher import DirtyWatcher
+from filter_store import FilterStore
+from rclone_config import RcloneConfig
+from rclone_filter import RcloneFilter
+from rclone_manager import RcloneManager
+from sync_plan import SyncPlanStore, diff_listings, summarize_plan
+from sync_scheduler import SyncScheduler
+from sync_priority import SyncPriority, get_lower_priority_command
+from sync_stats import SyncStats
+from sync_tuner import SyncTuner
 
 ONGOING_SYNCS = set()
+SYNC_TASKS: dict[str, Task] = dict()
+CANCELLED_SYNCS: set[str] = set()
+SYNC_PROGRESS: dict[str, dict[str, Any]] = dict()
+MIRROR_RESULTS: dict[str, dict[str, int]] = dict()
+MIRROR_PROGRESS: dict[str, dict[str, dict[str, Any]]] = dict()
+# rclone runs of each ongoing sync, recorded as one sync when it ends
+SYNC_RUNS: dict[str, dict[str, Any]] = dict()
+SYNC_RUN_COUNTERS = ["bytes", "transfers", "checks", "errors", "retries"]
 PLUGIN_EXCLUDE_ALL_FILTER_PATH = Path(decky.DECKY_PLUGIN_DIR) / "exclude_all.filter"
+RCLONE_RETRY_PATTERN = re.compile(r"Attempt \d+/\d+ failed")
+RCLONE_FILTER_FLAGS = {"FilterFrom": "--filter-from", "IncludeRule": "--include", "MaxSize": "--max-size"}
+RCLONE_CONFIG_FLAGS = {
+    "CheckSum": "--checksum",
+    "SizeOnly": "--size-only",
+    "IgnoreChecksum": "--ignore-checksum",
+    "Transfers": "--transfers",
+    "Checkers": "--checkers",
+}
+# generation markers this close to the newest one are considered current, as not every cloud keeps the uploaded mtime
+MIRROR_MARKER_TOLERANCE = 60
 
 
 class _SyncTarget:
     _filter_required = True
+    _plannable = True
     _sync_mode = RcloneSyncMode.COPY
-    _shared_filter_file = PLUGIN_CONFIG_DIR / f"{SHARED_FILTER_NAME}.filter"
 
     def __init__(self, id: str):
         self._id = id
         self._log_dir = Path(decky.DECKY_PLUGIN_LOG_DIR) / self._id
         self._rclone_log_path = None
-        self._target_filter_file = PLUGIN_CONFIG_DIR / f"{self._id}.filter"
+        self._transferred: set[str] = set()
+        self._last_stats: dict[str, Any] = dict()
+        self._retries = 0
+        self._remote: str | None = None
+        self._background = False
+
+    @property
+    def id(self) -> str:
+        """
+        ID of the sync target.
+        """
+        return self._id
 
     async def _start_sync_task(self, sync_task: Callable[[], Awaitable[int]]) -> int:
         """
         Wrapper of the sync_function for preparation and clean up.
+        The sync gets cancelled if it runs longer than "sync_timeout" seconds, or by cancel.
 
         Parameters:
         sync_function (Callable[[], Awaitable[int]]): The sync task to be executed.
 
         Returns:
-        int: Exit code of the sync process.
+        int: Exit code of the sync process, SYNC_TIMED_OUT or SYNC_CANCELLED if it got stopped.
         """
         if self._id in ONGOING_SYNCS:
             return -1
 
         ONGOING_SYNCS.add(self._id)
+        SYNC_RUNS[self._id] = {"started": time.time(), "remotes": dict(), "log": None}
+        task = SYNC_TASKS[self._id] = asyncio.create_task(sync_task())
+        sync_result = -1
         try:
-            sync_result = await sync_task()
+            sync_result = await asyncio.wait_for(task, Config.get_config_item("sync_timeout") or None)
+        except asyncio.TimeoutError:
+            logger.error(f'Sync for "{self._id}" timed out')
+            sync_result = SYNC_TIMED_OUT
+        except asyncio.CancelledError:
+            if self._id not in CANCELLED_SYNCS:
+                # the caller got cancelled, not the sync, which gets stopped before giving up
+                task.cancel()
+                await asyncio.wait([task])
+                raise
+            logger.warning(f'Sync for "{self._id}" got cancelled')
+            sync_result = SYNC_CANCELLED
         except Exception as e:
             logger.error("Error during sync: %s", e)
-            sync_result = -1
-        ONGOING_SYNCS.discard(self._id)
+        finally:
+            if task.cancelled():
+                self._cleanup_interrupted()
+            ONGOING_SYNCS.discard(self._id)
+            SYNC_PROGRESS.pop(self._id, None)
+            SYNC_TASKS.pop(self._id, None)
+            CANCELLED_SYNCS.discard(self._id)
+            self._record_runs(SYNC_RUNS.pop(self._id), sync_result)
+
         return sync_result
 
+    def _record_runs(self, runs: dict[str, Any], sync_result: int):
+        """
+        Records a sync to the sync stats as one, no matter how many rclone runs it took, e.g. the copies of
+        a chunked sync, the steps of a bundle or one run per mirror. Counters are added up over the runs
+        on each remote, and taken from the remote with the most, as mirrors all get the same files.
+        Syncs that didn't run rclone, e.g. skipped ones, are not recorded.
+
+        Parameters:
+        runs (dict[str, Any]): The rclone runs of the sync, see _add_run.
+        sync_result (int): Exit code of the sync.
+        """
+        if "first" not in runs:
+            return
+
+        mode, winner, args = runs["first"]
+        totals = {
+            counter: max(remote[counter] for remote in runs["remotes"].values()) for counter in SYNC_RUN_COUNTERS
+        }
+        SyncStats.record(
+            self._id, mode, winner, args, runs["started"], totals, totals.pop("retries"), sync_result
+        )
+
+    def _add_run(self, winner: RcloneSyncWinner, args: list[str]):
+        """
+        Adds the final stats of an rclone run to the ongoing sync of the target.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the run.
+        args (list[str]): Additional arguments the run had.
+        """
+        if (runs := SYNC_RUNS.get(self._id)) is None:
+            return
+
+        # the mode, winner and arguments of the sync are the ones of its first run, usually the main one
+        runs.setdefault("first", (self._sync_mode, winner, args))
+        remote = runs["remotes"].setdefault(self._get_remote(), dict.fromkeys(SYNC_RUN_COUNTERS, 0))
+        for counter in SYNC_RUN_COUNTERS:
+            remote[counter] += self._last_stats.get(counter, 0)
+        remote["retries"] += self._retries
+
+    def cancel(self) -> bool:
+        """
+        Cancels the running sync, rclone gets SIGTERM and then SIGKILL if it doesn't exit within
+        "sync_kill_timeout" seconds.
+
+        Returns:
+        bool: True if a sync was running.
+        """
+        if not (task := SYNC_TASKS.get(self._id)) or task.done():
+            return False
+
+        logger.info(f'Cancelling sync for "{self._id}"')
+        CANCELLED_SYNCS.add(self._id)
+        task.cancel()
+        return True
+
+    def _cleanup_interrupted(self):
+        """
+        Cleans up after a sync that got stopped, its files may be left half synced.
+        """
+        pass
+
+    def preview(self, max_files: int = 1000) -> dict[str, Any]:
+        """
+        Evaluates the filters locally to summarize the files that will be uploaded, without running rclone.
+
+        Parameters:
+        max_files (int): Max number of files to list, the count and size always cover all files.
+
+        Returns:
+        dict[str, Any]: Number of files ("count"), total bytes ("bytes"),
+                        matched files sorted by path as [path, size] ("files"), and whether the list got truncated ("truncated").
+        """
+        if not FilterStore.has(self._id):
+            return {"count": 0, "bytes": 0, "files": [], "truncated": False}
+
+        sync_filter = RcloneFilter.from_files(*self._get_filter_files())
+        return sync_filter.preview(Config.get_config_item("sync_root"), max_files)
+
+    def get_progress(self) -> dict[str, Any]:
+        """
+        Retrieves the progress of the running sync.
+
+        Returns:
+        dict[str, Any]: The latest stats reported by rclone, empty if no sync is running.
+        """
+        return SYNC_PROGRESS.get(self._id, {})
+
+    def _update_progress(self, stats: dict[str, Any]):
+        """
+        Updates the progress of the running sync from rclone stats,
+        which continues the progress of the earlier rclone runs of the sync, e.g. the chunks of a chunked sync.
+
+        Parameters:
+        stats (dict[str, Any]): Stats reported by rclone, either from the json log or the core/stats rc call.
+        """
+        self._last_stats = stats
+        runs = SYNC_RUNS.get(self._id, {})
+        done = runs.get("remotes", {}).get(self._get_remote(), {})
+        progress = {
+            "bytes": done.get("bytes", 0) + stats.get("bytes", 0),
+            "total_bytes": done.get("bytes", 0) + stats.get("totalBytes", 0),
+            "files": done.get("transfers", 0) + stats.get("transfers", 0),
+            "total_files": done.get("transfers", 0) + stats.get("totalTransfers", 0),
+            "checks": done.get("checks", 0) + stats.get("checks", 0),
+            "total_checks": done.get("checks", 0) + stats.get("totalChecks", 0),
+            "errors": done.get("errors", 0) + stats.get("errors", 0),
+            "speed": stats.get("speed", 0),
+            "eta": stats.get("eta"),
+            "elapsed": (time.time() - runs["started"]) if runs else stats.get("elapsedTime", 0),
+            "transferring": [
+                transfer.get("name") for transfer in stats.get("transferring") or []
+            ],
+            "updated": time.time(),
+        }
+
+        if (mirrors := MIRROR_PROGRESS.get(self._id)) is not None:
+            mirrors[self._get_remote()] = progress
+            progress = combine_progress(list(mirrors.values()))
+        SYNC_PROGRESS[self._id] = progress
+
     async def sync(self, winner: RcloneSyncWinner) -> int:
         """
         Runs the rclone sync process.
@@ -63,9 +248,187 @@ class _SyncTarget:
 
         return await self._start_sync_task(sync_task)
 
+    async def plan(self, winner: RcloneSyncWinner) -> dict[str, Any]:
+        """
+        Computes what a sync would do to each side without running it, from the local files and the files
+        on the cloud matched by the filters. Bisync is planned as a resync. The plan can be executed with execute_plan.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+
+        Returns:
+        dict[str, Any]: ID of the plan ("plan_id"), the winner ("winner") and mode ("mode") of the sync,
+                        and what it does to each side, see summarize_plan.
+
+        Raises:
+        ValueError: If the target doesn't support plans, has no filter, or its files cannot be listed.
+        """
+        if not self._plannable:
+            raise ValueError(f'Sync plans are not supported for "{self._id}"')
+        if not FilterStore.has(self._id):
+            raise ValueError(f'No filter for sync "{self._id}"')
+
+        sync_filter = RcloneFilter.from_files(*self._get_filter_files())
+        cloud_state = await self._get_cloud_state()
+        local, cloud = await asyncio.gather(
+            asyncio.to_thread(self._list_local, sync_filter), self._list_remote(cloud_state)
+        )
+        if cloud is None:
+            raise ValueError(f'Failed to list the files of "{self._id}" on the cloud')
+
+        precision = RcloneConfig.get_capabilities(self._get_remote())["mod_time_precision"]
+        files = diff_listings(local, cloud, winner, self._sync_mode, precision)
+        # the local files the plan reads or writes, None for the ones it creates
+        touched = files["upload"] + files["download"] + files["delete_local"]
+        plan_id = SyncPlanStore.add(
+            {
+                "target": self._id,
+                "files": files,
+                "local_state": {path: local.get(path) for path in touched},
+                "cloud_state": cloud_state,
+            }
+        )
+        logger.info(
+            f'Planned sync of "{self._id}": {len(files["upload"])} uploads, {len(files["download"])} downloads, '
+            f'{len(files["delete_local"]) + len(files["delete_cloud"])} deletions'
+        )
+
+        return {
+            "plan_id": plan_id,
+            "winner": winner.value,
+            "mode": self._sync_mode.value,
+            **summarize_plan(files, local, cloud),
+        }
+
+    async def execute_plan(self, plan_id: str) -> int:
+        """
+        Executes a plan computed by plan, transferring and deleting exactly the files in it.
+        Nothing is done if the files changed since the plan got computed.
+
+        Parameters:
+        plan_id (str): ID of the plan, a plan can only be executed once.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run,
+             e.g. the plan doesn't exist, has expired or is outdated.
+        """
+        plan = SyncPlanStore.pop(plan_id)
+        if (plan is None) or (plan["target"] != self._id):
+            logger.warning(f'No sync plan "{plan_id}" for "{self._id}"')
+            return -1
+
+        async def sync_task():
+            return await self._run_plan(plan)
+
+        return await self._start_sync_task(sync_task)
+
+    async def _run_plan(self, plan: dict[str, Any]) -> int:
+        """
+        Transfers the files of a plan with --files-from, then deletes the files it deletes.
+
+        Parameters:
+        plan (dict[str, Any]): The plan, see plan.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        sync_root, sync_dest = Config.get_config_items("sync_root", "sync_destination")
+        files = plan["files"]
+        local_state = await asyncio.to_thread(self._get_local_state, sync_root, list(plan["local_state"]))
+        if local_state != plan["local_state"]:
+            logger.warning(f'Local files of "{self._id}" changed since the sync got planned')
+            return -1
+        if (plan["cloud_state"] is not None) and (plan["cloud_state"] != await self._get_cloud_state()):
+            logger.warning(f'Files of "{self._id}" on the cloud changed since the sync got planned')
+            return -1
+
+        remote_dir = self._get_remote_path(sync_dest, options=self._get_backend_options())
+        for winner, paths in ((RcloneSyncWinner.LOCAL, files["upload"]), (RcloneSyncWinner.CLOUD, files["download"])):
+            if paths:
+                sync_result = await FileTransferTarget(self._id, Path(sync_root), remote_dir, paths).transfer(winner)
+                if sync_result != 0:
+                    return sync_result
+
+        if files["delete_cloud"]:
+            with NamedTemporaryFile(
+                "w", dir=decky.DECKY_PLUGIN_RUNTIME_DIR, suffix=".files"
+            ) as files_from:
+                files_from.write("\n".join(files["delete_cloud"]))
+                files_from.flush()
+                if not await RcloneManager.delete_objects(self._get_remote_path(sync_dest), Path(files_from.name)):
+                    return 1
+        for path in files["delete_local"]:
+            try:
+                os.unlink(os.path.join(sync_root, path))
+            except OSError as e:
+                logger.warning(f"Failed to delete {path}: {e}")
+
+        logger.info(f'Planned sync of "{self._id}" finished')
+        return 0
+
+    def _list_local(self, sync_filter: RcloneFilter) -> dict[str, list]:
+        """
+        Lists the local files matched by the filters.
+
+        Parameters:
+        sync_filter (RcloneFilter): Filter of the target.
+
+        Returns:
+        dict[str, list]: Relative path to [size, mtime] of each file.
+        """
+        return {
+            path: [stat.st_size, stat.st_mtime]
+            for path, stat in sync_filter.walk(Config.get_config_item("sync_root"))
+        }
+
+    @staticmethod
+    def _get_local_state(sync_root: str, paths: list[str]) -> dict[str, list | None]:
+        """
+        Retrieves the size and mtime of local files.
+
+        Parameters:
+        sync_root (str): The sync root.
+        paths (list[str]): Relative paths of the files.
+
+        Returns:
+        dict[str, list | None]: Relative path to [size, mtime] of each file, None if it doesn't exist.
+        """
+        state = dict()
+        for path in paths:
+            try:
+                stat = os.stat(os.path.join(sync_root, path))
+                state[path] = [stat.st_size, stat.st_mtime]
+            except OSError:
+                state[path] = None
+
+        return state
+
+    async def _list_remote(self, cloud_state: Any = None) -> dict[str, list] | None:
+        """
+        Lists the files on the cloud matched by the filters.
+
+        Parameters:
+        cloud_state (Any): State of the cloud, see _get_cloud_state.
+
+        Returns:
+        dict[str, list] | None: Relative path to [size, mtime] of each file, None if the files cannot be listed.
+        """
+        return await RcloneManager.list_objects(
+            self._get_remote_path(Config.get_config_item("sync_destination")), self._get_filter_files()
+        )
+
+    async def _get_cloud_state(self) -> Any:
+        """
+        Retrieves a cheap indicator of changes to the files on the cloud.
+
+        Returns:
+        Any: The state, None if changes cannot be told.
+        """
+        return None
+
     def _get_rclone_log_path(self, max_log_files: int = 5) -> Path:
         """
-        Creates the rclone log file.
+        Creates the rclone log file, all rclone runs of a sync write to the same one.
 
         Parameters:
         max_log_files (int): Max number of log files to keep, old ones will be deleted.
@@ -73,6 +436,11 @@ class _SyncTarget:
         Returns:
         Path: The path to the created rclone log file.
         """
+        runs = SYNC_RUNS.get(self._id, {})
+        if runs.get("log"):
+            self._rclone_log_path = runs["log"]
+            return self._rclone_log_path
+
         self._log_dir.mkdir(parents=True, exist_ok=True)
 
         current_time = datetime.now().strftime("%Y-%m-%d %H.%M.%S")
@@ -84,6 +452,8 @@ class _SyncTarget:
             for old_log_file in all_log_files[: -(max_log_files - 1)]:
                 old_log_file.unlink(missing_ok=True)
 
+        if runs:
+            runs["log"] = self._rclone_log_path
         return self._rclone_log_path
 
     def get_last_sync_log(self) -> str:
@@ -93,12 +463,8 @@ class _SyncTarget:
         Returns:
         str: The last synchronization log contents.
         """
-        if not self._rclone_log_path:
-            all_log_files = sorted(self._log_dir.glob("rclone *.log"))
-            if all_log_files:
-                self._rclone_log_path = all_log_files[-1]
-            else:
-                return "No logs available."
+        if not self._find_last_rclone_log_path():
+            return "No logs available."
         try:
             with self._rclone_log_path.open() as f:
                 return f.read()
@@ -107,6 +473,34 @@ class _SyncTarget:
             logger.error(err_msg)
             return err_msg
 
+    def get_last_sync_log_page(
+        self, offset: int = -1, limit: int = 200, direction: str = "tail"
+    ) -> dict[str, Any]:
+        """
+        Retrieves a page of the last synchronization log, see utils.read_log_page.
+
+        Returns:
+        dict[str, Any]: The page of the last synchronization log.
+        """
+        if not self._find_last_rclone_log_path():
+            return {"text": "No logs available.", "start": 0, "end": 0, "size": 0, "inode": 0}
+
+        return read_log_page(self._rclone_log_path, offset, limit, direction)
+
+    def _find_last_rclone_log_path(self) -> Path | None:
+        """
+        Finds the log file of the last synchronization.
+
+        Returns:
+        Path | None: Path of the log file, None if there's no log.
+        """
+        if not self._rclone_log_path:
+            all_log_files = sorted(self._log_dir.glob("rclone *.log"))
+            if all_log_files:
+                self._rclone_log_path = all_log_files[-1]
+
+        return self._rclone_log_path
+
     def _get_sync_paths(
         self, winner: RcloneSyncWinner = RcloneSyncWinner.LOCAL
     ) -> tuple[str, str]:
@@ -121,18 +515,45 @@ class _SyncTarget:
         """
         sync_root, sync_dest = Config.get_config_items("sync_root", "sync_destination")
 
+        remote_path = self._get_remote_path(sync_dest, options=self._get_backend_options())
+
         if (winner == RcloneSyncWinner.CLOUD) and (
             self._sync_mode != RcloneSyncMode.BISYNC
         ):
-            return f"cloud:{sync_dest}", sync_root
+            return remote_path, sync_root
         else:
-            return sync_root, f"cloud:{sync_dest}"
+            return sync_root, remote_path
+
+    def _get_remote(self) -> str:
+        """
+        Returns the name of the remote the sync goes to, "sync_remote" in the configuration unless a mirror is picked.
+
+        Returns:
+        str: Name of the remote, e.g. "cloud".
+        """
+        return self._remote or Config.get_config_item("sync_remote")
+
+    def _get_remote_path(self, path: str, remote: str | None = None, options: dict[str, Any] = {}) -> str:
+        """
+        Returns a path on the remote the sync goes to.
+
+        Parameters:
+        path (str): The path on the remote, e.g. "sdh-game-sync".
+        remote (str | None): Name of the remote, None for the one the sync goes to.
+        options (dict[str, Any]): Options of the backend to set in the connection string, e.g. {"chunk_size": "64M"}.
+
+        Returns:
+        str: The remote path, e.g. "cloud:sdh-game-sync" or "cloud,chunk_size=64M:sdh-game-sync".
+        """
+        connection = "".join(f",{option}={value}" for option, value in options.items())
+        return f"{remote or self._get_remote()}{connection}:{path}"
 
     async def _rclone_execute(
         self, winner: RcloneSyncWinner, extra_args: list[str] = []
     ) -> int:
         """
-        Runs the rclone sync process.
+        Runs the rclone sync process. Syncs started while a game is running, other than the one of the game itself,
+        run in their own process with background priority, see SyncPriority.
 
         Parameters:
         winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
@@ -141,34 +562,56 @@ class _SyncTarget:
         Returns:
         int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
         """
-        if self._filter_required and (not self._target_filter_file.exists()):
+        if self._filter_required and (not FilterStore.has(self._id)):
             logger.info(f'No filter for sync "{self._id}"')
             return 0
 
-        if not self._shared_filter_file.exists():
-            self._shared_filter_file.touch(exist_ok=True)
+        self._last_stats = dict()
+        self._retries = 0
+        self._background = SyncPriority.is_background(self._id)
+        if RcloneManager.daemon_running() and not self._background:
+            sync_result = await self._rclone_rc_execute(winner, extra_args)
+        else:
+            sync_result = await self._rclone_cli_execute(winner, extra_args)
+
+        self._add_run(
+            winner,
+            self._get_config_args(extra_args)
+            + self._get_background_args()
+            + Config.get_config_item("additional_sync_args")
+            + extra_args,
+        )
+        return sync_result
+
+    async def _rclone_cli_execute(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> int:
+        """
+        Runs the sync as a new rclone process.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
 
+        Returns:
+        int: Exit code of the rclone sync process.
+        """
         arguments = ["--config", str(RCLONE_CFG_PATH), self._sync_mode.value]
         arguments.extend(self._get_sync_paths(winner))
 
-        if self._filter_required:
-            arguments.extend(
-                [
-                    "--filter-from",
-                    str(self._shared_filter_file),
-                    "--filter-from",
-                    str(self._target_filter_file),
-                    "--filter-from",
-                    str(PLUGIN_EXCLUDE_ALL_FILTER_PATH),
-                ]
-            )
+        for option, values in self._get_rclone_filter().items():
+            for value in values if isinstance(values, list) else [values]:
+                arguments.extend([RCLONE_FILTER_FLAGS[option], value])
+        arguments.extend(self._get_config_args(extra_args))
+        arguments.extend(self._get_background_args())
 
         arguments.extend(
             [
-                "--log-file",
-                str(self._get_rclone_log_path()),
-                "--log-format",
-                "none",
+                "--use-json-log",
+                "--stats",
+                "1s",
+                "--stats-log-level",
+                "NOTICE",
             ]
         )
 
@@ -181,61 +624,328 @@ class _SyncTarget:
         arguments.extend(self._get_verbose_flag())
 
         logger.info(f'Running command: "{RCLONE_BIN_PATH}" {list2cmdline(arguments)}')
+        prefix = get_lower_priority_command(Config.get_config_item("background_nice")) if self._background else []
         current_sync = await create_subprocess_exec(
+            *prefix,
             str(RCLONE_BIN_PATH),
             *arguments,
             stdin=PIPE,
             stdout=PIPE,
             stderr=PIPE,
+            limit=RCLONE_OUTPUT_LINE_LIMIT,
         )
-        sync_stdcout, sync_stderr = await current_sync.communicate()
-        sync_result = current_sync.returncode
+        if self._background:
+            logger.info(f'Sync for "{self._id}" runs with background priority')
+            # bisync may need a resync after being stopped midway, sync and copy just continue
+            SyncPriority.register(current_sync.pid, self._sync_mode != RcloneSyncMode.BISYNC)
+        try:
+            with self._get_rclone_log_path().open("a") as log_file:
+                log_file.write(f"{self._get_log_prefix()}rclone {list2cmdline(arguments)}\n")
+                await asyncio.gather(
+                    self._read_rclone_output(current_sync.stdout, log_file),
+                    self._read_rclone_output(current_sync.stderr, log_file),
+                )
+            sync_result = await current_sync.wait()
+        except asyncio.CancelledError:
+            await self._terminate(current_sync)
+            raise
+        finally:
+            restart = SyncPriority.unregister(current_sync.pid)
+
+        if restart:
+            logger.info(f'Starting sync for "{self._id}" again with normal priority')
+            self._background = False
+            return await self._rclone_cli_execute(winner, extra_args)
+
+        logger.info(f'Sync for "{self._id}" finished with exit code: {sync_result}')
+        return sync_result
+
+    async def _terminate(self, process: Process):
+        """
+        Stops an rclone process with SIGTERM so that it can clean up, then SIGKILL if it doesn't exit
+        within "sync_kill_timeout" seconds.
+
+        Parameters:
+        process (Process): The rclone process.
+        """
+        if process.returncode is not None:
+            return
+
+        logger.warning(f'Stopping rclone process {process.pid} of "{self._id}"')
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), Config.get_config_item("sync_kill_timeout"))
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f'rclone process {process.pid} of "{self._id}" did not exit, killing it')
+            process.kill()
+            await process.wait()
+
+    async def _read_rclone_output(self, stream: StreamReader, log_file: TextIO):
+        """
+        Reads the json log of rclone line by line, writes it to the log file and updates the progress.
+        Stats are only kept for the progress, except for the final one which gets written.
+
+        Parameters:
+        stream (StreamReader): stdout or stderr of the rclone process.
+        log_file (TextIO): The log file to write to.
+        """
+        last_stats = None
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                logger.warning(f'Skipping overlong rclone output line of "{self._id}"')
+                continue
+            if not line:
+                break
+
+            line = line.decode(errors="replace").rstrip()
+            try:
+                entry = json.loads(line)
+                level = entry.get("level", "info").upper()
+                msg = entry.get("msg", "").rstrip()
+                if obj := entry.get("object"):
+                    if msg.startswith(obj):
+                        msg = msg[len(obj) :].lstrip(": ")
+                    if msg.startswith("Copied"):
+                        self._transferred.add(obj)
+                    msg = f"{obj}: {msg}"
+                elif RCLONE_RETRY_PATTERN.match(msg):
+                    self._retries += 1
+            except (ValueError, AttributeError):
+                log_file.write(f"{self._get_log_prefix()}{line}\n")
+                continue
+
+            if "stats" in entry:
+                self._update_progress(entry["stats"])
+                last_stats = f"{self._get_log_prefix()}{level:<6}: {msg}"
+                continue
+            if level in ("ERROR", "CRITICAL"):
+                logger.error(f'Sync for "{self._id}": {msg}')
+            log_file.write(f"{self._get_log_prefix()}{level:<6}: {msg}\n")
+
+        if last_stats:
+            log_file.write(last_stats + "\n")
+
+    def _get_rc_job(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> tuple[str, dict[str, Any]]:
+        """
+        Builds the rc command and its parameters of the sync.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        tuple[str, dict[str, Any]]: The rc command and its parameters.
+        """
+        src, dst = self._get_sync_paths(winner)
+        args = extra_args
+        if self._sync_mode == RcloneSyncMode.BISYNC:
+            params = {"path1": src, "path2": dst, "conflictResolve": winner.value}
+            args = Config.get_config_item("additional_bisync_args") + extra_args
+        else:
+            params = {"srcFs": src, "dstFs": dst}
+
+        # filter and config flags of the arguments, e.g. --files-from, are added to the ones of the target
+        params.update(rc_params_from_args(args))
+        if rclone_filter := self._get_rclone_filter():
+            params["_filter"] = {**rclone_filter, **params.get("_filter", {})}
+        if rclone_config := self._get_rclone_config(extra_args):
+            params["_config"] = {**rclone_config, **params.get("_config", {})}
+
+        return f"sync/{self._sync_mode.value}", params
+
+    async def _rclone_rc_execute(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> int:
+        """
+        Runs the sync as a job on the rclone rc daemon.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        int: 0 if the job succeeded, 1 otherwise.
+        """
+        command, params = self._get_rc_job(winner, extra_args)
+        logger.info(f"Running rc job: {command} {json.dumps(params)}")
+        status = await RcloneManager.rc_job(command, params, self._update_progress)
+        sync_result = 0 if status.get("success") else 1
+        # rc jobs are not retried like the rclone command, the job hitting an error worth a retry is counted instead
+        if self._last_stats.get("retryError"):
+            self._retries += 1
 
         logger.info(f'Sync for "{self._id}" finished with exit code: {sync_result}')
-        if sync_stdcout:
-            logger.info(f'Sync for "{self._id}" stdout:\n{sync_stdcout.decode()}')
-        if sync_stderr:
-            logger.error(f'Sync for "{self._id}" stderr:\n{sync_stderr.decode()}')
+        prefix = self._get_log_prefix()
+        with self._get_rclone_log_path().open("a") as f:
+            f.write(f"{prefix}rc job: {command} {json.dumps(params)}\n")
+            f.write(f"{prefix}duration: {status.get('duration')}s\n")
+            if status.get("output"):
+                f.write(f"{prefix}output: {json.dumps(status['output'])}\n")
+            if status.get("error"):
+                logger.error(f'Sync for "{self._id}" error: {status["error"]}')
+                f.write(f"{prefix}error: {status['error']}\n")
 
         return sync_result
 
     @classmethod
     def get_shared_filter(cls) -> list[str]:
         """
-        Retrieves sync filters from the shared file.
+        Retrieves the shared sync filters.
 
         Returns:
         list[str]: A list of filters, '\\n's will be stripped.
         """
-        return get_filters(cls._shared_filter_file)
+        return FilterStore.get(SHARED_FILTER_NAME)
 
     @classmethod
     def set_shared_filters(cls, filters: list[str]):
         """
-        Updates sync filters to the shared file.
+        Updates the shared sync filters.
 
         Parameters:
         filters (list[str]): The filters to set, elements inside should not contain '\\n'.
         """
-        set_filters(cls._shared_filter_file, filters)
+        FilterStore.set(SHARED_FILTER_NAME, filters)
 
     def get_filters(self) -> list[str]:
         """
-        Retrieves sync filters from the target file.
+        Retrieves sync filters of the target.
 
         Returns:
         list[str]: A list of filters, '\\n's will be stripped.
         """
-        return get_filters(self._target_filter_file)
+        return FilterStore.get(self._id)
 
     def set_filters(self, filters: list[str]):
         """
-        Updates sync filters to the target file.
+        Updates sync filters of the target.
 
         Parameters:
         filters (list[str]): The filters to set, elements inside should not contain '\\n'.
         """
-        set_filters(self._target_filter_file, filters)
+        FilterStore.set(self._id, filters)
+
+    def _get_filter_files(self) -> list[Path]:
+        """
+        Renders the filter files of the target, in the order they are passed to rclone.
+
+        Returns:
+        list[Path]: The shared filter, the target filter and the exclude all filter.
+        """
+        return [
+            FilterStore.render(SHARED_FILTER_NAME),
+            FilterStore.render(self._id),
+            PLUGIN_EXCLUDE_ALL_FILTER_PATH,
+        ]
+
+    def _get_rclone_filter(self) -> dict[str, list[str] | str]:
+        """
+        Returns the filter options passed to rclone, in the format of the "_filter" parameter of rc calls.
+
+        Returns:
+        dict[str, list[str] | str]: Filter option to its value or values, empty if rclone should not filter.
+        """
+        if not self._filter_required:
+            return dict()
+
+        return {"FilterFrom": [str(filter_file) for filter_file in self._get_filter_files()]}
+
+    def _get_rclone_config(self, extra_args: list[str] = []) -> dict[str, Any]:
+        """
+        Returns the options that decide how files are compared and verified, chosen for the backend of the remote,
+        and the number of transfers and checkers, tuned for the target.
+        Options set in "additional_sync_args" or the extra arguments take precedence and are left out.
+        Bisync keeps its own comparison, as changing it requires a resync.
+
+        Parameters:
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        dict[str, Any]: Option to its value, in the format of the "_config" parameter of rc calls.
+        """
+        options = RcloneConfig.get_sync_options(self._get_remote())
+        if self._sync_mode == RcloneSyncMode.BISYNC:
+            options = {option: value for option, value in options.items() if option == "IgnoreChecksum"}
+        options.update(SyncTuner.get_tuning(self._id, self._get_remote())["config"])
+
+        explicit = self._get_explicit_flags(extra_args)
+        return {option: value for option, value in options.items() if get_config_flag(option) not in explicit}
+
+    def _get_config_args(self, extra_args: list[str] = []) -> list[str]:
+        """
+        Returns the options of _get_rclone_config as rclone flags.
+
+        Parameters:
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        list[str]: The flags, e.g. ["--checksum=true", "--transfers=4"].
+        """
+        return [
+            f"{get_config_flag(option)}={str(value).lower() if isinstance(value, bool) else value}"
+            for option, value in self._get_rclone_config(extra_args).items()
+        ]
+
+    def _get_background_args(self) -> list[str]:
+        """
+        Returns the bandwidth limit of syncs with background priority.
+
+        Returns:
+        list[str]: The bandwidth limit flag, empty if the sync is not in the background or there's no limit.
+        """
+        if self._background and (bwlimit := Config.get_config_item("background_bwlimit")):
+            return ["--bwlimit", bwlimit]
+
+        return []
+
+    def _get_backend_options(self) -> dict[str, Any]:
+        """
+        Returns the options of the backend tuned for the target, to be set in the connection string of the remote.
+        Options set as flags in "additional_sync_args" take precedence and are left out.
+
+        Returns:
+        dict[str, Any]: Option to its value, e.g. {"chunk_size": "64M"}.
+        """
+        remote = self._get_remote()
+        prefix = f"--{RcloneConfig.get_remote_type(remote)}-"
+        explicit = self._get_explicit_flags()
+        return {
+            option: value
+            for option, value in SyncTuner.get_tuning(self._id, remote)["backend"].items()
+            if prefix + option.replace("_", "-") not in explicit
+        }
+
+    @staticmethod
+    def _get_explicit_flags(extra_args: list[str] = []) -> set[str]:
+        """
+        Returns the flags set in "additional_sync_args" and the extra arguments.
+
+        Parameters:
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        set[str]: The flags without their values, e.g. {"--copy-links", "--transfers"}.
+        """
+        return {
+            arg.partition("=")[0]
+            for arg in Config.get_config_item("additional_sync_args") + extra_args
+            if arg.startswith("--")
+        }
+
+    def _get_log_prefix(self) -> str:
+        """
+        Returns the prefix of the lines written to the rclone log, which tells apart the mirrors syncing at the same time.
+
+        Returns:
+        str: The name of the remote followed by ": " during a fan-out to mirrors, empty otherwise.
+        """
+        return f"{self._get_remote()}: " if self._id in MIRROR_PROGRESS else ""
 
     def _get_verbose_flag(self) -> list[str]:
         """
@@ -274,36 +984,1064 @@ class GlobalSyncTarget(_SyncTarget):
 
         return await self._start_sync_task(sync_task)
 
+    def _cleanup_interrupted(self):
+        """
+        Deletes the lock files of bisync, which a killed rclone leaves behind and block the next syncs.
+        """
+        delete_lock_files()
+
 
 class GameSyncTarget(_SyncTarget):
     _sync_mode = RcloneSyncMode.COPY
+    _mirrored = True
 
     def __init__(self, app_id: int):
         if app_id <= 0:
             raise ValueError(f"Invalid app_id {app_id}, it is required to be > 0")
         super().__init__(str(app_id))
+        self._manifest_file = PLUGIN_CONFIG_DIR / f"{self._id}.manifest"
+        self._generation_file = PLUGIN_CONFIG_DIR / f"{self._id}.generation"
+        self._listing_file = PLUGIN_CONFIG_DIR / f"{self._id}.listing"
         if Config.get_config_item("strict_game_sync"):
             self._sync_mode = RcloneSyncMode.SYNC
 
+    async def sync(self, winner: RcloneSyncWinner) -> int:
+        """
+        Runs the rclone sync process, uploads will be skipped if no local file has changed since the last sync,
+        and downloads will be skipped if nothing has changed on either side.
 
-class CaptureSyncTarget(_SyncTarget):
-    _filter_required = False
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+
+        async def sync_task():
+            if not FilterStore.has(self._id):
+                return await self._rclone_execute(winner)
+            elif winner == RcloneSyncWinner.LOCAL:
+                return await self._upload(winner)
+            else:
+                return await self._download(winner)
+
+        return await self._start_sync_task(sync_task)
+
+    def _cleanup_interrupted(self):
+        """
+        Forgets the manifest, generation and listing, so that the next sync doesn't get skipped
+        because of the state before the stopped one.
+        """
+        for state_file in (self._manifest_file, self._generation_file, self._listing_file):
+            state_file.unlink(missing_ok=True)
+
+    def get_mirror_results(self) -> dict[str, int]:
+        """
+        Retrieves the result of the last sync on each remote.
+
+        Returns:
+        dict[str, int]: Name of the remote to the exit code of its rclone sync process,
+                        uploads go to all of them, downloads only to the one they came from.
+        """
+        return MIRROR_RESULTS.get(self._id, {})
+
+    def _get_remotes(self) -> list[str]:
+        """
+        Returns the remotes the game is synced to, "sync_remote" followed by "sync_mirrors" in the configuration.
+
+        Returns:
+        list[str]: Names of the remotes, only "sync_remote" if the target doesn't support mirrors.
+        """
+        remote, mirrors = Config.get_config_items("sync_remote", "sync_mirrors")
+        if not self._mirrored:
+            return [remote]
+
+        return list(dict.fromkeys([remote, *mirrors]))
+
+    async def _rclone_execute(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> int:
+        """
+        Runs the rclone sync process, uploads run on all remotes at the same time, so that a mirror doesn't add
+        to the time of a sync unless it is the slowest one.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+             The first non-zero exit code if it failed on any remote.
+        """
+        remotes = [self._remote] if self._remote else self._get_remotes()
+        if (winner == RcloneSyncWinner.CLOUD) or (len(remotes) == 1):
+            sync_result = await super()._rclone_execute(winner, extra_args)
+            MIRROR_RESULTS[self._id] = {self._get_remote(): sync_result}
+            return sync_result
+
+        mirrors = []
+        for remote in remotes:
+            mirror = copy.copy(self)
+            mirror._remote = remote
+            mirrors.append(mirror)
+        MIRROR_PROGRESS[self._id] = dict()
+        try:
+            results = await asyncio.gather(
+                *(_SyncTarget._rclone_execute(mirror, winner, extra_args) for mirror in mirrors),
+                return_exceptions=True,
+            )
+        finally:
+            MIRROR_PROGRESS.pop(self._id, None)
+
+        MIRROR_RESULTS[self._id] = dict()
+        for remote, result in zip(remotes, results):
+            if isinstance(result, BaseException):
+                logger.error(f'Sync for "{self._id}" on "{remote}" failed: {result}')
+                result = -1
+            elif result != 0:
+                logger.error(f'Sync for "{self._id}" on "{remote}" finished with exit code: {result}')
+            MIRROR_RESULTS[self._id][remote] = result
+
+        return next((result for result in MIRROR_RESULTS[self._id].values() if result != 0), 0)
+
+    async def _select_remote(self) -> tuple[str, dict[str, Any] | None]:
+        """
+        Picks the remote to download from, by retrieving the generation markers of all remotes at the same time.
+        Remotes not responding within "mirror_probe_timeout" seconds are skipped, and of the remotes with a current
+        marker, the fastest one to respond is picked, so that a mirror missing the last upload is never picked.
+
+        Returns:
+        tuple[str, dict[str, Any] | None]: Name of the remote and its generation,
+                                           "sync_remote" and None if no remote has a marker.
+        """
+        remotes = self._get_remotes()
+        if len(remotes) == 1:
+            return remotes[0], await self._get_remote_generation()
+
+        async def probe(remote: str) -> tuple[str, dict[str, Any] | None]:
+            try:
+                return remote, await self._get_remote_generation(remote)
+            except Exception as e:
+                logger.warning(f'Failed to retrieve the generation of "{self._id}" on "{remote}": {e}')
+                return remote, None
+
+        tasks = [asyncio.create_task(probe(remote)) for remote in remotes]
+        generations = []
+        try:
+            for task in asyncio.as_completed(tasks, timeout=Config.get_config_item("mirror_probe_timeout")):
+                remote, generation = await task
+                if generation:
+                    generations.append((remote, generation, parse_mod_time(generation["marker"][1])))
+        except asyncio.TimeoutError:
+            logger.warning(f'Not all remotes of "{self._id}" responded in time')
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if not generations:
+            return remotes[0], None
+
+        newest = max(mod_time for *_, mod_time in generations)
+        # in the order of response
+        remote, generation, _ = next(item for item in generations if item[2] >= newest - MIRROR_MARKER_TOLERANCE)
+        return remote, generation
+
+    async def _upload(self, winner: RcloneSyncWinner) -> int:
+        """
+        Uploads the local files, skipped if no local file has changed since the last sync.
+        A new generation marker is written to the cloud after each successful upload.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        # results of an earlier sync must not get a marker written for this one
+        MIRROR_RESULTS.pop(self._id, None)
+        sync_result = None
+        if (watcher := DirtyWatcher.pop(self._id)) and (changes := watcher.stop()):
+            sync_result = await self._sync_changes(winner, *changes)
+            if (sync_result == 0) and not self.get_mirror_results():
+                # the recorded changes left nothing to upload, like the unchanged manifest below
+                return 0
+
+        if sync_result is None:
+            manifest = await asyncio.to_thread(self._get_manifest)
+            if manifest and (manifest == self._read_manifest()):
+                logger.info(f'No local change for "{self._id}", skipping upload')
+                return 0
+
+            sync_result = await self._rclone_execute(winner)
+            # Files changed during an upload are not in the manifest, so they get uploaded next time
+            if (sync_result == 0) and manifest:
+                self._write_manifest(manifest)
+            else:
+                self._manifest_file.unlink(missing_ok=True)
+
+        # remotes the upload succeeded on get a new marker, so that downloads avoid the ones that failed
+        if any(result == 0 for result in self.get_mirror_results().values()):
+            await self._write_generation()
+        if sync_result != 0:
+            self._generation_file.unlink(missing_ok=True)
+            # the files on the cloud may have changed without a new marker
+            self._listing_file.unlink(missing_ok=True)
+        return sync_result
+
+    async def _download(self, winner: RcloneSyncWinner) -> int:
+        """
+        Downloads the cloud files, skipped if the generation marker on the cloud is the one seen by the last sync
+        and no local file has changed since then.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        remote, generation = await self._select_remote()
+        if generation and (generation == self._read_generation()):
+            manifest = await asyncio.to_thread(self._get_manifest)
+            if manifest and (manifest == self._read_manifest()):
+                logger.info(f'No change for "{self._id}" on the cloud or local, skipping download')
+                return 0
+
+        if remote != Config.get_config_item("sync_remote"):
+            logger.info(f'Downloading "{self._id}" from mirror "{remote}"')
+        self._remote = remote
+        try:
+            sync_result = await self._rclone_execute(winner)
+        finally:
+            self._remote = None
+        if (sync_result == 0) and (manifest := await asyncio.to_thread(self._get_manifest)):
+            self._write_manifest(manifest)
+        else:
+            self._manifest_file.unlink(missing_ok=True)
+
+        if (sync_result == 0) and generation:
+            self._write_generation_file(generation)
+        else:
+            self._generation_file.unlink(missing_ok=True)
+        return sync_result
+
+    async def _run_plan(self, plan: dict[str, Any]) -> int:
+        """
+        Transfers the files of a plan, then updates the manifest and the generation marker like a sync does.
+        Plans only cover "sync_remote", so mirrors keep their marker and downloads avoid them until the next upload.
+
+        Parameters:
+        plan (dict[str, Any]): The plan, see plan.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        self._manifest_file.unlink(missing_ok=True)
+        files = plan["files"]
+        sync_result = await super()._run_plan(plan)
+        if files["upload"] or files["delete_cloud"]:
+            self._listing_file.unlink(missing_ok=True)
+            MIRROR_RESULTS[self._id] = {self._get_remote(): sync_result}
+            if sync_result == 0:
+                await self._write_generation()
+        elif (sync_result == 0) and plan["cloud_state"]:
+            self._write_generation_file(plan["cloud_state"])
+
+        if sync_result != 0:
+            self._generation_file.unlink(missing_ok=True)
+        return sync_result
+
+    async def _list_remote(self, cloud_state: Any = None) -> dict[str, list] | None:
+        """
+        Lists the files on the cloud matched by the filters, the listing is reused while the generation marker
+        on the cloud stays the same.
+
+        Parameters:
+        cloud_state (Any): The generation on the cloud, see _get_remote_generation.
+
+        Returns:
+        dict[str, list] | None: Relative path to [size, mtime] of each file, None if the files cannot be listed.
+        """
+        try:
+            with self._listing_file.open("r") as f:
+                listing = json.load(f)
+            if cloud_state and (listing["generation"] == cloud_state):
+                return listing["files"]
+        except Exception:
+            pass
+
+        files = await super()._list_remote()
+        if cloud_state and (files is not None):
+            try:
+                with self._listing_file.open("w") as f:
+                    json.dump({"generation": cloud_state, "files": files}, f)
+            except Exception as e:
+                logger.warning(f'Failed to write listing of "{self._id}": {e}')
+                self._listing_file.unlink(missing_ok=True)
+
+        return files
+
+    async def _get_cloud_state(self) -> Any:
+        """
+        Retrieves the generation marker on the cloud, which changes with every upload.
+
+        Returns:
+        Any: The generation, None if there's no marker.
+        """
+        return await self._get_remote_generation()
+
+    def _get_generation_path(self, remote: str | None = None) -> str:
+        """
+        Returns the path of the generation marker on the cloud.
+
+        Parameters:
+        remote (str | None): Name of the remote, None for the one the sync goes to.
+
+        Returns:
+        str: The path of the generation marker, e.g. "cloud:sdh-game-sync/.generations/123".
+        """
+        return self._get_remote_path(f"{Config.get_config_item('sync_destination')}/.generations/{self._id}", remote)
+
+    async def _get_remote_generation(self, remote: str | None = None) -> dict[str, Any] | None:
+        """
+        Retrieves the generation marker on the cloud with a single request.
+
+        Parameters:
+        remote (str | None): Name of the remote, None for the one the sync goes to.
+
+        Returns:
+        dict[str, Any] | None: The generation, identified by the sync settings and the size and mtime of the marker.
+                               None if there's no marker.
+        """
+        if not (item := await RcloneManager.stat_object(self._get_generation_path(remote))):
+            return None
+
+        return {
+            "settings": self._get_manifest_settings(),
+            "marker": [item.get("Size"), item.get("ModTime")],
+        }
+
+    async def _write_generation(self):
+        """
+        Uploads a new generation marker to the remotes the last sync succeeded on,
+        and remembers it as the last seen one if it succeeded on all of them.
+        """
+        results = self.get_mirror_results()
+        remotes = [remote for remote, result in results.items() if result == 0]
+        with NamedTemporaryFile(
+            "w", dir=decky.DECKY_PLUGIN_RUNTIME_DIR, suffix=".generation"
+        ) as marker:
+            json.dump({"uploaded": time.time(), "host": socket.gethostname()}, marker)
+            marker.flush()
+            uploaded = await asyncio.gather(
+                *(RcloneManager.upload_object(Path(marker.name), self._get_generation_path(remote)) for remote in remotes)
+            )
+
+        # read it back, as the cloud may not keep the mtime of the uploaded file
+        if all(uploaded) and (len(remotes) == len(results)) and (generation := await self._get_remote_generation()):
+            self._write_generation_file(generation)
+        else:
+            self._generation_file.unlink(missing_ok=True)
+
+    def _read_generation(self) -> dict[str, Any] | None:
+        """
+        Reads the generation marker seen by the last successful sync.
+
+        Returns:
+        dict[str, Any] | None: The generation, None if it doesn't exist or cannot be read.
+        """
+        try:
+            with self._generation_file.open("r") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _write_generation_file(self, generation: dict[str, Any]):
+        """
+        Writes the generation marker seen by the last successful sync.
+
+        Parameters:
+        generation (dict[str, Any]): The generation to write.
+        """
+        try:
+            with self._generation_file.open("w") as f:
+                json.dump(generation, f)
+        except Exception as e:
+            logger.warning(f'Failed to write generation of "{self._id}": {e}')
+            self._generation_file.unlink(missing_ok=True)
+
+    async def start_dirty_watch(self) -> bool:
+        """
+        Starts recording the local files changed while the game runs,
+        so that the next upload only needs to sync them instead of scanning all files.
+
+        Returns:
+        bool: True if the watcher got started.
+        """
+        if not (Config.get_config_item("dirty_watch") and FilterStore.has(self._id)):
+            return False
+
+        try:
+            sync_filter = RcloneFilter.from_files(*self._get_filter_files())
+        except ValueError as e:
+            logger.warning(f'Failed to evaluate filters of "{self._id}": {e}')
+            return False
+
+        def baseline_check() -> bool:
+            manifest = self._get_manifest()
+            return bool(manifest) and (manifest == self._read_manifest())
+
+        return await DirtyWatcher.start(
+            self._id,
+            Config.get_config_item("sync_root"),
+            sync_filter,
+            self._sync_mode == RcloneSyncMode.SYNC,
+            baseline_check,
+        )
+
+    async def _sync_changes(
+        self, winner: RcloneSyncWinner, dirty: set[str], removed: set[str]
+    ) -> int | None:
+        """
+        Uploads only the files changed since the last sync, as recorded by the dirty watcher.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        dirty (set[str]): Relative paths of the files modified or created.
+        removed (set[str]): Relative paths of the files removed.
+
+        Returns:
+        int | None: Exit code of the rclone sync process, None if a full sync is required.
+        """
+        manifest = self._read_manifest()
+        if not (manifest and manifest["settings"] == self._get_manifest_settings()):
+            logger.info(f'Sync settings of "{self._id}" changed, running a full sync')
+            return None
+
+        sync_root = Config.get_config_item("sync_root")
+        files = manifest["files"]
+        for path in dirty:
+            try:
+                stat = os.stat(os.path.join(sync_root, path))
+                files[path] = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+            except OSError:
+                files.pop(path, None)
+        for path in removed:
+            files.pop(path, None)
+
+        if not (dirty := sorted(path for path in dirty if path in files)):
+            logger.info(f'No local change for "{self._id}", skipping upload')
+            self._write_manifest(manifest)
+            return 0
+
+        logger.info(f'Uploading {len(dirty)} changed files of "{self._id}"')
+        with NamedTemporaryFile(
+            "w", dir=decky.DECKY_PLUGIN_RUNTIME_DIR, suffix=".files"
+        ) as files_from:
+            files_from.write("\n".join(dirty))
+            files_from.flush()
+            sync_result = await self._rclone_execute(
+                winner, ["--files-from", files_from.name, "--no-traverse"]
+            )
+
+        if sync_result == 0:
+            self._write_manifest(manifest)
+        else:
+            self._manifest_file.unlink(missing_ok=True)
+        return sync_result
+
+    def _get_manifest_settings(self) -> list[str]:
+        """
+        Returns the settings that affect which files get synced and where, the manifest is only valid for the same ones.
+
+        Returns:
+        list[str]: Sync root, sync destination, sync mode and hash of the filters.
+        """
+        filters_hash = hashlib.sha256()
+        for filter_file in self._get_filter_files():
+            filters_hash.update("\n".join(get_filters(filter_file)).encode())
+            filters_hash.update(b"\0")
+
+        sync_root, sync_dest = Config.get_config_items("sync_root", "sync_destination")
+        return [sync_root, sync_dest, self._sync_mode.value, filters_hash.hexdigest()]
+
+    def _get_manifest(self) -> dict[str, Any] | None:
+        """
+        Scans the local files matched by the filters of this target.
+
+        Returns:
+        dict[str, Any] | None: The manifest, containing the sync settings and path, size, mtime and inode of every file.
+                               None if the filters cannot be evaluated.
+        """
+        try:
+            sync_filter = RcloneFilter.from_files(*self._get_filter_files())
+        except ValueError as e:
+            logger.warning(f'Failed to evaluate filters of "{self._id}": {e}')
+            return None
+
+        return {
+            "settings": self._get_manifest_settings(),
+            "files": {
+                path: [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+                for path, stat in sync_filter.walk(Config.get_config_item("sync_root"))
+            },
+        }
+
+    def _read_manifest(self) -> dict[str, Any] | None:
+        """
+        Reads the manifest written by the last successful sync.
+
+        Returns:
+        dict[str, Any] | None: The manifest, None if it doesn't exist or cannot be read.
+        """
+        try:
+            with self._manifest_file.open("r") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _write_manifest(self, manifest: dict[str, Any]):
+        """
+        Writes the manifest of the last successful sync.
+
+        Parameters:
+        manifest (dict[str, Any]): The manifest to write.
+        """
+        try:
+            with self._manifest_file.open("w") as f:
+                json.dump(manifest, f)
+        except Exception as e:
+            logger.warning(f'Failed to write manifest of "{self._id}": {e}')
+            self._manifest_file.unlink(missing_ok=True)
+
+
+class GameBundleSyncTarget(GameSyncTarget):
+    _mirrored = False
+    _plannable = False
+
+    def __init__(self, app_id: int):
+        super().__init__(app_id)
+        self._bundle_cache_file = PLUGIN_CONFIG_DIR / f"{self._id}.bundle"
+        self._bundle_dir: Path | None = None
+        self._bundle_files: list[str] = []
+
+    async def start_dirty_watch(self) -> bool:
+        """
+        Bundles are always packed from all files, there's nothing to gain from watching.
+
+        Returns:
+        bool: Always False.
+        """
+        return False
+
+    async def _rclone_execute(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> int:
+        """
+        Syncs the files matched by the filters as a single archive, along with a manifest of their hashes.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        import save_bundle
+
+        if not FilterStore.has(self._id):
+            logger.info(f'No filter for sync "{self._id}"')
+            return 0
+
+        try:
+            sync_filter = RcloneFilter.from_files(*self._get_filter_files())
+        except ValueError as e:
+            logger.error(f'Failed to evaluate filters of "{self._id}": {e}')
+            return -1
+
+        sync_root = Config.get_config_item("sync_root")
+        cache = save_bundle.read_manifest(self._bundle_cache_file) or dict()
+        with TemporaryDirectory(dir=decky.DECKY_PLUGIN_RUNTIME_DIR) as bundle_dir:
+            self._bundle_dir = Path(bundle_dir)
+            if winner == RcloneSyncWinner.LOCAL:
+                return await self._upload_bundle(sync_root, sync_filter, extra_args)
+            else:
+                return await self._download_bundle(sync_root, sync_filter, cache, extra_args)
+
+    async def _upload_bundle(
+        self, sync_root: str, sync_filter: RcloneFilter, extra_args: list[str]
+    ) -> int:
+        """
+        Packs the local files and uploads the bundle. Files only in the bundle on the cloud are carried over
+        from its archive like the rclone copy keeps them, unless strict_game_sync is on.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        import save_bundle, tarfile
+
+        carried = dict()
+        previous_archive = self._bundle_dir / f"previous.{save_bundle.BUNDLE_ARCHIVE_NAME}"
+        if self._sync_mode != RcloneSyncMode.SYNC:
+            sync_result, remote = await self._read_remote_manifest()
+            if sync_result != 0:
+                return sync_result
+            if remote:
+                local_paths = await asyncio.to_thread(lambda: {path for path, _ in sync_filter.walk(sync_root)})
+                carried = {path: entry for path, entry in remote.items() if path not in local_paths}
+            if carried:
+                logger.info(f'Carrying over {len(carried)} files only in the bundle of "{self._id}" on the cloud')
+                if not await RcloneManager.download_object(
+                    self._get_bundle_path(save_bundle.BUNDLE_ARCHIVE_NAME), previous_archive
+                ):
+                    return 1
+
+        try:
+            entries = await asyncio.to_thread(
+                save_bundle.pack, sync_root, sync_filter, self._bundle_dir, carried, previous_archive
+            )
+        except (OSError, ValueError, tarfile.TarError) as e:
+            logger.error(f'Failed to pack bundle of "{self._id}": {e}')
+            return -1
+        save_bundle.write_manifest(self._bundle_cache_file, entries)
+
+        logger.info(f'Uploading bundle of {len(entries)} files for "{self._id}"')
+        self._bundle_files = [save_bundle.BUNDLE_ARCHIVE_NAME, save_bundle.BUNDLE_MANIFEST_NAME]
+        return await super()._rclone_execute(RcloneSyncWinner.LOCAL, extra_args)
+
+    async def _download_bundle(
+        self, sync_root: str, sync_filter: RcloneFilter, cache: dict[str, list], extra_args: list[str]
+    ) -> int:
+        """
+        Downloads the manifest of the bundle, and the archive only if any file differs from local,
+        then extracts the files that differ.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        import save_bundle, tarfile
+
+        sync_result, remote = await self._read_remote_manifest()
+        if sync_result != 0:
+            return sync_result
+        if remote is None:
+            logger.info(f'No bundle of "{self._id}" on the cloud')
+            return 0
+
+        local = await asyncio.to_thread(save_bundle.scan, sync_root, sync_filter, cache)
+        changed = {
+            path for path, entry in remote.items() if (path not in local) or local[path][2] != entry[2]
+        }
+        removed = (set(local) - set(remote)) if self._sync_mode == RcloneSyncMode.SYNC else set()
+
+        if changed:
+            self._bundle_files = [save_bundle.BUNDLE_ARCHIVE_NAME]
+            sync_result = await super()._rclone_execute(RcloneSyncWinner.CLOUD, extra_args)
+            if sync_result != 0:
+                return sync_result
+            try:
+                await asyncio.to_thread(
+                    save_bundle.unpack,
+                    sync_root,
+                    self._bundle_dir / save_bundle.BUNDLE_ARCHIVE_NAME,
+                    remote,
+                    changed,
+                )
+            except (OSError, ValueError, tarfile.TarError) as e:
+                logger.error(f'Failed to unpack bundle of "{self._id}": {e}')
+                return -1
+        for path in removed:
+            try:
+                os.unlink(os.path.join(sync_root, path))
+            except OSError as e:
+                logger.warning(f"Failed to delete {path}: {e}")
+            local.pop(path, None)
+
+        logger.info(f'Bundle of "{self._id}": {len(changed)} files extracted, {len(removed)} deleted')
+        save_bundle.write_manifest(self._bundle_cache_file, local | {path: remote[path] for path in changed})
+        return 0
+
+    async def _read_remote_manifest(self) -> tuple[int, dict[str, list] | None]:
+        """
+        Downloads the manifest of the bundle on the cloud, checking first that there is one,
+        as copying from a missing folder fails.
+
+        Returns:
+        tuple[int, dict[str, list] | None]: 0 and the entries of the manifest, None if there's no bundle on the cloud.
+                                            1 and None if the manifest cannot be downloaded.
+        """
+        import save_bundle
+
+        manifest_path = self._get_bundle_path(save_bundle.BUNDLE_MANIFEST_NAME)
+        if not await RcloneManager.stat_object(manifest_path):
+            return 0, None
+
+        local_path = self._bundle_dir / save_bundle.BUNDLE_MANIFEST_NAME
+        if not await RcloneManager.download_object(manifest_path, local_path):
+            return 1, None
+
+        return 0, save_bundle.read_manifest(local_path)
+
+    def _get_bundle_path(self, name: str) -> str:
+        """
+        Returns the path of a file in the bundle folder of this target on the cloud.
+
+        Parameters:
+        name (str): Name of the file, e.g. "manifest.json".
+
+        Returns:
+        str: The path of the file, e.g. "cloud:sdh-game-sync-bundles/123/manifest.json".
+        """
+        return self._get_remote_path(f"{Config.get_config_item('bundle_destination')}/{self._id}/{name}")
+
+    def _get_sync_paths(self, winner: RcloneSyncWinner) -> tuple[str, str]:
+        """
+        Retrieves the local bundle directory and the bundle directory of this target on the cloud.
+
+        Parameters:
+        winner (RcloneSyncWinner): Winner of this sync
+
+        Returns:
+        tuple[str, str]: A tuple containing the source sync path and destination sync path.
+        """
+        destination = self._get_remote_path(f"{Config.get_config_item('bundle_destination')}/{self._id}")
+        if winner == RcloneSyncWinner.CLOUD:
+            return destination, str(self._bundle_dir)
+        else:
+            return str(self._bundle_dir), destination
+
+    def _get_rclone_filter(self) -> dict[str, list[str] | str]:
+        """
+        Returns the filter options passed to rclone, limiting the sync to the bundle files needed.
+
+        Returns:
+        dict[str, list[str] | str]: Filter option to its value or values.
+        """
+        return {"IncludeRule": [f"/{file_name}" for file_name in self._bundle_files]}
+
+
+class GameChunkedSyncTarget(GameSyncTarget):
+    _mirrored = False
+    _plannable = False
+
+    def __init__(self, app_id: int):
+        super().__init__(app_id)
+        self._chunk_cache_file = PLUGIN_CONFIG_DIR / f"{self._id}.chunks"
+
+    async def _rclone_execute(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> int:
+        """
+        Runs the rclone sync process for the files up to "chunk_file_size", then syncs the larger ones as chunks,
+        so that only the chunks changed since the last sync get transferred.
+
+        Parameters:
+        winner (RcloneSyncWinner): The winner of the sync, its data will be preserved as priority.
+        extra_args (list[str]): Extra arguemnts to be passed to rclone
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        import chunk_store
+
+        sync_result = await super()._rclone_execute(winner, extra_args)
+        if (sync_result != 0) or (not FilterStore.has(self._id)):
+            return sync_result
+
+        try:
+            sync_filter = RcloneFilter.from_files(*self._get_filter_files())
+        except ValueError as e:
+            logger.error(f'Failed to evaluate filters of "{self._id}": {e}')
+            return -1
+
+        sync_root, min_size = Config.get_config_items("sync_root", "chunk_file_size")
+        cache = chunk_store.read_index(self._chunk_cache_file) or dict()
+        local = await asyncio.to_thread(chunk_store.scan, sync_root, sync_filter, min_size, cache)
+        with TemporaryDirectory(dir=decky.DECKY_PLUGIN_RUNTIME_DIR) as chunk_dir:
+            chunk_dir = Path(chunk_dir)
+            index_path = chunk_dir / chunk_store.CHUNK_INDEX_NAME
+            remote = None
+            if await RcloneManager.stat_object(self._get_chunk_path(chunk_store.CHUNK_INDEX_NAME)):
+                if not await RcloneManager.download_object(
+                    self._get_chunk_path(chunk_store.CHUNK_INDEX_NAME), index_path
+                ):
+                    return 1
+                remote = chunk_store.read_index(index_path)
+
+            if winner == RcloneSyncWinner.LOCAL:
+                return await self._upload_chunks(sync_root, local, remote, chunk_dir)
+            else:
+                return await self._download_chunks(sync_root, local, remote, chunk_dir)
+
+    async def _upload_chunks(
+        self, sync_root: str, local: dict[str, list], remote: dict[str, list] | None, chunk_dir: Path
+    ) -> int:
+        """
+        Uploads the chunks of the local files that are not on the cloud yet, then the index of the chunked files.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        import chunk_store
+
+        remote = remote or dict()
+        # files only on the cloud are kept like the rclone copy does, unless strict_game_sync is on
+        if self._sync_mode == RcloneSyncMode.SYNC:
+            index = local
+        else:
+            index = await asyncio.to_thread(chunk_store.merge_index, sync_root, local, remote)
+
+        new_chunks = chunk_store.get_chunk_hashes(local) - chunk_store.get_chunk_hashes(remote)
+        if new_chunks:
+            try:
+                chunk_files = await asyncio.to_thread(
+                    chunk_store.stage_chunks, sync_root, local, new_chunks, chunk_dir / "chunks"
+                )
+            except (OSError, ValueError) as e:
+                logger.error(f'Failed to read chunks of "{self._id}": {e}')
+                return -1
+
+            logger.info(f'Uploading {len(chunk_files)} new chunks of "{self._id}"')
+            sync_result = await FileTransferTarget(
+                self._id, chunk_dir / "chunks", self._get_chunk_path("chunks"), chunk_files
+            ).transfer(RcloneSyncWinner.LOCAL)
+            if sync_result != 0:
+                return sync_result
+
+        # the index is uploaded last, so that it never references chunks missing on the cloud
+        if index != remote:
+            chunk_store.write_index(chunk_dir / chunk_store.CHUNK_INDEX_NAME, index)
+            if not await RcloneManager.upload_object(
+                chunk_dir / chunk_store.CHUNK_INDEX_NAME, self._get_chunk_path(chunk_store.CHUNK_INDEX_NAME)
+            ):
+                return 1
+            # and chunks only the old index references are deleted once it got replaced
+            if stale_chunks := chunk_store.get_chunk_hashes(remote) - chunk_store.get_chunk_hashes(index):
+                await self._delete_chunks(stale_chunks)
+
+        chunk_store.write_index(self._chunk_cache_file, local)
+        return 0
+
+    async def _delete_chunks(self, chunk_hashes: set[str]):
+        """
+        Deletes chunks on the cloud, a failure only leaves them unused so the sync doesn't fail for it.
+
+        Parameters:
+        chunk_hashes (set[str]): Hashes of the chunks to delete.
+        """
+        import chunk_store
+
+        logger.info(f'Deleting {len(chunk_hashes)} unused chunks of "{self._id}"')
+        with NamedTemporaryFile(
+            "w", dir=decky.DECKY_PLUGIN_RUNTIME_DIR, suffix=".files"
+        ) as files_from:
+            files_from.write("\n".join(sorted(chunk_store.get_chunk_path(chunk_hash) for chunk_hash in chunk_hashes)))
+            files_from.flush()
+            if not await RcloneManager.delete_objects(self._get_chunk_path("chunks"), Path(files_from.name)):
+                logger.warning(f'Unused chunks of "{self._id}" are left on the cloud')
+
+    async def _download_chunks(
+        self, sync_root: str, local: dict[str, list], remote: dict[str, list] | None, chunk_dir: Path
+    ) -> int:
+        """
+        Downloads the chunks of the files that differ from local, except the ones found in local files,
+        then rebuilds the files that differ.
+
+        Returns:
+        int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
+        """
+        import chunk_store
+
+        if remote is None:
+            logger.info(f'No chunked file of "{self._id}" on the cloud')
+            return 0
+
+        changed = {
+            path: entry for path, entry in remote.items() if (path not in local) or (local[path][2] != entry[2])
+        }
+        removed = (set(local) - set(remote)) if self._sync_mode == RcloneSyncMode.SYNC else set()
+
+        if changed:
+            missing = chunk_store.get_chunk_hashes(changed) - chunk_store.get_chunk_hashes(local)
+            if missing:
+                logger.info(f'Downloading {len(missing)} chunks of "{self._id}"')
+                sync_result = await FileTransferTarget(
+                    self._id,
+                    chunk_dir / "chunks",
+                    self._get_chunk_path("chunks"),
+                    sorted(chunk_store.get_chunk_path(chunk_hash) for chunk_hash in missing),
+                ).transfer(RcloneSyncWinner.CLOUD)
+                if sync_result != 0:
+                    return sync_result
+            try:
+                await asyncio.to_thread(chunk_store.assemble, sync_root, changed, local, chunk_dir / "chunks")
+            except (OSError, ValueError) as e:
+                logger.error(f'Failed to rebuild chunked files of "{self._id}": {e}')
+                return -1
+        for path in removed:
+            try:
+                os.unlink(os.path.join(sync_root, path))
+            except OSError as e:
+                logger.warning(f"Failed to delete {path}: {e}")
+            local.pop(path, None)
+
+        logger.info(f'Chunked files of "{self._id}": {len(changed)} rebuilt, {len(removed)} deleted')
+        chunk_store.write_index(self._chunk_cache_file, local | changed)
+        return 0
+
+    def _get_chunk_path(self, name: str) -> str:
+        """
+        Returns the path of an item in the chunk folder of this target on the cloud.
+
+        Parameters:
+        name (str): Name of the item, e.g. "index.json" or "chunks".
+
+        Returns:
+        str: The path of the item, e.g. "cloud:sdh-game-sync-chunks/123/index.json".
+        """
+        return self._get_remote_path(f"{Config.get_config_item('chunk_destination')}/{self._id}/{name}")
+
+    def _get_rclone_filter(self) -> dict[str, list[str] | str]:
+        """
+        Returns the filter options passed to rclone, excluding the files synced as chunks.
+
+        Returns:
+        dict[str, list[str] | str]: Filter option to its value or values.
+        """
+        rclone_filter = super()._get_rclone_filter()
+        rclone_filter["MaxSize"] = f"{Config.get_config_item('chunk_file_size')}B"
+        return rclone_filter
+
+    def _get_manifest_settings(self) -> list[str]:
+        """
+        Returns the settings that affect which files get synced and where, the manifest is only valid for the same ones.
+
+        Returns:
+        list[str]: Sync root, sync destination, sync mode, hash of the filters and the chunk settings.
+        """
+        chunk_file_size, chunk_dest = Config.get_config_items("chunk_file_size", "chunk_destination")
+        return super()._get_manifest_settings() + [str(chunk_file_size), chunk_dest]
+
+
+class FileTransferTarget(_SyncTarget):
+    _filter_required = False
+    _plannable = False
     _sync_mode = RcloneSyncMode.COPY
 
-    def __init__(self, capture_path: str):
-        if not capture_path:
-            raise ValueError("capture_path is required")
-        super().__init__(capture_path)
-        self._capture_path = Path(capture_path)
+    def __init__(self, target_id: str, local_dir: Path, remote_dir: str, file_names: list[str]):
+        super().__init__(target_id)
+        self._local_dir = local_dir
+        self._remote_dir = remote_dir
+        self._file_names = file_names
+        self._files_from_path = None
+
+    async def transfer(self, winner: RcloneSyncWinner) -> int:
+        """
+        Copies the files in one go, e.g. the chunks of a chunked sync or the files of a plan.
+        It runs as a part of the sync of its target, so its stats, log and progress add to the ones of the sync.
+
+        Parameters:
+        winner (RcloneSyncWinner): LOCAL to upload the files, CLOUD to download them.
+
+        Returns:
+        int: Exit code of the rclone sync process.
+        """
+        with NamedTemporaryFile(
+            "w", dir=decky.DECKY_PLUGIN_RUNTIME_DIR, suffix=".files"
+        ) as files_from:
+            files_from.write("\n".join(self._file_names))
+            files_from.flush()
+            self._files_from_path = files_from.name
+
+            return await self._rclone_execute(
+                winner, ["--files-from", self._files_from_path, "--no-traverse"]
+            )
+
+    def _get_sync_paths(self, winner: RcloneSyncWinner) -> tuple[str, str]:
+        """
+        Retrieves the local folder and the folder on the cloud the files are relative to.
+
+        Parameters:
+        winner (RcloneSyncWinner): Winner of this sync
+
+        Returns:
+        tuple[str, str]: A tuple containing the source sync path and destination sync path.
+        """
+        if winner == RcloneSyncWinner.CLOUD:
+            return self._remote_dir, str(self._local_dir)
+        else:
+            return str(self._local_dir), self._remote_dir
+
+    def _get_rc_job(
+        self, winner: RcloneSyncWinner, extra_args: list[str] = []
+    ) -> tuple[str, dict[str, Any]]:
+        """
+        Builds the rc command and its parameters of the transfer.
+
+        Returns:
+        tuple[str, dict[str, Any]]: The rc command and its parameters.
+        """
+        src, dst = self._get_sync_paths(winner)
+        params = {
+            "srcFs": src,
+            "dstFs": dst,
+            "_filter": {"FilesFrom": [self._files_from_path]},
+            "_config": {**self._get_rclone_config(), "NoTraverse": True},
+        }
+
+        return "sync/copy", params
+
+
+class CaptureSyncTarget(_SyncTarget):
+    _filter_required = False
+    _plannable = False
+    _sync_mode = RcloneSyncMode.COPY
+
+    def __init__(self, capture_dir: str, file_names: list[str]):
+        if not capture_dir:
+            raise ValueError("capture_dir is required")
+        if not file_names:
+            raise ValueError("file_names is required")
+        super().__init__(capture_dir)
+        self._capture_dir = Path(capture_dir)
+        self._file_names = file_names
+        self._files_from_path = None
 
     async def sync(self, _=None) -> int:
         """
-        Runs the rclone sync process.
+        Runs the rclone sync process, uploading all the files in one go.
 
         Returns:
         int: Exit code of the rclone sync process if it runs, -1 if it cannot run.
         """
-        return await super().sync(RcloneSyncWinner.LOCAL)
+        with NamedTemporaryFile(
+            "w", dir=decky.DECKY_PLUGIN_RUNTIME_DIR, suffix=".files"
+        ) as files_from:
+            files_from.write("\n".join(self._file_names))
+            files_from.flush()
+            self._files_from_path = files_from.name
+
+            async def sync_task():
+                return await self._rclone_execute(
+                    RcloneSyncWinner.LOCAL,
+                    ["--files-from", self._files_from_path, "--no-traverse"],
+                )
+
+            return await self._start_sync_task(sync_task)
+
+    def get_results(self, sync_result: int) -> dict[str, int]:
+        """
+        Maps the result of the sync to each uploaded file.
+
+        Parameters:
+        sync_result (int): Exit code of the sync.
+
+        Returns:
+        dict[str, int]: File name to 0 if it got uploaded, or the exit code of the sync otherwise.
+        """
+        return {
+            file_name: 0 if (sync_result == 0 or file_name in self._transferred) else (sync_result or -1)
+            for file_name in self._file_names
+        }
 
     def _get_sync_paths(self, _=None) -> tuple[str, str]:
         """
@@ -315,10 +2053,27 @@ class CaptureSyncTarget(_SyncTarget):
         destination = Config.get_config_item("capture_upload_destination")
 
         return (
-            str(self._capture_path),
-            f"cloud:{destination}",
+            str(self._capture_dir),
+            self._get_remote_path(destination),
         )
 
+    def _get_rc_job(self, _=None, extra_args: list[str] = []) -> tuple[str, dict[str, Any]]:
+        """
+        Builds the rc command and its parameters of the upload.
+
+        Returns:
+        tuple[str, dict[str, Any]]: The rc command and its parameters.
+        """
+        src, dst = self._get_sync_paths()
+        params = {
+            "srcFs": src,
+            "dstFs": dst,
+            "_filter": {"FilesFrom": [self._files_from_path]},
+            "_config": {**self._get_rclone_config(), "NoTraverse": True},
+        }
+
+        return "sync/copy", params
+
     def _get_rclone_log_path(self) -> Path:
         """
         Returns the rclone log file path, for screenshots it will be the config log
@@ -338,6 +2093,117 @@ class CaptureSyncTarget(_SyncTarget):
         return []
 
 
+class CaptureUploadBatcher:
+    _batches: dict[str, dict[str, Future]] = dict()
+    _timers: dict[str, TimerHandle] = dict()
+    _uploads: set[Task] = set()
+
+    @classmethod
+    async def upload(cls, capture_path: str) -> int:
+        """
+        Queues a capture for upload. Captures in the same folder are collected for
+        "capture_batch_window" seconds or up to "capture_batch_size" files, then uploaded together.
+
+        Parameters:
+        capture_path (str): Path of the capture.
+
+        Returns:
+        int: 0 if the capture got uploaded, the exit code of the rclone sync process otherwise.
+        """
+        if not capture_path:
+            raise ValueError("capture_path is required")
+
+        capture_dir, file_name = str(Path(capture_path).parent), Path(capture_path).name
+        loop = asyncio.get_running_loop()
+        batch = cls._batches.setdefault(capture_dir, dict())
+        if file_name not in batch:
+            batch[file_name] = loop.create_future()
+        future = batch[file_name]
+
+        if len(batch) >= Config.get_config_item("capture_batch_size"):
+            cls._flush(capture_dir)
+        elif capture_dir not in cls._timers:
+            cls._timers[capture_dir] = loop.call_later(
+                Config.get_config_item("capture_batch_window"), cls._flush, capture_dir
+            )
+
+        return await asyncio.shield(future)
+
+    @classmethod
+    def _flush(cls, capture_dir: str):
+        """
+        Starts uploading the collected captures of a folder.
+
+        Parameters:
+        capture_dir (str): The folder of the captures.
+        """
+        if timer := cls._timers.pop(capture_dir, None):
+            timer.cancel()
+        if batch := cls._batches.pop(capture_dir, None):
+            upload = asyncio.create_task(cls._upload_batch(capture_dir, batch))
+            cls._uploads.add(upload)
+            upload.add_done_callback(cls._uploads.discard)
+
+    @classmethod
+    async def _upload_batch(cls, capture_dir: str, batch: dict[str, Future]):
+        """
+        Uploads a batch of captures and reports the result of each one to its caller.
+
+        Parameters:
+        capture_dir (str): The folder of the captures.
+        batch (dict[str, Future]): File names of the captures and the futures of their callers.
+        """
+        logger.info(f'Uploading {len(batch)} capture(s) from "{capture_dir}"')
+        sync_target = CaptureSyncTarget(capture_dir, list(batch))
+        try:
+            sync_result = await SyncScheduler.submit(
+                sync_target.id, f"upload {id(batch)}", sync_target.sync
+            )
+            results = sync_target.get_results(sync_result)
+        except Exception as e:
+            logger.error(f'Failed to upload captures from "{capture_dir}": {e}')
+            results = dict.fromkeys(batch, -1)
+
+        for file_name, future in batch.items():
+            if not future.done():
+                future.set_result(results[file_name])
+
+
+def get_config_flag(option: str) -> str:
+    """
+    Converts an rclone option into its flag.
+
+    Parameters:
+    option (str): The option, in the format of the "_config" parameter of rc calls, e.g. "BufferSize".
+
+    Returns:
+    str: The flag, e.g. "--buffer-size".
+    """
+    return RCLONE_CONFIG_FLAGS.get(option) or "--" + re.sub(r"(?<!^)([A-Z])", r"-\1", option).lower()
+
+
+def combine_progress(progresses: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Combines the progress of the copies of a sync running on each remote at the same time into one.
+
+    Parameters:
+    progresses (list[dict[str, Any]]): Progress of each remote, see _SyncTarget._update_progress.
+
+    Returns:
+    dict[str, Any]: Counts and speed added up over the remotes, the ETA and elapsed time of the slowest remote.
+    """
+    progress = {
+        key: sum(entry[key] for entry in progresses)
+        for key in ("bytes", "total_bytes", "files", "total_files", "checks", "total_checks", "errors", "speed")
+    }
+    etas = [entry["eta"] for entry in progresses if entry["eta"] is not None]
+    progress["eta"] = max(etas, default=None)
+    progress["elapsed"] = max(entry["elapsed"] for entry in progresses)
+    progress["transferring"] = list(dict.fromkeys(name for entry in progresses for name in entry["transferring"]))
+    progress["updated"] = max(entry["updated"] for entry in progresses)
+    return progress
+
+
 def get_sync_target(app_id: int) -> _SyncTarget:
     """
     Returns the sync target based on the app_id.
@@ -349,6 +2215,10 @@ def get_sync_target(app_id: int) -> _SyncTarget:
     _SyncTarget: The sync target.
     """
     if app_id > 0:
+        if app_id in Config.get_config_item("bundle_targets"):
+            return GameBundleSyncTarget(app_id)
+        if app_id in Config.get_config_item("chunked_targets"):
+            return GameChunkedSyncTarget(app_id)
         return GameSyncTarget(app_id)
     else:
         return GlobalSyncTarget()
@@ -0,0 +1,154 @@
+from typing import Any
+import math
+
+from config import *
+from rclone_config import RcloneConfig
+from sync_stats import SyncStats
+
+TUNING_HISTORY = 20
+# files at least this large on average make a target a large file one
+TUNING_LARGE_FILE_SIZE = 32 * 1024 * 1024
+# syncs transferring less than this say nothing about the throughput
+TUNING_MIN_THROUGHPUT_BYTES = 64 * 1024 * 1024
+# files one checker goes through in a sync
+TUNING_FILES_PER_CHECKER = 8
+# backend type: (max transfers, max checkers, chunk size for large files or None if not worth changing)
+TUNING_BACKEND_LIMITS: dict[str, tuple[int, int, str | None]] = {
+    "drive": (8, 16, "64M"),
+    "onedrive": (8, 16, "64000k"),
+    "dropbox": (8, 16, "64M"),
+    "box": (8, 16, None),
+    "pcloud": (8, 16, None),
+    "s3": (16, 32, "64M"),
+    "b2": (16, 32, None),
+    "sftp": (4, 8, None),
+    "mega": (4, 8, None),
+    "local": (16, 32, None),
+}
+TUNING_DEFAULT_LIMITS = (8, 16, None)
+
+
+class SyncTuner:
+    @classmethod
+    def get_tuning(cls, target: str, remote: str) -> dict[str, Any]:
+        """
+        Picks the number of transfers and checkers, and the upload chunk size of the backend for a sync target,
+        from its latest syncs and the backend of the remote. Overrides in "tuning_overrides" take precedence.
+
+        Parameters:
+        target (str): ID of the sync target.
+        remote (str): Name of the remote the sync goes to.
+
+        Returns:
+        dict[str, Any]: rclone options in the format of the "_config" parameter of rc calls ("config"),
+                        options of the backend, e.g. {"chunk_size": "64M"} ("backend"),
+                        and why they were picked ("reasons"). Options are empty if tuning is disabled.
+        """
+        tuning: dict[str, Any] = {"config": dict(), "backend": dict(), "reasons": []}
+        if not Config.get_config_item("adaptive_tuning"):
+            tuning["reasons"].append("adaptive_tuning is disabled")
+        else:
+            cls._tune(tuning, target, RcloneConfig.get_remote_type(remote))
+
+        if overrides := Config.get_config_item("tuning_overrides").get(target):
+            for option, value in overrides.items():
+                # options of the backend are in snake case, like in rclone.conf
+                tuning["backend" if option.islower() else "config"][option] = value
+            tuning["reasons"].append(f"overridden by tuning_overrides: {overrides}")
+
+        return tuning
+
+    @classmethod
+    def _tune(cls, tuning: dict[str, Any], target: str, remote_type: str):
+        """
+        Fills the tuning in from the latest successful syncs of the target.
+
+        Parameters:
+        tuning (dict[str, Any]): The tuning to fill in, see get_tuning.
+        target (str): ID of the sync target.
+        remote_type (str): Backend type of the remote.
+        """
+        try:
+            history = [
+                sync for sync in SyncStats.get_history(target, TUNING_HISTORY) if sync["exit_code"] in (0, 6)
+            ]
+        except Exception as e:
+            logger.warning(f'Failed to read the sync history of "{target}": {e}')
+            history = []
+        if not history:
+            tuning["reasons"].append("no successful sync yet, using the defaults of rclone")
+            return
+
+        max_transfers, max_checkers, chunk_size = TUNING_BACKEND_LIMITS.get(remote_type, TUNING_DEFAULT_LIMITS)
+        if any(sync["retries"] for sync in history[:5]):
+            max_transfers, max_checkers = max(1, max_transfers // 2), max(1, max_checkers // 2)
+            tuning["reasons"].append("recent syncs got retried, halving the limits of the backend")
+
+        files = max(sync["files"] for sync in history)
+        checked = max(sync["files"] + sync["checks"] for sync in history)
+        file_size = sum(sync["bytes"] for sync in history) / max(1, sum(sync["files"] for sync in history))
+
+        transfers = min(max(1, files), max_transfers)
+        tuning["reasons"].append(f"up to {files} files transferred per sync, {max_transfers} at most on {remote_type or 'unknown'}")
+        if file_size >= TUNING_LARGE_FILE_SIZE:
+            transfers = min(transfers, 4)
+            tuning["reasons"].append(f"large files of {file_size / 1024 / 1024:.0f} MiB on average")
+            if chunk_size:
+                tuning["backend"]["chunk_size"] = chunk_size
+
+        if (best := cls._get_best_transfers(history)) and (best < transfers):
+            transfers = best
+            tuning["reasons"].append(f"{best} transfers were as fast as more of them")
+
+        tuning["config"]["Transfers"] = transfers
+        tuning["config"]["Checkers"] = min(max(1, math.ceil(checked / TUNING_FILES_PER_CHECKER)), max_checkers)
+        tuning["reasons"].append(f"up to {checked} files checked per sync")
+
+    @staticmethod
+    def _get_best_transfers(history: list[dict[str, Any]]) -> int | None:
+        """
+        Compares the throughput of large syncs run with different numbers of transfers.
+
+        Parameters:
+        history (list[dict[str, Any]]): The syncs, see SyncStats.get_history.
+
+        Returns:
+        int | None: The least number of transfers that is within 10% of the best throughput,
+                    None if fewer than 2 numbers of transfers have been tried.
+        """
+        throughputs: dict[int, list[float]] = dict()
+        for sync in history:
+            if (sync["bytes"] < TUNING_MIN_THROUGHPUT_BYTES) or (sync["duration"] <= 0):
+                continue
+            if (transfers := get_transfers_arg(sync["args"])) is not None:
+                throughputs.setdefault(transfers, []).append(sync["bytes"] / sync["duration"])
+
+        if len(throughputs) < 2:
+            return None
+
+        means = {transfers: sum(values) / len(values) for transfers, values in throughputs.items()}
+        best = max(means.values())
+        return min(transfers for transfers, mean in means.items() if mean >= best * 0.9)
+
+
+def get_transfers_arg(args: list[str]) -> int | None:
+    """
+    Finds the number of transfers in rclone arguments.
+
+    Parameters:
+    args (list[str]): The arguments, e.g. ["--transfers", "8"] or ["--transfers=8"].
+
+    Returns:
+    int | None: The last number of transfers set, None if it is not set.
+    """
+    transfers = None
+    for i, arg in enumerate(args):
+        try:
+            if arg == "--transfers" and i + 1 < len(args):
+                transfers = int(args[i + 1])
+            elif arg.startswith("--transfers="):
+                transfers = int(arg.partition("=")[2])
+        except ValueError:
+            continue
+
+    return transfers
@@ -1,13 +1,46 @@
 import decky
 
 import socket
-from subprocess import Popen, PIPE
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
-import os, signal
+from threading import Event, Lock
+from typing import Any
+import mmap, os, re, signal
 
 from common_defs import *
 from config import Config
 
+# filter flag: (option of the "_filter" parameter of rc calls, whether the flag can be repeated)
+RC_FILTER_FLAGS: dict[str, tuple[str, bool]] = {
+    "files-from": ("FilesFrom", True),
+    "filter-from": ("FilterFrom", True),
+    "filter": ("FilterRule", True),
+    "include": ("IncludeRule", True),
+    "exclude": ("ExcludeRule", True),
+    "max-size": ("MaxSize", False),
+    "min-size": ("MinSize", False),
+    "max-age": ("MaxAge", False),
+    "min-age": ("MinAge", False),
+}
+# global flag: option of the "_config" parameter of rc calls
+RC_CONFIG_FLAGS: dict[str, str] = {
+    "no-traverse": "NoTraverse",
+    "checksum": "CheckSum",
+    "size-only": "SizeOnly",
+    "ignore-checksum": "IgnoreChecksum",
+    "ignore-size": "IgnoreSize",
+    "ignore-times": "IgnoreTimes",
+    "update": "UpdateOlder",
+    "transfers": "Transfers",
+    "checkers": "Checkers",
+    "buffer-size": "BufferSize",
+    "max-transfer": "MaxTransfer",
+    "low-level-retries": "LowLevelRetries",
+}
+
 
 def is_port_in_use(port: int) -> bool:
     """
@@ -23,85 +56,219 @@ def is_port_in_use(port: int) -> bool:
         return s.connect_ex(("localhost", port)) == 0
 
 
-def _get_process_tree(pid):
+# pid -> cgroup frozen by pause_process
+_frozen_cgroups: dict[int, Path] = dict()
+
+
+def _get_process_tree(pid: int) -> list[int]:
     """
-    Retrieves the process tree of a given process ID.
+    Retrieves the process tree of a given process ID from a single snapshot of /proc.
 
     Parameters:
     pid (int): The process ID whose process tree is to be retrieved.
 
     Returns:
-    list: A list of child process IDs.
-    """
-    children = []
-    with Popen(["ps", "--ppid", str(pid), "-o", "pid="], stdout=PIPE) as p:
-        lines = p.stdout.readlines()
-    for chldPid in lines:
-        chldPid = chldPid.strip()
-        if not chldPid:
-            continue
-        children.extend([int(chldPid.decode())])
+    list[int]: The process ID and all its descendants, parents always come before their children.
+    """
+    children: dict[int, list[int]] = dict()
+    with os.scandir("/proc") as it:
+        for entry in it:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/stat", "rb") as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # The command name may contain spaces and parentheses, fields after the last ")" don't
+            ppid = int(stat[stat.rindex(b")") + 2 :].split(b" ", 2)[1])
+            children.setdefault(ppid, []).append(int(entry.name))
+
+    tree = [pid]
+    i = 0
+    while i < len(tree):
+        tree.extend(children.get(tree[i], []))
+        i += 1
+
+    return tree
+
+
+def send_signal(pid: int, sig: signal.Signals):
+    """
+    Sends a signal to a process and all its descendants. SIGCONT is sent to children before parents,
+    other signals are sent to parents first, so that no new child gets spawned after the snapshot is taken.
 
-    return children
+    Parameters:
+    pid (int): The process ID of the target process.
+    sig (signal.Signals): The signal to send.
+    """
+    signalled = set()
+    while True:
+        tree = [p for p in _get_process_tree(pid) if p not in signalled]
+        if not tree:
+            break
+        if sig == signal.SIGCONT:
+            tree.reverse()
+
+        for target_pid in tree:
+            try:
+                os.kill(target_pid, sig)
+                logger.debug("Process %d received signal %s", target_pid, sig.name)
+            except Exception as e:
+                logger.warning(
+                    "Error sending signal %s to process %d: %s", sig.name, target_pid, e
+                )
+            signalled.add(target_pid)
+
+        # Processes only stop spawning children once stopped, take another snapshot for new ones
+        if sig != signal.SIGSTOP:
+            break
 
 
-def send_signal(pid: int, signal: signal.Signals):
+def _get_freezable_cgroup(pid: int) -> Path | None:
     """
-    Sends a signal to a process and its child processes recursively.
+    Finds the cgroup v2 of a process, if it can be frozen without affecting other processes.
 
     Parameters:
-    pid (int): The process ID of the target process.
-    signal (signal.Signals): The signal to send.
+    pid (int): The process ID.
 
-    Raises:
-    Exception: If an error occurs while sending the signal.
+    Returns:
+    Path | None: Path of the cgroup, None if it doesn't exist, isn't writable,
+                 or contains processes outside of the process tree.
     """
     try:
-        os.kill(pid, signal)
-        logger.debug("Process %d received signal %s", pid, signal.name)
+        with open(f"/proc/{pid}/cgroup") as f:
+            cgroup_path = next(line[3:].strip() for line in f if line.startswith("0::"))
+        cgroup = Path("/sys/fs/cgroup") / cgroup_path.lstrip("/")
+        if not os.access(cgroup / "cgroup.freeze", os.W_OK):
+            return None
+        cgroup_procs = {int(p) for p in (cgroup / "cgroup.procs").read_text().split()}
+    except (OSError, StopIteration, ValueError):
+        return None
+
+    if not cgroup_procs.issubset(_get_process_tree(pid)):
+        logger.debug("Cgroup %s is shared with other processes", cgroup)
+        return None
+
+    return cgroup
+
+
+def pause_process(pid: int):
+    """
+    Pauses a process and all its descendants. If "process_freezer" is enabled and the processes
+    have a cgroup of their own, the cgroup gets frozen atomically, otherwise SIGSTOP is sent.
 
-        child_pids = _get_process_tree(pid)
-        for child_pid in child_pids:
-            send_signal(child_pid, signal)
+    Parameters:
+    pid (int): The process ID of the target process.
+    """
+    if Config.get_config_item("process_freezer") and (cgroup := _get_freezable_cgroup(pid)):
+        try:
+            (cgroup / "cgroup.freeze").write_text("1")
+            _frozen_cgroups[pid] = cgroup
+            logger.debug("Froze cgroup %s of process %d", cgroup, pid)
+            return
+        except OSError as e:
+            logger.warning("Error freezing cgroup %s: %s", cgroup, e)
 
-    except Exception as e:
-        logger.warning("Error sending signal %s to process %d: %s", signal.name, pid, e)
+    send_signal(pid, signal.SIGSTOP)
 
 
-def test_syncpath(syncpath: str) -> int:
+def resume_process(pid: int):
+    """
+    Resumes a process and all its descendants paused by pause_process.
+
+    Parameters:
+    pid (int): The process ID of the target process.
+    """
+    if cgroup := _frozen_cgroups.pop(pid, None):
+        try:
+            (cgroup / "cgroup.freeze").write_text("0")
+            logger.debug("Thawed cgroup %s of process %d", cgroup, pid)
+            return
+        except OSError as e:
+            logger.warning("Error thawing cgroup %s: %s", cgroup, e)
+
+    send_signal(pid, signal.SIGCONT)
+
+
+def test_syncpath(syncpath: str, cancelled: Event | None = None) -> int:
     """
     Tests a sync path to determine if it's a file or a directory.
 
     Parameters:
     path (str): The path to test.
+    cancelled (Event | None): Stops counting once it is set, counted as exceeding the limit.
 
     Returns:
     int: The number of files if it's a directory, -1 if it exceeds the limit, or 0 if it's a file.
     """
-    if not syncpath.startswith(Config.get_config_item("sync_root")):
+    from rclone_filter import RcloneFilter
+
+    sync_root = Config.get_config_item("sync_root")
+    if not syncpath.startswith(sync_root):
         raise Exception("Selection is outside of sync root.")
 
-    if syncpath.endswith("/**"):
-        scan_single_dir = False
-        syncpath = syncpath[:-3]
-    elif syncpath.endswith("/*"):
-        scan_single_dir = True
-        syncpath = syncpath[:-2]
-    else:
+    if not (syncpath.endswith("/**") or syncpath.endswith("/*")):
         return int(Path(syncpath).is_file())
 
+    sync_filter = RcloneFilter([f"+ /{syncpath[len(sync_root):].lstrip('/')}", "- **"])
     count = 0
-    for _, _, os_files in os.walk(syncpath, followlinks=True):
-        count += len(os_files)
-        if count > 9000:
+    for _ in sync_filter.walk(sync_root):
+        count += 1
+        if count > 9000 or (cancelled and cancelled.is_set()):
             return -1
-        if scan_single_dir:
-            break
 
     logger.debug("Counted %d files", count)
     return count
 
 
+def rc_params_from_args(args: list[str]) -> dict[str, Any]:
+    """
+    Converts rclone command line flags into rc parameters.
+    Filter flags go to the "_filter" parameter and global flags in RC_CONFIG_FLAGS to the "_config" parameter,
+    as rc commands only take their own flags as parameters.
+
+    Parameters:
+    args (list[str]): The flags, e.g. ["--conflict-loser", "num", "--resync", "--files-from", "a.files"].
+
+    Returns:
+    dict[str, Any]: The rc parameters, e.g. {"conflictLoser": "num", "resync": True, "_filter": {"FilesFrom": ["a.files"]}}.
+    """
+    params = dict()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if not arg.startswith("--"):
+            logger.warning("Ignoring unexpected rclone argument: %s", arg)
+            continue
+
+        name, _, value = arg[2:].partition("=")
+        if not value:
+            if i < len(args) and not args[i].startswith("-"):
+                value = args[i]
+                i += 1
+            else:
+                value = True
+
+        if name in RC_FILTER_FLAGS:
+            option, repeated = RC_FILTER_FLAGS[name]
+            rc_filter = params.setdefault("_filter", dict())
+            if repeated:
+                rc_filter.setdefault(option, []).append(value)
+            else:
+                rc_filter[option] = value
+        elif name in RC_CONFIG_FLAGS:
+            if isinstance(value, str) and value.isdigit():
+                value = int(value)
+            params.setdefault("_config", dict())[RC_CONFIG_FLAGS[name]] = value
+        else:
+            first, *rest = name.split("-")
+            params[first + "".join(word.capitalize() for word in rest)] = value
+
+    return params
+
+
 def delete_lock_files():
     """
     Deletes rclone lock files
@@ -122,6 +289,107 @@ def get_plugin_log() -> str:
         return f.read()
 
 
+def get_plugin_log_page(offset: int = -1, limit: int = 200, direction: str = "tail") -> dict[str, Any]:
+    """
+    Retrieves a page of the plugin log, see read_log_page.
+
+    Returns:
+    dict[str, Any]: The page of the plugin log.
+    """
+    return read_log_page(Path(decky.DECKY_PLUGIN_LOG), offset, limit, direction)
+
+
+# path -> (inode, indexed size, offsets of "\n"), of the most recently read logs
+_log_line_indexes: OrderedDict[str, tuple[int, int, array]] = OrderedDict()
+_log_line_indexes_lock = Lock()
+LOG_LINE_INDEXES_SIZE = 8
+
+
+def _get_line_index(path: str, inode: int, size: int, mm: mmap.mmap) -> array:
+    """
+    Returns offsets of all newlines in a log file. The index is cached for the last
+    LOG_LINE_INDEXES_SIZE files read, and only the appended part gets scanned if the file
+    has grown since the last call.
+
+    Parameters:
+    path (str): Path of the log file.
+    inode (int): Inode of the log file.
+    size (int): Current size of the log file.
+    mm (mmap.mmap): The memory-mapped log file.
+
+    Returns:
+    array: Sorted offsets of the newlines.
+    """
+    with _log_line_indexes_lock:
+        cached = _log_line_indexes.pop(path, None)
+        if cached and cached[0] == inode and cached[1] <= size:
+            _, pos, newlines = cached
+        else:
+            pos, newlines = 0, array("q")
+
+        while (pos := mm.find(b"\n", pos, size)) != -1:
+            newlines.append(pos)
+            pos += 1
+        _log_line_indexes[path] = (inode, size, newlines)
+        while len(_log_line_indexes) > LOG_LINE_INDEXES_SIZE:
+            _log_line_indexes.popitem(last=False)
+
+    return newlines
+
+
+def read_log_page(
+    path: Path,
+    offset: int = -1,
+    limit: int = 200,
+    direction: str = "tail",
+    max_bytes: int = 256 * 1024,
+) -> dict[str, Any]:
+    """
+    Reads a page of a log file without loading the whole file.
+
+    Parameters:
+    path (Path): Path of the log file.
+    offset (int): Byte offset of the page, -1 for the end of the file.
+                  For "tail" the page ends at it, for "forward" the page starts from it.
+    limit (int): Max number of lines of the page.
+    direction (str): "tail" to read backwards, "forward" to read (or follow) onwards.
+    max_bytes (int): Max number of bytes of the page.
+
+    Returns:
+    dict[str, Any]: Content of the page ("text"), byte offsets where it starts ("start") and ends ("end"),
+                    size ("size") and inode ("inode") of the file. Pass "start" as offset to get the previous
+                    page with "tail", or "end" to get the next page with "forward", a changed inode means
+                    the log got replaced and the offsets no longer apply.
+    """
+    with open(path, "rb") as f:
+        file_stat = os.fstat(f.fileno())
+        size = file_stat.st_size
+        if offset < 0 or offset > size:
+            offset = size
+        if size == 0:
+            return {"text": "", "start": 0, "end": 0, "size": 0, "inode": file_stat.st_ino}
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            newlines = _get_line_index(str(path), file_stat.st_ino, size, mm)
+            if direction == "tail":
+                end = offset
+                # A newline right before the end terminates the last line of the page
+                i = bisect_left(newlines, end - 1) - limit
+                start = max(newlines[i] + 1 if i >= 0 else 0, end - max_bytes)
+            elif direction == "forward":
+                start = offset
+                i = bisect_left(newlines, start) + limit - 1
+                # The index may have grown past this size by a read on another thread
+                count = bisect_left(newlines, size)
+                end = min(newlines[i] + 1 if i < count else size, start + max_bytes)
+            else:
+                raise ValueError(f"Invalid direction: {direction}")
+
+            text = mm[start:end].decode(errors="replace")
+
+    return {"text": text, "start": start, "end": end, "size": size, "inode": file_stat.st_ino}
+
+
 def getLocalScreenshotPath(user_id: int, screenshot_url: str) -> str:
     """
     Returns the local screenshot path for a given user and screenshot URL.
@@ -151,14 +419,13 @@ def get_available_filters() -> list[int]:
     Returns:
     list[int]: A list of available sync targets.
     """
-    sync_paths = list()
-    for filter in PLUGIN_CONFIG_DIR.glob("*.filter"):
-        if filter.stem in SYNC_FILTER_TYPE_DICT:
-            sync_paths.append(SYNC_FILTER_TYPE_DICT[filter.stem])
-        elif filter.stem.isdigit():
-            sync_paths.append(int(filter.stem))
+    from filter_store import FilterStore, get_filter_app_id
 
-    return sync_paths
+    return [
+        app_id
+        for target in FilterStore.get_targets()
+        if (app_id := get_filter_app_id(target)) is not None
+    ]
 
 
 def get_filters(file: Path) -> list[str]:
@@ -179,18 +446,17 @@ def get_filters(file: Path) -> list[str]:
         ]
 
 
-def set_filters(file: Path, filters: list[str]):
+def parse_mod_time(mod_time: str) -> float:
     """
-    Updates sync filters to the specified file.
+    Parses a modification time listed by rclone.
 
     Parameters:
-    file (Path): Path of the filter file
-    filters (list[str]): The filters to set, elements inside should not contain '\\n'.
-    """
-    if not filters:
-        file.unlink(missing_ok=True)
-        return
+    mod_time (str): The time, e.g. "2024-01-01T12:00:00.123456789+01:00" or "2024-01-01T11:00:00Z".
 
-    str_to_write = "\n".join(stripped for path in filters if (stripped := path.strip()))
-    with file.open("w") as f:
-        f.write(str_to_write)
+    Returns:
+    float: The timestamp, 0 if it cannot be parsed.
+    """
+    try:
+        return datetime.fromisoformat(re.sub(r"\.\d+", "", mod_time).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return 0
@@ -1,38 +1,102 @@
 import { useEffect, useState, useRef, PropsWithChildren } from "react";
 import { IoMdRefresh } from "react-icons/io";
+import { FaAngleDoubleUp, FaPause, FaPlay } from "react-icons/fa";
 import PageView from "./pageView";
 import IconButton from "./iconButton";
 
+const PAGE_LINES = 200;
+const FOLLOW_INTERVAL = 2000;
+
 interface LogsViewProps {
   title: string;
   fullPage: boolean;
-  getLog: () => Promise<string>;
+  getPage: (offset: number, limit: number, direction: LogDirection) => Promise<LogPage>;
+}
+
+interface LogState {
+  text: string;
+  start: number;
+  end: number;
+  inode: number;
 }
 
-export default function LogsView({ title, fullPage = true, getLog, children }: PropsWithChildren<LogsViewProps>) {
-  const [logContent, setLogContent] = useState('');
+export default function LogsView({ title, fullPage = true, getPage, children }: PropsWithChildren<LogsViewProps>) {
+  const [log, setLog] = useState<LogState>({ text: '', start: 0, end: 0, inode: 0 });
+  const [following, setFollowing] = useState(false);
   const logPreRef = useRef<HTMLPreElement>(null);
+  // Pages loaded above keep the scroll position, new lines at the end scroll down
+  const scrollToEnd = useRef(true);
+
+  const loadLast = async () => {
+    const page = await getPage(-1, PAGE_LINES, "tail");
+    scrollToEnd.current = true;
+    setLog({ text: page.text, start: page.start, end: page.end, inode: page.inode });
+  };
+
+  const loadEarlier = async () => {
+    const page = await getPage(log.start, PAGE_LINES, "tail");
+    scrollToEnd.current = false;
+    setLog(current => (current.inode == page.inode && current.start == page.end)
+      ? { ...current, text: page.text + current.text, start: page.start }
+      : current);
+  };
+
+  const loadNext = async () => {
+    const page = await getPage(log.end, PAGE_LINES, "forward");
+    if (page.inode != log.inode || page.size < log.end) {
+      // The log got replaced, by a new sync or a rotation
+      await loadLast();
+      return;
+    }
+    if (page.end > page.start) {
+      scrollToEnd.current = true;
+      setLog(current => (current.inode == page.inode && current.end == page.start)
+        ? { ...current, text: current.text + page.text, end: page.end }
+        : current);
+    }
+  };
 
   useEffect(() => {
-    getLog().then(setLogContent);
+    loadLast();
   }, []);
 
   useEffect(() => {
-    logPreRef.current?.scrollTo({
-      top: logPreRef.current.scrollHeight,
-      behavior: 'smooth'
-    });
-  }, [logContent]);
+    if (!following) {
+      return;
+    }
+    const timer = setTimeout(loadNext, FOLLOW_INTERVAL);
+    return () => clearTimeout(timer);
+  }, [following, log]);
+
+  useEffect(() => {
+    if (scrollToEnd.current) {
+      logPreRef.current?.scrollTo({
+        top: logPreRef.current.scrollHeight,
+        behavior: 'smooth'
+      });
+    }
+  }, [log]);
 
   return (
     <PageView
       title={title}
       titleItem={<>
         {children}
+        <IconButton
+          icon={FaAngleDoubleUp}
+          onOKActionDescription="Load earlier logs"
+          disabled={log.start == 0}
+          onClick={loadEarlier}
+        />
+        <IconButton
+          icon={following ? FaPause : FaPlay}
+          onOKActionDescription={following ? "Stop following logs" : "Follow logs"}
+          onClick={() => setFollowing(!following)}
+        />
         <IconButton
           icon={IoMdRefresh}
           onOKActionDescription="Refresh logs"
-          onClick={() => getLog().then(e => setLogContent(e))}
+          onClick={loadLast}
         />
       </>}
       fullPage={fullPage}
@@ -51,7 +115,7 @@ export default function LogsView({ title, fullPage = true, getLog, children }: P
           maxHeight: "calc(100% - 1px)",
           margin: "0",
         }}>
-        {logContent}
+        {log.text}
       </pre>
     </PageView>
   );
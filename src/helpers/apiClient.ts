@@ -1,5 +1,5 @@
 import { LifetimeNotification } from "@decky/ui";
-import { sync_cloud_first, sync_local_first } from "./backend";
+import { set_game_running, sync_cloud_first, sync_local_first } from "./backend";
 import { GLOBAL_SYNC_APP_ID } from "./commonDefs";
 import { getCurrentUserId } from "./utils";
 import Logger from "./logger";
@@ -16,6 +16,7 @@ export function setupScreenshotNotification(): Unregisterable {
 
 export function setupAppLifetimeNotifications(): Unregisterable {
   return SteamClient.GameSessions.RegisterForAppLifetimeNotifications(async (e: LifetimeNotification) => {
+    await set_game_running(e.unAppID, e.bRunning);
     if (e.bRunning) {
       if (Config.get("sync_on_game_start")) {
         Logger.info(`Syncing on game ${e.unAppID} start`);
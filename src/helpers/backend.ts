@@ -4,6 +4,7 @@ import { callable } from "@decky/api"
 export const spawn = callable<[backend_type: string], string>("spawn");
 export const spawn_probe = callable<[], number>("spawn_probe");
 export const get_cloud_type = callable<[], string>("get_cloud_type");
+export const get_remotes = callable<[], Record<string, RemoteCapabilities>>("get_remotes");
 export const update_rclone = callable<[], void>("update_rclone");
 
 // Sync Paths
@@ -11,14 +12,26 @@ export const get_target_filters = callable<[app_id: number], Array<string>>("get
 export const set_target_filters = callable<[app_id: number, paths: Array<string>], void>("set_target_filters");
 export const get_shared_filters = callable<[], Array<string>>("get_shared_filters");
 export const set_shared_filters = callable<[paths: Array<string>], void>("set_shared_filters");
+export const get_filters_batch = callable<[app_ids?: Array<number>], Record<string, Array<string>>>("get_filters_batch");
+export const set_filters_batch = callable<[filters: Record<string, Array<string>>], void>("set_filters_batch");
 export const get_available_filters = callable<[], Array<number>>("get_available_filters");
 export const test_syncpath = callable<[path: string], number>("test_syncpath");
+export const preview_sync = callable<[app_id: number, max_files?: number], SyncPreview>("preview_sync");
 
 // Syncing
 export const sync_local_first = callable<[app_id: number], number>("sync_local_first");
 export const sync_cloud_first = callable<[app_id: number], number>("sync_cloud_first");
 export const resync_local_first = callable<[], number>("resync_local_first");
 export const resync_cloud_first = callable<[], number>("resync_cloud_first");
+export const plan_sync = callable<[app_id: number, winner: SyncWinner], SyncPlan>("plan_sync");
+export const execute_plan = callable<[app_id: number, plan_id: string], number>("execute_plan");
+export const cancel_sync = callable<[app_id: number], boolean>("cancel_sync");
+export const start_dirty_watch = callable<[app_id: number], boolean>("start_dirty_watch");
+export const get_sync_progress = callable<[app_id: number], SyncProgress>("get_sync_progress");
+export const get_mirror_results = callable<[app_id: number], Record<string, number>>("get_mirror_results");
+export const get_sync_stats = callable<[app_id: number, limit?: number], SyncStats>("get_sync_stats");
+export const get_sync_tuning = callable<[app_id: number], SyncTuning>("get_sync_tuning");
+export const set_game_running = callable<[app_id: number, running: boolean], void>("set_game_running");
 export const sync_screenshot = callable<[user_id: number, screenshot_url: string], number>("sync_screenshot");
 export const delete_lock_files = callable<[], void>("delete_lock_files");
 
@@ -37,3 +50,5 @@ export const log_warning = callable<[msg: string], void>("log_warning");
 export const log_error = callable<[msg: string], void>("log_error");
 export const get_last_sync_log = callable<[app_id: number], string>("get_last_sync_log");
 export const get_plugin_log = callable<[], string>("get_plugin_log");
+export const get_last_sync_log_page = callable<[app_id: number, offset?: number, limit?: number, direction?: LogDirection], LogPage>("get_last_sync_log_page");
+export const get_plugin_log_page = callable<[offset?: number, limit?: number, direction?: LogDirection], LogPage>("get_plugin_log_page");
@@ -7,6 +7,9 @@ export const PLUGIN_NAME_AS_PATH: string = Plugin.name.replaceAll(' ', '-').toLo
 export const GLOBAL_SYNC_APP_ID: number = 0;
 export const SHARED_FILTER_APP_ID: number = -1;
 
+export const SYNC_TIMED_OUT_EXIT_CODE: number = -2;
+export const SYNC_CANCELLED_EXIT_CODE: number = -3;
+
 export const CONTEXT_MENU_GAME_FILTER_KEY: string = `${PLUGIN_NAME_AS_PATH}-filters`;
 export const CLIPBOARD_KEY: string = `${PLUGIN_NAME_AS_PATH}-clipboard`;
 
@@ -1,5 +1,4 @@
-import { SHARED_FILTER_APP_ID } from "./commonDefs";
-import { get_available_filters, get_target_filters, set_target_filters, get_shared_filters, set_shared_filters } from "./backend";
+import { get_filters_batch, set_filters_batch } from "./backend";
 import Logger from "./logger";
 import Observable from "../types/observable";
 
@@ -9,33 +8,25 @@ class SyncFilters extends Observable {
     SET: "set",
   }
 
-  private appIdSet: Set<number> = new Set();
+  private filters: Map<number, Array<string>> = new Map();
 
   public async refresh(): Promise<void> {
-    let availableSyncFilters = await get_available_filters();
-    Logger.debug("Available sync filters:", availableSyncFilters);
-    this.appIdSet = new Set(availableSyncFilters);
+    const allFilters = await get_filters_batch();
+    this.filters = new Map(Object.entries(allFilters).map(([appId, filters]) => [Number(appId), filters]));
+    Logger.debug("Available sync filters:", Array.from(this.filters.keys()));
     this.emit(this.events.UPDATE);
   }
 
   public has(appId: number): boolean {
-    return this.appIdSet.has(appId);
+    return this.filters.has(appId);
   }
 
   public async get(appId: number): Promise<Array<string>> {
-    if (appId == SHARED_FILTER_APP_ID) {
-      return await get_shared_filters();
-    } else {
-      return await get_target_filters(appId);
-    }
+    return this.filters.get(appId) ?? [];
   }
 
   public async set(appId: number, filters: Array<string>): Promise<void> {
-    if (appId == SHARED_FILTER_APP_ID) {
-      await set_shared_filters(filters);
-    } else {
-      await set_target_filters(appId, filters);
-    }
+    await set_filters_batch({ [appId]: filters });
     this.emit(this.events.SET, appId);
     await this.refresh();
   }
@@ -1,6 +1,7 @@
 import fastq from "fastq";
 import type { queueAsPromised } from "fastq";
-import { sync_screenshot, pause_process, resume_process } from "./backend";
+import { sync_screenshot, pause_process, resume_process, start_dirty_watch } from "./backend";
+import { GLOBAL_SYNC_APP_ID, SYNC_CANCELLED_EXIT_CODE, SYNC_TIMED_OUT_EXIT_CODE } from "./commonDefs";
 import * as Toaster from "./toaster";
 import * as SyncStateTracker from "./syncStateTracker";
 import Observable from "../types/observable";
@@ -28,7 +29,8 @@ class SyncTaskQueue extends Observable {
 
   public constructor() {
     super();
-    this.queue = fastq.promise(worker, 1)
+    this.queue = fastq.promise(worker, Config.get("sync_concurrency"))
+    Config.on("sync_concurrency", (concurrency: number) => this.queue.concurrency = concurrency);
     this.queue.drain = () => {
       Logger.debug("All tasks finished")
       this.emit(this.events.BUSY, false);
@@ -53,7 +55,18 @@ class SyncTaskQueue extends Observable {
             Logger.info(`Sync for "${appId}" finished`);
             if (gameRunning == undefined) {
               Toaster.toast("Sync finished");
+            } else if (gameRunning && appId != GLOBAL_SYNC_APP_ID && Config.get("dirty_watch")) {
+              start_dirty_watch(appId)
+                .then((started) => Logger.debug(`Dirty watch for "${appId}" ${started ? "started" : "not started"}`));
             }
+          } else if (exitCode == SYNC_CANCELLED_EXIT_CODE) {
+            Logger.info(`Sync for "${appId}" cancelled`);
+            Toaster.toast("Sync cancelled");
+          } else if (exitCode == SYNC_TIMED_OUT_EXIT_CODE) {
+            Logger.error(`Sync for ${appId} timed out`);
+            Toaster.toast(`Sync timed out, click to see the logs`, 5000, () => {
+              this.emit(this.events.FAIL_TOAST_CLICK, appId)
+            });
           } else {
             Logger.error(`Sync for for ${appId} failed with exit code ${exitCode}`);
             Toaster.toast(`Sync failed, click to see the errors`, 5000, () => {
@@ -80,7 +93,8 @@ class SyncTaskQueue extends Observable {
   }
 
   public async addScreenshotSyncTask(userId: number, screenshotUrl: string, gameId: string, handle: number) {
-    this.pushTask(async () => await sync_screenshot(userId, screenshotUrl))
+    // Not queued, the backend batches screenshots taken in a short time into one upload
+    sync_screenshot(userId, screenshotUrl)
       .then((exitCode) => {
         if (exitCode == 0 && Config.get("capture_delete_after_upload")) {
           SteamClient.Screenshots.DeleteLocalScreenshot(gameId, handle)
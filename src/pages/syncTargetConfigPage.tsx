@@ -1,10 +1,10 @@
 import { ReactNode, useEffect, useState } from "react";
 import { IoArrowUpCircle, IoArrowDownCircle } from "react-icons/io5";
-import { FaCloudArrowUp, FaCloudArrowDown } from "react-icons/fa6";
+import { FaCloudArrowUp, FaCloudArrowDown, FaStop } from "react-icons/fa6";
 import { Navigation, SidebarNavigation, useParams } from "@decky/ui";
 import { GLOBAL_SYNC_APP_ID, SHARED_FILTER_APP_ID } from "../helpers/commonDefs";
 import { getAppName } from "../helpers/utils";
-import { get_last_sync_log, sync_local_first, sync_cloud_first, resync_local_first, resync_cloud_first } from "../helpers/backend";
+import { get_last_sync_log_page, sync_local_first, sync_cloud_first, resync_local_first, resync_cloud_first, cancel_sync } from "../helpers/backend";
 import { confirmPopup } from "../components/popups";
 import * as Toaster from "../helpers/toaster";
 import RoutePage from "../components/routePage";
@@ -94,6 +94,12 @@ class SyncTargetConfigPage extends RoutePage<SyncTargetConfigPageParams> {
                 disabled={syncInProgress}
                 onClick={() => SyncTaskQueue.addSyncTask(sync_cloud_first, appId)}>
               </IconButton>
+              <IconButton
+                icon={FaStop}
+                onOKActionDescription="Cancel Sync"
+                disabled={!syncInProgress}
+                onClick={() => cancel_sync(appId)}>
+              </IconButton>
             </FiltersView>
         },
         {
@@ -103,7 +109,7 @@ class SyncTargetConfigPage extends RoutePage<SyncTargetConfigPageParams> {
           content:
             <LogsView
               title="Sync Logs"
-              getLog={async () => await get_last_sync_log(appId)}
+              getPage={(offset, limit, direction) => get_last_sync_log_page(appId, offset, limit, direction)}
               fullPage={false}
             >
               {(appId == GLOBAL_SYNC_APP_ID) && (
@@ -33,6 +33,101 @@ declare global {
     unAppID: number;
   }
 
+  type LogDirection = "tail" | "forward";
+
+  interface LogPage {
+    text: string;
+    start: number;
+    end: number;
+    size: number;
+    inode: number;
+  }
+
+  interface SyncPreview {
+    count: number;
+    bytes: number;
+    files: Array<[path: string, size: number]>;
+    truncated: boolean;
+  }
+
+  type SyncWinner = "path1" | "path2"; // local, cloud
+
+  interface SyncPlanChanges {
+    new: Array<[path: string, size: number]>;
+    changed: Array<[path: string, size: number, new_size: number]>;
+    deleted: Array<[path: string, size: number]>;
+  }
+
+  interface SyncPlan {
+    plan_id: string;
+    winner: SyncWinner;
+    mode: string;
+    local: SyncPlanChanges;
+    cloud: SyncPlanChanges;
+    bytes: number;
+  }
+
+  interface SyncProgress {
+    bytes?: number;
+    total_bytes?: number;
+    files?: number;
+    total_files?: number;
+    checks?: number;
+    total_checks?: number;
+    errors?: number;
+    speed?: number;
+    eta?: number | null;
+    elapsed?: number;
+    transferring?: Array<string>;
+    updated?: number; // timestamp
+  }
+
+  interface RemoteCapabilities {
+    type: string;
+    hashes: Array<string>;
+    mod_time_precision: number | null; // seconds, null if unsupported
+    server_side_copy: boolean;
+    known: boolean;
+  }
+
+  interface SyncTuning {
+    config: Record<string, number | boolean | string>;
+    backend: Record<string, number | boolean | string>;
+    reasons: Array<string>;
+  }
+
+  interface Percentiles {
+    p50: number;
+    p90: number;
+    p99: number;
+    max: number;
+  }
+
+  interface SyncRecord {
+    target: string;
+    mode: string;
+    winner: string;
+    args: Array<string>;
+    started: number; // timestamp
+    duration: number;
+    bytes: number;
+    files: number;
+    checks: number;
+    errors: number;
+    retries: number;
+    exit_code: number;
+  }
+
+  interface SyncStats {
+    target: string;
+    count: number;
+    failures: number;
+    duration: Percentiles;
+    bytes: Percentiles;
+    files: Percentiles;
+    history: Array<SyncRecord>;
+  }
+
   type UnregisterFunction = () => void;
 
   interface Unregisterable {
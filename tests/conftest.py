@@ -0,0 +1,15 @@
+"""
+Setup of the tests, which run with the stand-in of the decky module used by the benchmarks,
+with all directories of the plugin in a temporary folder.
+
+Usage:
+python -m pytest tests
+"""
+
+from pathlib import Path
+import os, sys, tempfile
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault("DECKY_BENCH_HOME", tempfile.mkdtemp(prefix="sdh-gamesync-test-"))
+sys.path[:0] = [str(REPO_DIR / "benchmarks"), str(REPO_DIR / "py_modules")]
@@ -0,0 +1,54 @@
+"""
+Tests of the chunking of large save files.
+"""
+
+from pathlib import Path
+import hashlib, os, random, tempfile, unittest
+
+import chunk_store
+
+
+class ChunkStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="sdh-gamesync-chunks-")
+        self.data = random.Random(1).randbytes(6 * 1024 * 1024)
+
+    def write(self, root: str, path: str, data: bytes) -> list:
+        os.makedirs(os.path.join(root, os.path.dirname(path)), exist_ok=True)
+        with open(os.path.join(root, path), "wb") as f:
+            f.write(data)
+        stat = os.stat(os.path.join(root, path))
+        return [stat.st_size, stat.st_mtime_ns, chunk_store.chunk_file(os.path.join(root, path))]
+
+    def test_assemble_round_trip(self):
+        local = {"saves/big.sav": self.write(self.root, "saves/big.sav", self.data)}
+        chunk_dir = Path(self.root, "chunks")
+        staged = chunk_store.stage_chunks(self.root, local, chunk_store.get_chunk_hashes(local), chunk_dir)
+        self.assertEqual(len(staged), len(local["saves/big.sav"][2]))
+
+        other = tempfile.mkdtemp(prefix="sdh-gamesync-chunks-")
+        chunk_store.assemble(other, local, dict(), chunk_dir)
+        self.assertEqual(Path(other, "saves/big.sav").read_bytes(), self.data)
+        self.assertEqual(os.stat(os.path.join(other, "saves/big.sav")).st_mtime_ns, local["saves/big.sav"][1])
+
+    def test_insertion_keeps_most_chunks(self):
+        old = self.write(self.root, "a.sav", self.data)
+        new = self.write(self.root, "b.sav", self.data[:1000] + b"inserted" + self.data[1000:])
+        old_hashes = chunk_store.get_chunk_hashes({"a": old})
+        new_hashes = chunk_store.get_chunk_hashes({"b": new})
+        self.assertLessEqual(len(new_hashes - old_hashes), 2)
+
+    def test_assemble_rejects_paths_out_of_root(self):
+        entries = {"../escaped.sav": [1, 0, [[hashlib.sha256(b"x").hexdigest(), 1]]]}
+        with self.assertRaises(ValueError):
+            chunk_store.assemble(self.root, entries, dict(), Path(self.root, "chunks"))
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.root), "escaped.sav")))
+
+    def test_merge_index_keeps_only_files_missing_locally(self):
+        local = {"big.sav": [10, 1, []]}
+        remote = {"big.sav": [9, 0, []], "shrunk.sav": [8, 0, []], "other.sav": [7, 0, []]}
+        Path(self.root, "shrunk.sav").write_bytes(b"small")
+
+        self.assertEqual(
+            chunk_store.merge_index(self.root, local, remote), {"big.sav": [10, 1, []], "other.sav": [7, 0, []]}
+        )
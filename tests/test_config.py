@@ -0,0 +1,53 @@
+"""
+Tests of the migration of stored configurations.
+"""
+
+from pathlib import Path
+import json, unittest
+
+import decky
+from config import CONFIG_VERSION, Config, remove_legacy_sync_args
+
+
+class RemoveLegacySyncArgsTest(unittest.TestCase):
+    def test_keeps_other_flags(self):
+        self.assertEqual(
+            remove_legacy_sync_args(
+                ["--ignore-checksum", "--copy-links", "--transfers", "8", "--checkers", "16", "--fast-list"]
+            ),
+            ["--copy-links", "--fast-list"],
+        )
+
+    def test_changed_defaults_are_kept(self):
+        args = ["--ignore-checksum", "--transfers", "4", "--checkers", "16"]
+        self.assertEqual(remove_legacy_sync_args(args), args)
+        self.assertEqual(remove_legacy_sync_args(["--transfers", "8"]), ["--transfers", "8"])
+
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.path = Path(decky.DECKY_PLUGIN_SETTINGS_DIR) / "config.json"
+        self.stored = self.path.read_bytes() if self.path.exists() else None
+        Config._settings = None
+
+    def tearDown(self):
+        if self.stored is None:
+            self.path.unlink(missing_ok=True)
+        else:
+            self.path.write_bytes(self.stored)
+        Config._settings = None
+
+    def migrate(self, settings: dict) -> dict:
+        self.path.write_text(json.dumps(settings))
+        Config.migrate()
+        Config._settings = None
+        return json.loads(self.path.read_text())
+
+    def test_removes_legacy_defaults_once(self):
+        legacy = ["--ignore-checksum", "--copy-links", "--transfers", "8", "--checkers", "16"]
+        stored = self.migrate({"additional_sync_args": legacy})
+        self.assertEqual(stored["additional_sync_args"], ["--copy-links"])
+        self.assertEqual(stored["config_version"], CONFIG_VERSION)
+
+        stored = self.migrate({**stored, "additional_sync_args": legacy})
+        self.assertEqual(stored["additional_sync_args"], legacy)
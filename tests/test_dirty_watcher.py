@@ -0,0 +1,48 @@
+"""
+Tests of DirtyWatcher.
+"""
+
+from pathlib import Path
+import shutil, tempfile, unittest
+
+from dirty_watcher import DirtyWatcher
+from rclone_filter import RcloneFilter
+
+
+class DirtyWatcherTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix="sdh-gamesync-watched-"))
+        (self.root / "saves").mkdir()
+        (self.root / "saves" / "old.sav").write_bytes(b"1")
+        self.filter = RcloneFilter(["+ /saves/**", "- **"])
+
+    async def asyncTearDown(self):
+        DirtyWatcher.stop_all()
+
+    async def watch(self, track_removals: bool = False) -> DirtyWatcher:
+        self.assertTrue(await DirtyWatcher.start("watched", str(self.root), self.filter, track_removals, lambda: True))
+        return DirtyWatcher.pop("watched")
+
+    async def test_records_matching_changes(self):
+        watcher = await self.watch()
+        (self.root / "saves" / "new.sav").write_bytes(b"2")
+        (self.root / "saves" / "slot").mkdir()
+        (self.root / "saves" / "slot" / "data.sav").write_bytes(b"3")
+        (self.root / "saves" / "old.sav").unlink()
+        (self.root / "cache.tmp").write_bytes(b"4")
+
+        self.assertEqual(watcher.stop(), ({"saves/new.sav", "saves/slot/data.sav"}, {"saves/old.sav"}))
+
+    async def test_removal_invalidates_when_tracked(self):
+        watcher = await self.watch(track_removals=True)
+        (self.root / "saves" / "old.sav").unlink()
+        self.assertIsNone(watcher.stop())
+
+    async def test_unusable_baseline(self):
+        self.assertTrue(await DirtyWatcher.start("watched", str(self.root), self.filter, False, lambda: False))
+        self.assertIsNone(DirtyWatcher.pop("watched").stop())
+
+    async def test_removed_root(self):
+        watcher = await self.watch()
+        shutil.rmtree(self.root)
+        self.assertIsNone(watcher.stop())
@@ -0,0 +1,51 @@
+"""
+Tests of FilterStore.
+"""
+
+import threading, unittest
+
+from filter_store import FILTER_RENDER_DIR, FilterStore
+
+
+class RenderTest(unittest.TestCase):
+    def tearDown(self):
+        FilterStore.set_many({"8": [], "9": []})
+
+    def test_changed_rules_replace_the_rendered_file(self):
+        FilterStore.set_many({"8": ["+ a/**"], "9": ["+ b/**"]})
+        kept = FilterStore.render("9")
+        old = FilterStore.render("8")
+
+        FilterStore.set("8", ["+ c/**"])
+        current = FilterStore.render("8")
+
+        self.assertNotEqual(current, old)
+        self.assertFalse(old.exists())
+        self.assertEqual(current.read_text(), "+ c/**")
+        self.assertTrue(kept.exists())
+        self.assertEqual(sorted(FILTER_RENDER_DIR.glob("8.*")), [current])
+
+
+class ConcurrencyTest(unittest.TestCase):
+    def tearDown(self):
+        FilterStore.set_many({str(i): [] for i in range(4)})
+
+    def test_writers_on_threads(self):
+        errors = []
+
+        def write(i: int):
+            try:
+                for n in range(200):
+                    FilterStore.set_many({str(i): [f"+ {n}/**"]})
+                    FilterStore.get_many()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(FilterStore.get_many([str(i) for i in range(4)]), {str(i): ["+ 199/**"] for i in range(4)})
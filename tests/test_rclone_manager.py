@@ -0,0 +1,110 @@
+"""
+Tests of the update of rclone, against a local stand-in of the download server.
+"""
+
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+import hashlib, io, subprocess, tempfile, threading, unittest, zipfile
+
+from common_defs import RCLONE_BIN_PATH
+from config import Config
+from rclone_manager import RcloneManager
+
+VERSION = "v9.9.9"
+ZIP_NAME = f"rclone-{VERSION}-linux-amd64.zip"
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    ranges: list[str] = []
+
+    def send_head(self):
+        if not (header := self.headers.get("Range")):
+            return super().send_head()
+
+        self.ranges.append(header)
+        data = Path(self.translate_path(self.path)).read_bytes()
+        start = int(header.removeprefix("bytes=").rstrip("-"))
+        if start >= len(data):
+            self.send_error(416)
+            return None
+
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        return io.BytesIO(data[start:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def get_script(version: str) -> bytes:
+    return f"#!/bin/sh\necho rclone {version}\n".encode()
+
+
+class UpdateRcloneTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix="sdh-gamesync-downloads-"))
+        (self.root / "version.txt").write_text(f"rclone {VERSION}\n")
+        (self.root / VERSION).mkdir()
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip_ref:
+            zip_ref.writestr(f"rclone-{VERSION}-linux-amd64/README.txt", "rclone")
+            zip_ref.writestr(f"rclone-{VERSION}-linux-amd64/rclone", get_script(VERSION) + bytes(256 * 1024))
+        self.archive = archive.getvalue()
+        (self.root / VERSION / ZIP_NAME).write_bytes(self.archive)
+        self.publish_hash(hashlib.sha256(self.archive).hexdigest())
+
+        RangeRequestHandler.ranges = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(RangeRequestHandler, directory=str(self.root)))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        Config.set_config("rclone_download_url", f"http://127.0.0.1:{self.server.server_port}/")
+
+        RCLONE_BIN_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RCLONE_BIN_PATH.write_bytes(get_script("v1.0.0"))
+        RCLONE_BIN_PATH.chmod(0o755)
+        self.part_path = RCLONE_BIN_PATH.with_name(f"{ZIP_NAME}.part")
+
+        # plain http, the certifi bundle is not needed
+        patcher = mock.patch("rclone_manager.get_ssl_context", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.part_path.unlink(missing_ok=True)
+        Config.set_config("rclone_download_url", "https://downloads.rclone.org")
+
+    def publish_hash(self, sha256: str):
+        (self.root / VERSION / "SHA256SUMS").write_text(
+            "-----BEGIN PGP SIGNED MESSAGE-----\n\n"
+            f"{hashlib.sha256(b'other').hexdigest()}  rclone-{VERSION}-windows-amd64.zip\n"
+            f"{sha256}  {ZIP_NAME}\n"
+        )
+
+    def get_version(self) -> str:
+        return subprocess.run([RCLONE_BIN_PATH, "--version"], capture_output=True, text=True).stdout.strip()
+
+    def test_update(self):
+        RcloneManager.update_rclone()
+        self.assertEqual(self.get_version(), f"rclone {VERSION}")
+        self.assertFalse(self.part_path.exists())
+        self.assertEqual(RangeRequestHandler.ranges, [])
+
+        self.assertEqual(RcloneManager.update_rclone(), "No update required")
+
+    def test_resumes_partial_download(self):
+        self.part_path.write_bytes(self.archive[:1000])
+        RcloneManager.update_rclone()
+        self.assertEqual(self.get_version(), f"rclone {VERSION}")
+        self.assertEqual(RangeRequestHandler.ranges, ["bytes=1000-"])
+
+    def test_bad_hash_keeps_current_binary(self):
+        self.publish_hash(hashlib.sha256(b"tampered").hexdigest())
+        RcloneManager.update_rclone()
+        self.assertEqual(self.get_version(), "rclone v1.0.0")
+        self.assertFalse(self.part_path.exists())
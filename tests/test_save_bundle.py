@@ -0,0 +1,67 @@
+"""
+Tests of the packing of small save files into bundles.
+"""
+
+from pathlib import Path
+import io, os, tarfile, tempfile, unittest
+
+from rclone_filter import RcloneFilter
+import save_bundle
+
+
+class SaveBundleTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="sdh-gamesync-bundle-")
+        self.bundle_dir = Path(tempfile.mkdtemp(prefix="sdh-gamesync-bundle-"))
+        self.filter = RcloneFilter(["+ /saves/**", "- **"])
+        os.makedirs(os.path.join(self.root, "saves", "slot"))
+        for path, content in (("saves/a.sav", b"a"), ("saves/slot/b.sav", b"bb"), ("other.txt", b"c")):
+            Path(self.root, path).write_bytes(content)
+
+    def write_archive(self, path: Path, files: dict[str, bytes]):
+        with tarfile.open(path, "w:gz") as archive:
+            for name, content in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+
+    def test_pack_unpack_round_trip(self):
+        entries = save_bundle.pack(self.root, self.filter, self.bundle_dir)
+        self.assertEqual(sorted(entries), ["saves/a.sav", "saves/slot/b.sav"])
+        self.assertEqual(save_bundle.read_manifest(self.bundle_dir / save_bundle.BUNDLE_MANIFEST_NAME), entries)
+
+        other = tempfile.mkdtemp(prefix="sdh-gamesync-bundle-")
+        save_bundle.unpack(other, self.bundle_dir / save_bundle.BUNDLE_ARCHIVE_NAME, entries, set(entries))
+        self.assertEqual(Path(other, "saves/slot/b.sav").read_bytes(), b"bb")
+        self.assertEqual(save_bundle.scan(other, self.filter, dict()), save_bundle.scan(self.root, self.filter, dict()))
+
+    def test_unpack_rejects_paths_out_of_root(self):
+        archive_path = self.bundle_dir / save_bundle.BUNDLE_ARCHIVE_NAME
+        self.write_archive(archive_path, {"../escaped.sav": b"x"})
+        with self.assertRaises(ValueError):
+            save_bundle.unpack(self.root, archive_path, {"../escaped.sav": [1, 0, ""]}, {"../escaped.sav"})
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.root), "escaped.sav")))
+
+    def test_unpack_rejects_files_not_matching_the_manifest(self):
+        archive_path = self.bundle_dir / save_bundle.BUNDLE_ARCHIVE_NAME
+        self.write_archive(archive_path, {"saves/a.sav": b"changed"})
+        with self.assertRaises(ValueError):
+            save_bundle.unpack(self.root, archive_path, {"saves/a.sav": [1, 0, "0" * 64]}, {"saves/a.sav"})
+        self.assertEqual(Path(self.root, "saves/a.sav").read_bytes(), b"a")
+
+    def test_pack_carries_over_files_of_the_previous_bundle(self):
+        previous = self.bundle_dir / "previous.tar.gz"
+        self.write_archive(previous, {"saves/cloud.sav": b"cloud", "saves/a.sav": b"old", "../escaped.sav": b"x"})
+        carried = {"saves/cloud.sav": [5, 7, ""], "saves/a.sav": [3, 7, ""]}
+
+        entries = save_bundle.pack(self.root, self.filter, self.bundle_dir, carried, previous)
+        self.assertEqual(sorted(entries), ["saves/a.sav", "saves/cloud.sav", "saves/slot/b.sav"])
+        self.assertEqual(entries["saves/cloud.sav"][:2], [5, 7])
+
+        other = tempfile.mkdtemp(prefix="sdh-gamesync-bundle-")
+        save_bundle.unpack(other, self.bundle_dir / save_bundle.BUNDLE_ARCHIVE_NAME, entries, set(entries))
+        self.assertEqual(Path(other, "saves/cloud.sav").read_bytes(), b"cloud")
+        self.assertEqual(Path(other, "saves/a.sav").read_bytes(), b"a")
+
+        with self.assertRaises(ValueError):
+            save_bundle.pack(self.root, self.filter, self.bundle_dir, {"../escaped.sav": [1, 0, ""]}, previous)
@@ -0,0 +1,58 @@
+"""
+Tests of the sync plans.
+"""
+
+from unittest import mock
+import time, unittest
+
+from common_defs import RcloneSyncMode, RcloneSyncWinner
+from sync_plan import SYNC_PLAN_TTL, SyncPlanStore, diff_listings, summarize_plan
+
+LOCAL = {"same": [10, 100.0], "newer": [20, 200.0], "local_only": [30, 100.0], "resized": [1, 100.0]}
+CLOUD = {"same": [10, 100.5], "newer": [20, 150.0], "cloud_only": [40, 100.0], "resized": [2, 100.0]}
+
+
+class DiffListingsTest(unittest.TestCase):
+    def test_sync_from_local(self):
+        plan = diff_listings(LOCAL, CLOUD, RcloneSyncWinner.LOCAL, RcloneSyncMode.SYNC, 0.001)
+        self.assertEqual(
+            plan,
+            {"upload": ["local_only", "newer", "resized"], "download": [], "delete_local": [], "delete_cloud": ["cloud_only"]},
+        )
+
+    def test_copy_from_cloud(self):
+        plan = diff_listings(LOCAL, CLOUD, RcloneSyncWinner.CLOUD, RcloneSyncMode.COPY, 0.001)
+        self.assertEqual(
+            plan, {"upload": [], "download": ["cloud_only", "newer", "resized"], "delete_local": [], "delete_cloud": []}
+        )
+
+    def test_bisync_copies_both_ways(self):
+        plan = diff_listings(LOCAL, CLOUD, RcloneSyncWinner.CLOUD, RcloneSyncMode.BISYNC, 0.001)
+        self.assertEqual(plan["upload"], ["local_only"])
+        self.assertEqual(plan["download"], ["cloud_only", "newer", "resized"])
+
+    def test_size_only_without_mod_times(self):
+        plan = diff_listings(LOCAL, CLOUD, RcloneSyncWinner.LOCAL, RcloneSyncMode.COPY, None)
+        self.assertEqual(plan["upload"], ["local_only", "resized"])
+
+    def test_summary(self):
+        plan = diff_listings(LOCAL, CLOUD, RcloneSyncWinner.LOCAL, RcloneSyncMode.SYNC, 0.001)
+        summary = summarize_plan(plan, LOCAL, CLOUD)
+        self.assertEqual(summary["local"], {"new": [], "changed": [], "deleted": []})
+        self.assertEqual(
+            summary["cloud"],
+            {"new": [["local_only", 30]], "changed": [["newer", 20, 20], ["resized", 2, 1]], "deleted": [["cloud_only", 40]]},
+        )
+        self.assertEqual(summary["bytes"], 51)
+
+
+class SyncPlanStoreTest(unittest.TestCase):
+    def test_plans_run_once(self):
+        plan_id = SyncPlanStore.add({"upload": ["a"]})
+        self.assertEqual(SyncPlanStore.pop(plan_id)["upload"], ["a"])
+        self.assertIsNone(SyncPlanStore.pop(plan_id))
+
+    def test_plans_expire(self):
+        plan_id = SyncPlanStore.add({"upload": ["a"]})
+        with mock.patch("time.time", return_value=time.time() + SYNC_PLAN_TTL + 1):
+            self.assertIsNone(SyncPlanStore.pop(plan_id))
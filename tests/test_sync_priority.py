@@ -0,0 +1,38 @@
+"""
+Tests of SyncPriority.
+"""
+
+from unittest import mock
+import subprocess, unittest
+
+from sync_priority import SyncPriority
+
+
+class RaisePriorityTest(unittest.TestCase):
+    def setUp(self):
+        self.processes = [subprocess.Popen(["sleep", "30"]) for _ in range(2)]
+
+    def tearDown(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+
+    def test_restartable_processes_are_stopped_if_nice_cannot_be_lowered(self):
+        restartable, kept = self.processes
+        SyncPriority.register(restartable.pid, True)
+        SyncPriority.register(kept.pid, False)
+        with mock.patch("os.setpriority", side_effect=PermissionError(1, "Operation not permitted")):
+            SyncPriority.raise_priority()
+
+        self.assertEqual(restartable.wait(5), -15)
+        self.assertIsNone(kept.poll())
+        self.assertTrue(SyncPriority.unregister(restartable.pid))
+        self.assertFalse(SyncPriority.unregister(kept.pid))
+
+    def test_processes_are_kept_if_nice_is_lowered(self):
+        SyncPriority.register(self.processes[0].pid, True)
+        with mock.patch("os.setpriority"):
+            SyncPriority.raise_priority()
+
+        self.assertIsNone(self.processes[0].poll())
+        self.assertFalse(SyncPriority.unregister(self.processes[0].pid))
@@ -0,0 +1,76 @@
+"""
+Tests of SyncScheduler.
+"""
+
+import asyncio, unittest
+
+from common_defs import SYNC_CANCELLED
+from config import Config
+from sync_scheduler import SyncScheduler
+
+
+class YieldingLock(asyncio.Lock):
+    async def acquire(self) -> bool:
+        # lets other tasks run as a contended lock would
+        await asyncio.sleep(0)
+        return await super().acquire()
+
+
+class SyncSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        Config.set_config("sync_concurrency", 1)
+        # each test runs on its own event loop
+        SyncScheduler._condition = asyncio.Condition()
+
+    async def test_cancel_while_waiting_for_slot(self):
+        release = asyncio.Event()
+        started = []
+
+        async def task(name: str, wait: bool = False) -> int:
+            started.append(name)
+            if wait:
+                await release.wait()
+            return 0
+
+        a = asyncio.create_task(SyncScheduler.submit("a", "sync", lambda: task("a", True)))
+        await asyncio.sleep(0)
+        b = asyncio.create_task(SyncScheduler.submit("b", "sync", lambda: task("b")))
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(SyncScheduler.cancel("b", SYNC_CANCELLED), 1)
+        self.assertEqual(await b, SYNC_CANCELLED)
+
+        release.set()
+        self.assertEqual(await a, 0)
+        c = await asyncio.wait_for(SyncScheduler.submit("c", "sync", lambda: task("c")), 1)
+        self.assertEqual(c, 0)
+        self.assertEqual(started, ["a", "c"])
+        self.assertEqual(SyncScheduler._running, 0)
+        self.assertEqual(SyncScheduler._runners, dict())
+
+    async def test_submit_while_dropped_runner_exits(self):
+        # submits at every step of the runner of a target whose tasks got dropped while it waited for a slot
+        SyncScheduler._condition = asyncio.Condition(YieldingLock())
+        for steps in range(12):
+            release = asyncio.Event()
+
+            async def task(wait: bool = False) -> int:
+                if wait:
+                    await release.wait()
+                return 0
+
+            a = asyncio.create_task(SyncScheduler.submit("a", "sync", lambda: task(True)))
+            await asyncio.sleep(0)
+            b = asyncio.create_task(SyncScheduler.submit("b", "sync", task))
+            await asyncio.sleep(0.01)
+            SyncScheduler.cancel("b", SYNC_CANCELLED)
+            self.assertEqual(await b, SYNC_CANCELLED)
+
+            release.set()
+            for _ in range(steps):
+                await asyncio.sleep(0)
+            self.assertEqual(await asyncio.wait_for(SyncScheduler.submit("b", "sync", task), 1), 0)
+            self.assertEqual(await a, 0)
+            await asyncio.sleep(0.01)
+            self.assertEqual(SyncScheduler._running, 0)
+            self.assertEqual(SyncScheduler._runners, dict())
@@ -0,0 +1,123 @@
+"""
+Tests of the sync targets.
+"""
+
+from pathlib import Path
+import copy, os, tempfile, unittest
+
+from common_defs import RcloneSyncWinner
+from config import Config
+from filter_store import FilterStore
+from sync_stats import SyncStats
+from sync_target import MIRROR_PROGRESS, SYNC_PROGRESS, FileTransferTarget, GameSyncTarget
+
+
+class FakeTransferTarget(FileTransferTarget):
+    async def _rclone_cli_execute(self, winner: RcloneSyncWinner, extra_args: list[str] = []) -> int:
+        self._last_stats = {"bytes": 100, "transfers": 2, "checks": 1}
+        self._retries = 1
+        return 0
+
+
+class MirrorProgressTest(unittest.TestCase):
+    def tearDown(self):
+        MIRROR_PROGRESS.pop("7", None)
+        SYNC_PROGRESS.pop("7", None)
+
+    def test_mirrors_combine_into_one_progress(self):
+        target = GameSyncTarget(7)
+        MIRROR_PROGRESS["7"] = dict()
+        mirrors = []
+        for remote in ("cloud", "mirror"):
+            mirror = copy.copy(target)
+            mirror._remote = remote
+            mirrors.append(mirror)
+
+        mirrors[0]._update_progress({"bytes": 10, "totalBytes": 100, "eta": 9, "transferring": [{"name": "a"}]})
+        mirrors[1]._update_progress({"bytes": 60, "totalBytes": 100, "eta": None, "transferring": [{"name": "a"}]})
+        mirrors[0]._update_progress({"bytes": 20, "totalBytes": 100, "eta": 8, "transferring": [{"name": "a"}]})
+
+        progress = target.get_progress()
+        self.assertEqual(progress["bytes"], 80)
+        self.assertEqual(progress["total_bytes"], 200)
+        self.assertEqual(progress["eta"], 8)
+        self.assertEqual(progress["transferring"], ["a"])
+
+
+class SyncRunsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_are_recorded_as_one_sync(self):
+        target = FakeTransferTarget("runs", Path(tempfile.gettempdir()), "cloud:runs", ["a"])
+        mirror = copy.copy(target)
+        mirror._remote = "mirror"
+
+        async def sync_task() -> int:
+            await target._rclone_execute(RcloneSyncWinner.LOCAL)
+            await mirror._rclone_execute(RcloneSyncWinner.LOCAL)
+            return await target._rclone_execute(RcloneSyncWinner.LOCAL)
+
+        self.assertEqual(await target._start_sync_task(sync_task), 0)
+
+        history = SyncStats.get_history("runs")
+        self.assertEqual(len(history), 1)
+        self.assertEqual(
+            [history[0][key] for key in ("bytes", "files", "checks", "retries", "exit_code")], [200, 4, 2, 2, 0]
+        )
+
+    async def test_runs_continue_the_progress_and_log(self):
+        target = FakeTransferTarget("continued", Path(tempfile.gettempdir()), "cloud:continued", ["a"])
+        chunks = FakeTransferTarget("continued", Path(tempfile.gettempdir()), "cloud:continued/chunks", ["b"])
+        seen = []
+
+        async def sync_task() -> int:
+            await target._rclone_execute(RcloneSyncWinner.LOCAL)
+            chunks._update_progress({"bytes": 10, "totalBytes": 50, "transfers": 0, "totalTransfers": 1})
+            seen.append(target.get_progress())
+            seen.append({target._get_rclone_log_path(), chunks._get_rclone_log_path()})
+            return 0
+
+        await target._start_sync_task(sync_task)
+        self.assertEqual([seen[0][key] for key in ("bytes", "total_bytes", "files", "total_files")], [110, 150, 2, 3])
+        self.assertEqual(len(seen[1]), 1)
+
+
+class ManifestTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.sync_root = tempfile.mkdtemp(prefix="sdh-gamesync-root-")
+        Config.set_config("sync_root", self.sync_root)
+        FilterStore.set("12", ["+ /saves/**"])
+        os.makedirs(os.path.join(self.sync_root, "saves"))
+        self.save = Path(self.sync_root, "saves", "slot1.sav")
+        self.save.write_bytes(b"1")
+
+        self.target = GameSyncTarget(12)
+        self.target._manifest_file.unlink(missing_ok=True)
+        self.runs = 0
+
+        async def rclone_execute(winner: RcloneSyncWinner, extra_args: list[str] = []) -> int:
+            self.runs += 1
+            return 0
+
+        self.target._rclone_execute = rclone_execute
+
+    def tearDown(self):
+        FilterStore.set("12", [])
+        Config.set_config("sync_root", "/")
+
+    async def test_unchanged_files_skip_the_upload(self):
+        self.assertEqual(await self.target.sync(RcloneSyncWinner.LOCAL), 0)
+        self.assertEqual(await self.target.sync(RcloneSyncWinner.LOCAL), 0)
+        self.assertEqual(self.runs, 1)
+
+        self.save.write_bytes(b"22")
+        self.assertEqual(await self.target.sync(RcloneSyncWinner.LOCAL), 0)
+        self.assertEqual(self.runs, 2)
+
+    async def test_failed_upload_is_not_skipped(self):
+        async def rclone_execute(winner: RcloneSyncWinner, extra_args: list[str] = []) -> int:
+            self.runs += 1
+            return 1
+
+        self.target._rclone_execute = rclone_execute
+        self.assertEqual(await self.target.sync(RcloneSyncWinner.LOCAL), 1)
+        self.assertEqual(await self.target.sync(RcloneSyncWinner.LOCAL), 1)
+        self.assertEqual(self.runs, 2)
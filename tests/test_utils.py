@@ -0,0 +1,54 @@
+"""
+Tests of the helpers in utils.
+"""
+
+from pathlib import Path
+import tempfile, unittest
+
+import utils
+from utils import read_log_page, rc_params_from_args
+
+
+class RcParamsFromArgsTest(unittest.TestCase):
+    def test_command_flags(self):
+        self.assertEqual(
+            rc_params_from_args(["--conflict-loser", "num", "--resync"]),
+            {"conflictLoser": "num", "resync": True},
+        )
+
+    def test_filter_and_config_flags(self):
+        self.assertEqual(
+            rc_params_from_args(["--files-from", "a.files", "--no-traverse", "--transfers=4", "--max-size", "1M"]),
+            {
+                "_filter": {"FilesFrom": ["a.files"], "MaxSize": "1M"},
+                "_config": {"NoTraverse": True, "Transfers": 4},
+            },
+        )
+
+
+class ReadLogPageTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp(prefix="sdh-gamesync-logs-"))
+        self.log = self.dir / "plugin.log"
+        self.log.write_text("".join(f"line {i}\n" for i in range(10)))
+
+    def test_pages_back_and_forward(self):
+        last = read_log_page(self.log, limit=3)
+        self.assertEqual(last["text"], "line 7\nline 8\nline 9\n")
+        earlier = read_log_page(self.log, last["start"], 3)
+        self.assertEqual(earlier["text"], "line 4\nline 5\nline 6\n")
+
+        with open(self.log, "a") as f:
+            f.write("line 10\n")
+        following = read_log_page(self.log, last["end"], 3, "forward")
+        self.assertEqual(following["text"], "line 10\n")
+        self.assertEqual(following["inode"], last["inode"])
+
+    def test_indexes_are_bounded(self):
+        for i in range(utils.LOG_LINE_INDEXES_SIZE + 2):
+            log = self.dir / f"rclone {i}.log"
+            log.write_text("line\n")
+            read_log_page(log)
+
+        self.assertEqual(len(utils._log_line_indexes), utils.LOG_LINE_INDEXES_SIZE)
+        self.assertNotIn(str(self.dir / "rclone 0.log"), utils._log_line_indexes)